@@ -0,0 +1,124 @@
+"""
+Memory-Mapped Arrow IPC Copies of Frequently Read Tables
+Which tables get a .arrow copy, plus a cold/warm load benchmark against
+CSV and Parquet
+"""
+
+import os
+import argparse
+import time
+
+from sap_schema import read_csv_table, read_ipc_table, read_parquet_table
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw')
+
+# Tables read by the validator, linker and notebooks on nearly every run
+IPC_TABLES = {
+    'VBAK', 'VBAP', 'VBEP', 'VBPA', 'VBUK', 'VBUP', 'LIKP', 'LIPS', 'VBRK', 'VBRP',
+    'KNA1', 'KNVV', 'MARA', 'Account', 'Opportunity', 'Quote',
+}
+# None = uncompressed (true zero-copy mapping); 'lz4' trades a decompress for ~2-3x less disk
+DEFAULT_IPC_COMPRESSION = None
+IPC_COMPRESSIONS = {'none': None, 'lz4': 'lz4'}
+
+BENCHMARK_TABLES = ['VBAK', 'VBAP', 'VBEP', 'VBPA']
+WARM_REPEATS = 5
+
+
+def has_ipc_copy(table_name):
+    """Check whether a table gets an Arrow IPC copy"""
+    return table_name in IPC_TABLES
+
+
+def evict_from_page_cache(path):
+    """Drop a file's pages from the OS page cache so the next read is cold"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def time_load(loader, path, table_name):
+    """Cold (page cache evicted) and best-of-N warm load time in ms"""
+    evicted = evict_from_page_cache(path)
+    start = time.perf_counter()
+    table = loader(path, table_name)
+    cold = (time.perf_counter() - start) * 1000
+
+    warm = float('inf')
+    for _ in range(WARM_REPEATS):
+        start = time.perf_counter()
+        loader(path, table_name)
+        warm = min(warm, (time.perf_counter() - start) * 1000)
+    return {'rows': table.num_rows, 'cold_ms': cold if evicted else None, 'warm_ms': warm}
+
+
+def find_table_files(table_name):
+    """CSV, Parquet and IPC files for a table under data/raw"""
+    for root, _, files in os.walk(DATA_DIR):
+        if f'{table_name}.parquet' in files or f'{table_name}.csv' in files:
+            base = os.path.join(root, table_name)
+            return {
+                'CSV': base + '.csv',
+                'Parquet': base + '.parquet',
+                'IPC': base + '.arrow',
+            }
+    return {}
+
+
+def benchmark_loads(tables=BENCHMARK_TABLES):
+    """Compare CSV, Parquet and memory-mapped IPC load times per table"""
+    loaders = {
+        'CSV': read_csv_table,
+        'Parquet': read_parquet_table,
+        'IPC': read_ipc_table,
+    }
+    results = []
+    for table_name in tables:
+        for fmt, path in find_table_files(table_name).items():
+            if not os.path.exists(path):
+                continue
+            result = time_load(loaders[fmt], path, table_name)
+            result.update({
+                'table': table_name,
+                'format': fmt,
+                'size_mb': os.path.getsize(path) / (1024 * 1024),
+            })
+            results.append(result)
+    return results
+
+
+def print_benchmark(results):
+    """Print load times grouped by table"""
+    print(f"\n  {'Table':6s} {'Format':8s} {'Rows':>8s} {'Size MB':>8s} {'Cold ms':>9s} {'Warm ms':>9s}")
+    for r in results:
+        cold = f"{r['cold_ms']:9.2f}" if r['cold_ms'] is not None else f"{'n/a':>9s}"
+        print(f"  {r['table']:6s} {r['format']:8s} {r['rows']:8,} {r['size_mb']:8.2f} "
+              f"{cold} {r['warm_ms']:9.2f}")
+
+
+def main():
+    """Benchmark cold and warm loads of CSV vs Parquet vs memory-mapped IPC"""
+    parser = argparse.ArgumentParser(description='Arrow IPC load benchmark')
+    parser.add_argument('tables', nargs='*', default=BENCHMARK_TABLES,
+                        help=f"Tables to benchmark (default: {' '.join(BENCHMARK_TABLES)})")
+    args = parser.parse_args()
+
+    print("="*80)
+    print("ARROW IPC LOAD BENCHMARK")
+    print("="*80)
+    print("Cold = file evicted from page cache first; warm = best of "
+          f"{WARM_REPEATS} repeated loads. Typed Arrow tables in every format.")
+    print_benchmark(benchmark_loads(args.tables))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+"""
+Scale-Tiered Benchmark Suite
+Runs every pipeline stage (and the hot functions inside them) at several scale
+tiers with fixed seeds, records wall time, rows/sec, peak memory and output
+bytes to a JSON results store, compares against a stored baseline and prints
+the scaling curve of each stage
+
+Each tier runs in its own workspace (data/benchmark/work/<tier>, a copy of
+scripts/) so generated data never touches the project's data/. Each case runs
+in a fresh worker process: only the measured call is timed (imports and setup
+are not), and peak memory is the worker's maximum resident set size.
+"""
+
+import os
+import sys
+import glob
+import json
+import math
+import shutil
+import argparse
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+BENCHMARK_DIR = os.path.join(PROJECT_ROOT, 'data', 'benchmark')
+WORK_DIR = os.path.join(BENCHMARK_DIR, 'work')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+BASELINE_PATH = os.path.join(PROJECT_ROOT, 'benchmark_baseline.json')
+
+# Scale tiers: multiplier of the generators' default volumes (SF1 = 5,000 customers, 500 orders/day)
+TIERS = {'tiny': 0.2, 'sf1': 1.0, 'sf10': 10.0}
+DEFAULT_TIERS = ['tiny', 'sf1']
+
+# Generator constants multiplied by the scale factor (seeds stay fixed at 42)
+SCALED_CONSTANTS = {
+    'generate_synthetic_data': ['NUM_CUSTOMERS', 'NUM_MATERIALS', 'NUM_ORDERS_PER_DAY'],
+    'generate_crm_data': ['NUM_ACCOUNTS', 'NUM_LEADS'],
+}
+
+# Regression thresholds against the baseline
+MAX_SLOWDOWN = 0.20
+MAX_MEMORY_GROWTH = 0.25
+MIN_SECONDS = 0.05  # below this, timing noise dominates
+
+
+def case(name, description, stage, outputs, function=False):
+    """Benchmark case: a stage run or one function inside it, the files it writes (globs)"""
+    return {'name': name, 'description': description, 'stage': stage, 'outputs': list(outputs),
+            'function': function}
+
+
+# ==================== CASES ====================
+
+# In pipeline order: each case runs on the outputs of the cases before it
+CASES = [
+    case('generate_sap', 'SAP SD generator (29 tables)', 'generate_sap',
+         outputs=['data/bronze/**/*.csv']),
+    case('generate_vbap_sales_items', 'SAPDataGenerator.generate_vbap_sales_items', 'generate_sap',
+         outputs=['data/bronze/transactional/sales_orders/VBAP.csv'], function=True),
+    case('generate_crm', 'Salesforce CRM generator (9 tables)', 'generate_crm',
+         outputs=['data/raw/crm/*.csv']),
+    case('link', 'CRM ↔ SAP cross-references and analytics views', 'link',
+         outputs=['data/raw/cross_reference/*.csv']),
+    case('create_opportunity_order_link', 'CRMSAPLinker.create_opportunity_order_link', 'link',
+         outputs=['data/raw/cross_reference/Opportunity_Order_XREF.csv'], function=True),
+    case('convert', 'CSV → Parquet (SAP landed from bronze, CRM, XREF)', 'convert',
+         outputs=['data/raw/**/*.parquet', 'data/raw/**/*.arrow']),
+    case('convert_csv_to_parquet', 'CSVToParquetConverter.convert_csv_to_parquet (VBAP)', 'convert',
+         outputs=['data/raw/sap/transactional/sales_orders/VBAP.parquet'], function=True),
+    case('validate_referential_integrity', 'ForeignKeyChecker.check_all', 'validate',
+         outputs=[], function=True),
+    case('validate', 'Full validation run', 'validate',
+         outputs=['validation_report.json']),
+    case('silver', 'Bronze → Silver build', 'silver',
+         outputs=['data/silver/**/*.parquet']),
+    case('gold', 'Gold revenue cube build', 'gold',
+         outputs=['data/gold/revenue_cube/**/*']),
+]
+CASE_INDEX = {c['name']: c for c in CASES}
+
+
+# ==================== WORKER ====================
+
+class Timer:
+    """Accumulates the time spent inside `with timer:` blocks"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self.start
+
+
+def scale_generator(module, scale):
+    """Multiply the module's volume constants by the scale factor"""
+    for constant in SCALED_CONSTANTS[module.__name__]:
+        setattr(module, constant, max(1, int(round(getattr(module, constant) * scale))))
+
+
+def frame_rows(obj):
+    """Rows of every DataFrame attribute of a generator"""
+    import pandas as pd
+    return sum(len(v) for v in vars(obj).values() if isinstance(v, pd.DataFrame))
+
+
+def table_rows(names):
+    """Rows of catalog tables (read outside the timer)"""
+    from data_catalog import read_table
+    return sum(read_table(name, cache=False).num_rows for name in names)
+
+
+def run_generate_sap(scale, timer, function=False):
+    import generate_synthetic_data
+    scale_generator(generate_synthetic_data, scale)
+    os.makedirs(generate_synthetic_data.OUTPUT_DIR, exist_ok=True)
+    generator = generate_synthetic_data.SAPDataGenerator()
+    if function:
+        # Same RNG path as a full run up to VBAP: master data, then orders
+        generator.generate_master_data()
+        generator.orders = generator.generate_vbak_sales_orders()
+        with timer:
+            items = generator.generate_vbap_sales_items()
+        return len(items)
+    with timer:
+        generator.generate_master_data()
+        generator.generate_transaction_data()
+        generator.save_all_data()
+    return frame_rows(generator)
+
+
+def run_generate_crm(scale, timer, function=False):
+    import generate_crm_data
+    scale_generator(generate_crm_data, scale)
+    os.makedirs(generate_crm_data.OUTPUT_DIR, exist_ok=True)
+    generator = generate_crm_data.SalesforceCRMGenerator()
+    with timer:
+        for step in ['generate_accounts', 'generate_contacts', 'generate_leads', 'generate_campaigns',
+                     'generate_opportunities', 'generate_opportunity_line_items', 'generate_cases',
+                     'generate_activities', 'generate_quotes']:
+            getattr(generator, step)()
+    return frame_rows(generator)
+
+
+def run_link(scale, timer, function=False):
+    from create_crm_sap_links import CRMSAPLinker
+    linker = CRMSAPLinker()
+    if function:
+        linker.create_account_customer_link()
+        with timer:
+            linker.create_opportunity_order_link()
+        return table_rows(['Opportunity', 'VBAK'])
+    with timer:
+        linker.create_account_customer_link()
+        linker.create_opportunity_order_link()
+        linker.create_contact_partner_link()
+        linker.create_quote_order_link()
+        linker.create_analytics_views()
+    return table_rows(['Account', 'KNA1', 'Opportunity', 'VBAK', 'Contact', 'KNVP', 'Quote'])
+
+
+def run_convert(scale, timer, function=False):
+    from convert_to_parquet import CSVToParquetConverter, DATA_DIR
+    converter = CSVToParquetConverter(force=True)
+    if function:
+        converter.land_bronze()
+        csv_path = os.path.join(DATA_DIR, 'sap', 'transactional', 'sales_orders', 'VBAP.csv')
+        with timer:
+            ok, rows = converter.convert_csv_to_parquet(csv_path, csv_path.replace('.csv', '.parquet'))
+        if not ok:
+            raise RuntimeError(f"conversion of {csv_path} failed")
+        return rows
+    with timer:
+        converter.convert_all()
+    return sum(s['rows'] for s in converter.conversion_stats)
+
+
+def run_validate(scale, timer, function=False):
+    if function:
+        from foreign_keys import ForeignKeyChecker
+        checker = ForeignKeyChecker()
+        with timer:
+            results = checker.check_all()
+        return sum(r['rows'] for r in results)
+    from validate_data import DataValidator
+    validator = DataValidator()
+    with timer:
+        validator.run_all()
+        validator.save_report(history_dir=None)
+    return validator.report()['rows_scanned']
+
+
+def run_silver(scale, timer, function=False):
+    from build_silver import SilverBuilder
+    builder = SilverBuilder()
+    with timer:
+        builder.build_all()
+    return sum(s['rows_read'] for s in builder.table_stats.values())
+
+
+def run_gold(scale, timer, function=False):
+    from revenue_cube import RevenueCubeBuilder, CUBE_METADATA
+    builder = RevenueCubeBuilder()
+    with timer:
+        builder.build()
+    with open(CUBE_METADATA) as f:
+        return json.load(f)['detail_rows']
+
+
+STAGE_RUNNERS = {
+    'generate_sap': run_generate_sap,
+    'generate_crm': run_generate_crm,
+    'link': run_link,
+    'convert': run_convert,
+    'validate': run_validate,
+    'silver': run_silver,
+    'gold': run_gold,
+}
+
+
+def run_worker(case_name, scale, result_path):
+    """Run one case in this process (the workspace's scripts/) and write its timing"""
+    spec = CASE_INDEX[case_name]
+    timer = Timer()
+    rows = STAGE_RUNNERS[spec['stage']](scale, timer, spec['function'])
+    with open(result_path, 'w') as f:
+        json.dump({'seconds': timer.seconds, 'rows': int(rows)}, f)
+
+
+# ==================== SUITE ====================
+
+def prepare_workspace(tier):
+    """Fresh project tree for a tier: scripts/ copied, empty SAP directory layout in data/bronze"""
+    workspace = os.path.join(WORK_DIR, tier)
+    shutil.rmtree(workspace, ignore_errors=True)
+    os.makedirs(os.path.join(workspace, 'scripts'))
+    for path in glob.glob(os.path.join(SCRIPT_DIR, '*.py')):
+        shutil.copy2(path, os.path.join(workspace, 'scripts'))
+    # The SAP generator writes into existing subdirectories (bronze and the landed copy share the layout)
+    for root in (os.path.join(PROJECT_ROOT, 'data', 'bronze'), os.path.join(PROJECT_ROOT, 'data', 'raw', 'sap')):
+        for directory, dirs, _ in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+            os.makedirs(os.path.join(workspace, 'data', 'bronze', os.path.relpath(directory, root)), exist_ok=True)
+    return workspace
+
+
+def output_bytes(workspace, patterns):
+    """Total size of the files matching the globs (relative to the workspace)"""
+    files = set()
+    for pattern in patterns:
+        files.update(p for p in glob.glob(os.path.join(workspace, pattern), recursive=True) if os.path.isfile(p))
+    return sum(os.path.getsize(p) for p in files)
+
+
+def run_case(workspace, tier, spec, log_dir):
+    """Run a case in a worker process; (result record, worker exit code)"""
+    result_path = os.path.join(log_dir, f"{spec['name']}.json")
+    log_path = os.path.join(log_dir, f"{spec['name']}.log")
+    command = [sys.executable, os.path.join(workspace, 'scripts', 'benchmark_suite.py'),
+               '--worker', spec['name'], '--scale', str(TIERS[tier]), '--result-file', result_path]
+    started = time.perf_counter()
+    with open(log_path, 'w') as log:
+        proc = subprocess.Popen(command, cwd=workspace, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 returns the child's resource usage: ru_maxrss is its peak RSS (KB on Linux)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    record = {
+        'tier': tier,
+        'scale': TIERS[tier],
+        'case': spec['name'],
+        'stage': spec['stage'],
+        'status': 'ok' if proc.returncode == 0 else 'failed',
+        'process_seconds': round(time.perf_counter() - started, 3),
+        'peak_mb': round(usage.ru_maxrss / 1024, 1),
+        'log': os.path.relpath(log_path, PROJECT_ROOT),
+    }
+    if proc.returncode == 0:
+        with open(result_path) as f:
+            timing = json.load(f)
+        record.update({
+            'seconds': round(timing['seconds'], 4),
+            'rows': timing['rows'],
+            'rows_per_sec': round(timing['rows'] / timing['seconds']) if timing['seconds'] > 0 else None,
+            'output_bytes': output_bytes(workspace, spec['outputs']),
+        })
+    return record, proc.returncode
+
+
+class BenchmarkSuite:
+    """Run the cases at each tier, store results, compare with the baseline"""
+
+    def __init__(self, tiers=DEFAULT_TIERS, cases=None, keep_workspace=False):
+        self.tiers = tiers
+        self.cases = [c for c in CASES if not cases or c['name'] in cases]
+        self.keep_workspace = keep_workspace
+        self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.results = []
+
+    def run(self):
+        print("="*80)
+        print("SCALE-TIERED BENCHMARK SUITE")
+        print("="*80)
+        print(f"Run: {self.run_id}")
+        print(f"Tiers: {', '.join(f'{t} (×{TIERS[t]:g})' for t in self.tiers)}")
+
+        for tier in self.tiers:
+            print(f"\n⏱️  Tier {tier} (scale ×{TIERS[tier]:g})")
+            workspace = prepare_workspace(tier)
+            log_dir = os.path.join(BENCHMARK_DIR, 'logs', self.run_id, tier)
+            os.makedirs(log_dir, exist_ok=True)
+            selected = {c['name'] for c in self.cases}
+            for spec in CASES:
+                # Every earlier stage runs (unrecorded when not selected): later cases need its outputs
+                if spec['name'] not in selected and spec['function']:
+                    continue
+                record, code = run_case(workspace, tier, spec, log_dir)
+                if spec['name'] not in selected:
+                    if code != 0:
+                        print(f"  ✗ {spec['name']:32s} setup failed, see {record['log']}")
+                        break
+                    continue
+                self.results.append(record)
+                if code != 0:
+                    print(f"  ✗ {spec['name']:32s} failed, see {record['log']}")
+                    break
+                print(f"  ✓ {spec['name']:32s} {record['seconds']:9.3f}s {record['rows']:>11,} rows "
+                      f"{record['rows_per_sec'] or 0:>11,}/s {record['peak_mb']:8.1f}MB "
+                      f"{record['output_bytes'] / 1024 / 1024:8.1f}MB out")
+            if not self.keep_workspace:
+                shutil.rmtree(workspace, ignore_errors=True)
+
+    def document(self):
+        """Results store document of this run"""
+        return {
+            'run_id': self.run_id,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'tiers': {t: TIERS[t] for t in self.tiers},
+            'results': self.results,
+        }
+
+    def save(self, path=None):
+        path = path or os.path.join(RESULTS_DIR, f'{self.run_id}.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.document(), f, indent=2)
+        print(f"\n✓ Results saved to: {os.path.relpath(path, PROJECT_ROOT)}")
+        return path
+
+
+# ==================== REPORTS ====================
+
+def scaling_exponent(small, large):
+    """k in seconds ∝ rows^k between two tiers (1.0 = linear)"""
+    if not small.get('seconds') or not large.get('seconds') or not small.get('rows') or large['rows'] <= small['rows']:
+        return None
+    return math.log(large['seconds'] / small['seconds']) / math.log(large['rows'] / small['rows'])
+
+
+def print_scaling(results):
+    """Seconds and rows/sec per case and tier, plus the scaling exponent between tiers"""
+    tiers = sorted({r['tier'] for r in results}, key=lambda t: TIERS.get(t, 0))
+    by_key = {(r['case'], r['tier']): r for r in results if r['status'] == 'ok'}
+    print("\n" + "="*80)
+    print("SCALING CURVES")
+    print("="*80)
+    header = f"  {'Case':32s}" + ''.join(f" {t + ' s':>10s} {t + ' rows/s':>13s}" for t in tiers)
+    if len(tiers) > 1:
+        header += '  Exponent'
+    print(header)
+    for spec in CASES:
+        if not any((spec['name'], t) in by_key for t in tiers):
+            continue
+        line = f"  {spec['name']:32s}"
+        for tier in tiers:
+            r = by_key.get((spec['name'], tier))
+            line += (f" {r['seconds']:10.3f} {r['rows_per_sec'] or 0:13,}" if r else f" {'-':>10s} {'-':>13s}")
+        exponents = [scaling_exponent(by_key[(spec['name'], a)], by_key[(spec['name'], b)])
+                     for a, b in zip(tiers, tiers[1:]) if (spec['name'], a) in by_key and (spec['name'], b) in by_key]
+        if exponents:
+            line += '  ' + ' → '.join('-' if k is None else f"{k:.2f}" for k in exponents)
+        print(line)
+    if len(tiers) > 1:
+        print("\n  Exponent: k in time ∝ rows^k between successive tiers (1.00 linear, >1.2 superlinear)")
+
+
+def compare(results, baseline, max_slowdown=MAX_SLOWDOWN, max_memory_growth=MAX_MEMORY_GROWTH):
+    """Print each case against the baseline; number of regressions"""
+    base = {(r['case'], r['tier']): r for r in baseline['results'] if r['status'] == 'ok'}
+    print("\n" + "="*80)
+    print(f"BASELINE COMPARISON (run {baseline['run_id']}; thresholds: time +{max_slowdown:.0%}, "
+          f"memory +{max_memory_growth:.0%})")
+    print("="*80)
+    regressions = 0
+    for r in results:
+        b = base.get((r['case'], r['tier']))
+        label = f"{r['tier']:5s} {r['case']:32s}"
+        if r['status'] != 'ok':
+            regressions += 1
+            print(f"  ✗ {label} failed")
+            continue
+        if b is None:
+            print(f"  ⚠ {label} not in baseline")
+            continue
+        time_change = r['seconds'] / b['seconds'] - 1 if b['seconds'] else 0
+        memory_change = r['peak_mb'] / b['peak_mb'] - 1 if b['peak_mb'] else 0
+        slower = time_change > max_slowdown and r['seconds'] - b['seconds'] > MIN_SECONDS
+        heavier = memory_change > max_memory_growth
+        detail = (f"{b['seconds']:.3f}s → {r['seconds']:.3f}s ({time_change:+.0%}), "
+                  f"{b['peak_mb']:.0f} → {r['peak_mb']:.0f}MB ({memory_change:+.0%})")
+        if slower or heavier:
+            regressions += 1
+            print(f"  ✗ {label} REGRESSION {detail}")
+        else:
+            print(f"  ✓ {label} {detail}")
+    print(f"\nRegressions: {regressions}")
+    return regressions
+
+
+def latest_results():
+    """Most recent results document in the store"""
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    if not paths:
+        raise SystemExit(f"No results in {os.path.relpath(RESULTS_DIR, PROJECT_ROOT)}")
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+# ==================== MAIN ====================
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Scale-tiered pipeline benchmark suite')
+    parser.add_argument('--tiers', nargs='+', choices=list(TIERS), default=DEFAULT_TIERS,
+                        help=f"Scale tiers to run (default: {' '.join(DEFAULT_TIERS)})")
+    parser.add_argument('--cases', nargs='+', choices=list(CASE_INDEX),
+                        help='Only record these cases (earlier stages still run as setup)')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='Baseline results to compare with (default: benchmark_baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store this run as the new baseline instead of comparing')
+    parser.add_argument('--report', action='store_true',
+                        help='Print the scaling table and comparison of the latest stored run, without running')
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN,
+                        help=f'Time regression threshold (default {MAX_SLOWDOWN})')
+    parser.add_argument('--max-memory-growth', type=float, default=MAX_MEMORY_GROWTH,
+                        help=f'Peak memory regression threshold (default {MAX_MEMORY_GROWTH})')
+    parser.add_argument('--keep-workspace', action='store_true',
+                        help='Keep the generated data in data/benchmark/work/<tier>')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.scale, args.result_file)
+        return
+
+    if args.report:
+        results = latest_results()['results']
+    else:
+        suite = BenchmarkSuite(args.tiers, args.cases, args.keep_workspace)
+        suite.run()
+        path = suite.save()
+        results = suite.results
+        if args.save_baseline:
+            shutil.copy2(path, args.baseline)
+            print(f"✓ Baseline saved to: {os.path.relpath(args.baseline, PROJECT_ROOT)}")
+
+    print_scaling(results)
+
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.max_slowdown, args.max_memory_growth):
+            sys.exit(1)
+    elif not args.save_baseline:
+        print(f"\n⚠ No baseline at {os.path.relpath(args.baseline, PROJECT_ROOT)} "
+              f"(create one with --save-baseline)")
+
+
+if __name__ == "__main__":
+    main()
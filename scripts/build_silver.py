@@ -0,0 +1,327 @@
+"""
+Bronze → Silver Build Engine
+Streams bronze SAP tables in batches, applies the schema registry types,
+deduplicates on primary keys (latest AEDAT wins), conforms currencies and
+dates, adds integer surrogate ids of the key columns (VBELN_SK, KUNNR_SK, ...)
+and writes partitioned Parquet to data/silver
+"""
+
+import os
+import json
+import shutil
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from sap_schema import get_columns, get_primary_key, iter_table_batches
+from data_catalog import catalog, locate
+from key_encoding import KeyEncoder
+from parquet_dataset import has_layout, swap_directory, write_partition_files
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+SILVER_DIR = os.path.join(DATA_DIR, 'silver')
+SPILL_DIR = os.path.join(SILVER_DIR, '_spill')
+REPORT_PATH = os.path.join(SILVER_DIR, '_silver_build.json')
+
+# Configuration
+BATCH_ROWS = 250_000
+NUM_BUCKETS = 16
+SINGLE_BUCKET_MB = 64        # smaller sources are deduplicated in one bucket
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+COMPRESSION = 'snappy'
+
+ROW_COLUMN = '_ROW'
+# Latest change date wins; creation date stands in for rows never changed
+VERSION_COLUMNS = ['AEDAT', 'ERDAT']
+MIN_DATE = date(1900, 1, 1)
+
+# Decimal places per currency (SAP TCURX); every other currency has 2
+CURRENCY_DECIMALS = {
+    'JPY': 0, 'KRW': 0, 'HUF': 0, 'CLP': 0, 'ISK': 0, 'VND': 0,
+    'KWD': 3, 'BHD': 3, 'OMR': 3, 'JOD': 3, 'TND': 3,
+}
+
+
+# ==================== SILVER TRANSFORMATIONS ====================
+
+def _sort_key(column):
+    """Sortable form of a column (dictionary codes sort by value)"""
+    return column.cast(pa.string()) if pa.types.is_dictionary(column.type) else column
+
+
+def deduplicate(table, table_name):
+    """Keep one row per primary key: latest AEDAT/ERDAT, then the last row extracted"""
+    primary_key = [c for c in get_primary_key(table_name) if c in table.column_names]
+    if not primary_key or table.num_rows == 0:
+        return table
+
+    version = None
+    for name in VERSION_COLUMNS:
+        if name in table.column_names:
+            version = table.column(name) if version is None else pc.coalesce(version, table.column(name))
+
+    keys = {f'k{i}': _sort_key(table.column(name)) for i, name in enumerate(primary_key)}
+    sort_keys = [(name, 'ascending') for name in keys]
+    if version is not None:
+        keys['version'] = version
+        sort_keys.append(('version', 'descending'))
+    keys[ROW_COLUMN] = table.column(ROW_COLUMN)
+    sort_keys.append((ROW_COLUMN, 'descending'))
+
+    # Nulls sort last, so rows without any version date lose to dated ones
+    indices = pc.sort_indices(pa.table(keys), sort_keys=sort_keys)
+    table = table.take(indices)
+
+    # First row of each key run is the surviving version
+    joined = pc.binary_join_element_wise(
+        *[_sort_key(table.column(name)).cast(pa.string()) for name in primary_key], '\x1f'
+    ).to_numpy(zero_copy_only=False)
+    keep = np.ones(table.num_rows, dtype=bool)
+    keep[1:] = joined[1:] != joined[:-1]
+    return table.filter(pa.array(keep))
+
+
+def conform_dates(table, table_name):
+    """Null out SAP placeholder dates before 1900 (00000000 already parses to null)"""
+    columns = get_columns(table_name)
+    for name, (column_type, _) in columns.items():
+        if column_type != 'DATS' or name not in table.column_names:
+            continue
+        column = table.column(name)
+        cleaned = pc.if_else(pc.less(column, pa.scalar(MIN_DATE, pa.date32())),
+                             pa.scalar(None, pa.date32()), column)
+        table = table.set_column(table.schema.get_field_index(name), name, cleaned)
+    return table
+
+
+def conform_currencies(table, table_name):
+    """Upper-case/trim currency keys and round amounts to each currency's decimals"""
+    columns = get_columns(table_name)
+    currency_columns = [n for n, (t, _) in columns.items() if t == 'CUKY' and n in table.column_names]
+    for name in currency_columns:
+        text = pc.utf8_upper(pc.utf8_trim_whitespace(table.column(name).cast(pa.string())))
+        table = table.set_column(table.schema.get_field_index(name), name, text.dictionary_encode())
+
+    amount_columns = [n for n, (t, _) in columns.items() if t == 'CURR' and n in table.column_names]
+    if not amount_columns:
+        return table
+
+    if currency_columns:
+        currency = table.column(currency_columns[0]).cast(pa.string())
+        special = pa.array(list(CURRENCY_DECIMALS))
+        lookup = pc.index_in(currency, value_set=special)
+        decimals = pc.fill_null(
+            pc.take(pa.array(list(CURRENCY_DECIMALS.values()), pa.int8()), lookup), 2
+        ).to_numpy(zero_copy_only=False)
+    else:
+        decimals = np.full(table.num_rows, 2, dtype=np.int8)
+
+    for name in amount_columns:
+        amounts = table.column(name)
+        rounded = pc.round(amounts, 2)
+        for places in set(np.unique(decimals)) - {2}:
+            rounded = pc.if_else(pa.array(decimals == places), pc.round(amounts, int(places)), rounded)
+        table = table.set_column(table.schema.get_field_index(name), name, rounded)
+    return table
+
+
+def build_bucket(table_name, spill_path, out_dir, bucket):
+    """Deduplicate, conform and write one hash bucket (runs in a worker process)"""
+    table = pq.read_table(spill_path)
+    rows_in = table.num_rows
+    table = deduplicate(table, table_name)
+    table = conform_currencies(conform_dates(table, table_name), table_name)
+    table = table.drop([ROW_COLUMN])
+
+    if has_layout(table_name):
+        files, _ = write_partition_files(table, table_name, out_dir, compression=COMPRESSION,
+                                         file_prefix=f'bucket-{bucket:03d}')
+    else:
+        os.makedirs(out_dir, exist_ok=True)
+        files = [os.path.join(out_dir, f'bucket-{bucket:03d}.parquet')]
+        pq.write_table(table, files[0], compression=COMPRESSION)
+
+    os.remove(spill_path)
+    return {'rows_in': rows_in, 'rows_out': table.num_rows, 'files': len(files)}
+
+
+class SilverBuilder:
+    """Build the silver layer from bronze SAP tables"""
+
+    def __init__(self, workers=MAX_WORKERS, batch_rows=BATCH_ROWS, num_buckets=NUM_BUCKETS):
+        self.workers = workers
+        self.batch_rows = batch_rows
+        self.num_buckets = num_buckets
+        self.table_stats = {}
+        self.keys = KeyEncoder()
+
+    def discover_sources(self, tables=None):
+        """Bronze source per SAP table from the catalog (freshest copy, Parquet when at least as new)"""
+        sources = {}
+        for table_name, entry in catalog().items():
+            if entry['area'] != 'sap' or (tables and table_name not in tables):
+                continue
+            sources[table_name] = {'path': locate(table_name), 'subdir': entry['subdir']}
+        return sources
+
+    def bucket_count(self, source_path):
+        """Hash buckets for a source so each bucket fits comfortably in memory"""
+        if os.path.getsize(source_path) < SINGLE_BUCKET_MB * 1024 * 1024:
+            return 1
+        return self.num_buckets
+
+    def spill_to_buckets(self, table_name, source_path, spill_dir, num_buckets):
+        """Stream the source and hash-partition rows by primary key into spill files"""
+        os.makedirs(spill_dir, exist_ok=True)
+        primary_key = get_primary_key(table_name)
+        writers = {}
+        rows_read = 0
+        try:
+            for batch in iter_table_batches(source_path, table_name, self.batch_rows):
+                row_ids = np.arange(rows_read, rows_read + batch.num_rows, dtype=np.int64)
+                batch = batch.append_column(ROW_COLUMN, pa.array(row_ids))
+                # Keys are encoded here, in one process, so ids stay consistent across buckets
+                batch = self.keys.add_surrogates(batch, extend=True)
+                rows_read += batch.num_rows
+
+                if num_buckets == 1:
+                    buckets = np.zeros(batch.num_rows, dtype=np.int64)
+                else:
+                    keys = batch.select([c for c in primary_key if c in batch.column_names]).to_pandas()
+                    buckets = (pd.util.hash_pandas_object(keys, index=False).to_numpy()
+                               % num_buckets).astype(np.int64)
+
+                for bucket in np.unique(buckets):
+                    part = batch if num_buckets == 1 else batch.filter(pa.array(buckets == bucket))
+                    if bucket not in writers:
+                        path = os.path.join(spill_dir, f'bucket-{bucket:03d}.parquet')
+                        writers[bucket] = (path, pq.ParquetWriter(path, part.schema, compression='lz4'))
+                    writers[bucket][1].write_table(part)
+        finally:
+            for _, writer in writers.values():
+                writer.close()
+        self.keys.save()
+        return rows_read, {bucket: path for bucket, (path, _) in writers.items()}
+
+    def build_all(self, tables=None):
+        """Spill each table, then deduplicate and write its buckets in parallel"""
+        print("="*80)
+        print("BRONZE → SILVER BUILD")
+        print("="*80)
+        print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Workers: {self.workers} | Batch rows: {self.batch_rows:,} | Max buckets: {self.num_buckets}")
+
+        sources = self.discover_sources(tables)
+        if not sources:
+            print("\nNo bronze tables found")
+            return
+
+        pending = {}
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # Spilling the next table overlaps with workers building the previous one
+            for table_name, source in sources.items():
+                start = time.perf_counter()
+                num_buckets = self.bucket_count(source['path'])
+                spill_dir = os.path.join(SPILL_DIR, table_name)
+                out_dir = os.path.join(SILVER_DIR, source['subdir'], table_name + '.__writing__')
+                shutil.rmtree(out_dir, ignore_errors=True)
+
+                rows_read, spill_files = self.spill_to_buckets(
+                    table_name, source['path'], spill_dir, num_buckets,
+                )
+                print(f"  Spilled {table_name:6s} {rows_read:10,} rows → {len(spill_files)} bucket(s) "
+                      f"from {os.path.relpath(source['path'], DATA_DIR)}")
+
+                futures = [
+                    executor.submit(build_bucket, table_name, path, out_dir, bucket)
+                    for bucket, path in spill_files.items()
+                ]
+                pending[table_name] = (source, out_dir, futures, rows_read, start)
+
+            print()
+            for table_name, (source, out_dir, futures, rows_read, start) in pending.items():
+                results = [f.result() for f in futures]
+                rows_out = sum(r['rows_out'] for r in results)
+                target_dir = os.path.join(SILVER_DIR, source['subdir'], table_name)
+                if results:
+                    swap_directory(out_dir, target_dir)
+                shutil.rmtree(os.path.join(SPILL_DIR, table_name), ignore_errors=True)
+
+                self.table_stats[table_name] = {
+                    'source': os.path.relpath(source['path'], DATA_DIR),
+                    'output': os.path.relpath(target_dir, DATA_DIR),
+                    'rows_read': rows_read,
+                    'duplicates_removed': rows_read - rows_out,
+                    'rows_written': rows_out,
+                    'buckets': len(results),
+                    'files': sum(r['files'] for r in results),
+                    'partitioned': has_layout(table_name),
+                    'seconds': round(time.perf_counter() - start, 3),
+                }
+                print(f"  ✓ {table_name:6s} {rows_out:10,} rows "
+                      f"({rows_read - rows_out:,} duplicates removed, "
+                      f"{self.table_stats[table_name]['files']} files)")
+
+        shutil.rmtree(SPILL_DIR, ignore_errors=True)
+        self.save_report()
+
+    def save_report(self):
+        """Write per-table build statistics next to the silver tables (partial builds merge)"""
+        os.makedirs(SILVER_DIR, exist_ok=True)
+        tables = {}
+        if os.path.exists(REPORT_PATH):
+            with open(REPORT_PATH) as f:
+                tables = json.load(f).get('tables', {})
+        tables.update(self.table_stats)
+        report = {
+            'built_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'tables': tables,
+        }
+        with open(REPORT_PATH, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    def print_summary(self):
+        """Print build summary"""
+        print("\n" + "="*80)
+        print("SILVER BUILD SUMMARY")
+        print("="*80)
+        total_read = sum(s['rows_read'] for s in self.table_stats.values())
+        total_written = sum(s['rows_written'] for s in self.table_stats.values())
+        print(f"\nTables Built: {len(self.table_stats)}")
+        print(f"Rows Read: {total_read:,}")
+        print(f"Duplicates Removed: {total_read - total_written:,}")
+        print(f"Rows Written: {total_written:,}")
+        print("Surrogate Keys: " + ' | '.join(f"{domain} {len(d):,}" for domain, d in self.keys.dictionaries.items()))
+        print(f"\n✓ Build report saved to: {os.path.relpath(REPORT_PATH, PROJECT_ROOT)}")
+        print(f"End Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Build the silver layer from bronze SAP tables')
+    parser.add_argument('tables', nargs='*', help='Tables to build (default: all)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Parallel worker processes (default {MAX_WORKERS})')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f'Rows per streamed batch (default {BATCH_ROWS:,})')
+    parser.add_argument('--buckets', type=int, default=NUM_BUCKETS,
+                        help=f'Hash buckets for large tables (default {NUM_BUCKETS})')
+    args = parser.parse_args()
+
+    builder = SilverBuilder(workers=args.workers, batch_rows=args.batch_rows, num_buckets=args.buckets)
+    builder.build_all(args.tables)
+    builder.print_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,553 @@
+"""
+Single-Pass Streaming Column Profiler
+Streams each table once in batches and keeps a fixed-size, mergeable sketch
+per column, then writes a profile artifact per table
+
+Per column:
+- count, nulls, min/max
+- distinct count: HyperLogLog (2^14 one-byte registers, ~0.8% standard error)
+- quantiles (numeric and date columns): KLL compactor sketch
+- heavy hitters: Misra-Gries summary (exact for columns with few distinct values)
+
+Sketches from different batches, row-group ranges, files and runs merge into
+the same result, so large tables are profiled in parallel with fixed memory.
+"""
+
+import os
+import json
+import base64
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as time_of_day, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from sap_schema import iter_table_batches
+from data_catalog import locate_tables
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+SILVER_DIR = os.path.join(PROJECT_ROOT, 'data', 'silver')
+PROFILE_DIR = os.path.join(PROJECT_ROOT, 'data', 'quality', 'profiles')
+
+# Configuration
+BATCH_ROWS = 250_000
+HLL_PRECISION = 14
+KLL_K = 200
+HEAVY_HITTERS = 32
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+UNIT_ROWS = 1_000_000         # Parquet rows per parallel work unit (whole row groups)
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+EPOCH = date(1970, 1, 1)
+
+
+# ==================== SKETCHES ====================
+
+def _bit_length(values):
+    """Bit length of uint64 values (exact: each 32-bit half converts to float64 without rounding)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes):
+        """Add uint64 hashes"""
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # A guard bit caps the rank at 64 - p + 1 when the remaining bits are all zero
+        remaining = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - _bit_length(remaining)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """Estimated distinct count (linear counting for small cardinalities)"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+    def state(self):
+        return {'precision': self.precision, 'registers': base64.b64encode(self.registers.tobytes()).decode()}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['precision'])
+        sketch.registers = np.frombuffer(base64.b64decode(state['registers']), dtype=np.uint8).copy()
+        return sketch
+
+
+class KLLSketch:
+    """KLL quantile sketch: a stack of compactors, level h items weigh 2^h"""
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        """Capacity shrinks by 2/3 per level below the top"""
+        depth = len(self.levels) - 1 - level
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        """Add float64 values"""
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self.compress()
+
+    def compress(self):
+        """Compact full levels: sort, keep every other item (random offset) at twice the weight"""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self.capacity(level):
+                level += 1
+                continue
+            items = np.sort(items)
+            keep = items[:1] if len(items) % 2 else items[:0]
+            items = items[len(keep):]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            promoted = items[self.rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Capacities depend on the number of levels; start again from the bottom
+            level = 0
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.compress()
+
+    def quantiles(self, qs):
+        """Approximate values at the given ranks"""
+        if self.n == 0:
+            return [None] * len(qs)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return [float(values[min(p, len(values) - 1)]) for p in positions]
+
+    def state(self):
+        return {'k': self.k, 'n': self.n, 'levels': [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['k'])
+        sketch.n = state['n']
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in state['levels']]
+        return sketch
+
+
+class HeavyHitters:
+    """Misra-Gries frequent-items summary (counts undercount by at most `error`)"""
+
+    def __init__(self, k=HEAVY_HITTERS):
+        self.k = k
+        self.counters = {}
+        self.error = 0
+
+    def _prune(self, values, counts):
+        """Keep at most k counters by subtracting the (k+1)-th largest count from all"""
+        if len(counts) <= self.k:
+            return values, counts, 0
+        threshold = np.partition(counts, -(self.k + 1))[-(self.k + 1)]
+        keep = counts > threshold
+        return values[keep], counts[keep] - threshold, int(threshold)
+
+    def update(self, array):
+        """Add the values of an Arrow array (nulls excluded)"""
+        if len(array) == 0:
+            return
+        value_counts = pc.value_counts(array)
+        # Prune on the counts before any value leaves Arrow
+        positions, counts, error = self._prune(np.arange(len(value_counts)), value_counts.field('counts').to_numpy())
+        self.error += error
+        values = value_counts.field('values').take(pa.array(positions)).to_pylist()
+        self._merge_counters(dict(zip(values, counts.tolist())))
+
+    def _merge_counters(self, counters):
+        merged = dict(self.counters)
+        for value, count in counters.items():
+            merged[value] = merged.get(value, 0) + count
+        values = np.asarray(list(merged), dtype=object)
+        counts = np.asarray(list(merged.values()), dtype=np.int64)
+        values, counts, error = self._prune(values, counts)
+        self.error += error
+        self.counters = dict(zip(values.tolist(), counts.tolist()))
+
+    def merge(self, other):
+        self.error += other.error
+        self._merge_counters(other.counters)
+
+    def top(self, n=10):
+        return sorted(self.counters.items(), key=lambda item: (-item[1], str(item[0])))[:n]
+
+    def frequent(self, n=10):
+        """Top values whose count exceeds the error bound (true frequent items)"""
+        return [(value, count) for value, count in self.top(n) if count > self.error]
+
+    def state(self):
+        return {'k': self.k, 'error': self.error, 'counters': [[v, c] for v, c in self.top(self.k)]}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['k'])
+        sketch.error = state['error']
+        sketch.counters = {v: c for v, c in state['counters']}
+        return sketch
+
+
+# ==================== PROFILES ====================
+
+def column_kind(arrow_type):
+    """numeric, date, timestamp, time, boolean or string"""
+    if pa.types.is_dictionary(arrow_type):
+        return 'string'
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        return 'numeric'
+    if pa.types.is_date(arrow_type):
+        return 'date'
+    if pa.types.is_timestamp(arrow_type):
+        return 'timestamp'
+    if pa.types.is_time(arrow_type):
+        return 'time'
+    if pa.types.is_boolean(arrow_type):
+        return 'boolean'
+    return 'string'
+
+
+def _jsonable(value):
+    """Python value for JSON (dates and times as ISO strings)"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
+
+
+class ColumnProfile:
+    """Counts, min/max and sketches of one column"""
+
+    def __init__(self, name, arrow_type):
+        self.name = name
+        self.type = str(arrow_type)
+        self.kind = column_kind(arrow_type)
+        self.unit = arrow_type.unit if self.kind == 'timestamp' else None
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.hll = HyperLogLog()
+        self.kll = KLLSketch() if self.kind in ('numeric', 'date', 'timestamp') else None
+        self.heavy_hitters = HeavyHitters() if self.kind != 'timestamp' else None
+
+    def update(self, array):
+        """Add one batch of the column"""
+        array = array.combine_chunks() if isinstance(array, pa.ChunkedArray) else array
+        self.nulls += array.null_count
+        valid = array.drop_null()
+        if len(valid) == 0:
+            return
+        self.count += len(valid)
+
+        if pa.types.is_dictionary(valid.type):
+            # Hash and bound the (small) dictionary once, gather by index
+            indices = valid.indices.to_numpy()
+            dictionary = valid.dictionary
+            bounds = pc.min_max(dictionary.take(pc.unique(valid.indices))).as_py()
+            hashes = pd.util.hash_array(dictionary.to_numpy(zero_copy_only=False))[indices]
+        else:
+            bounds = pc.min_max(valid).as_py()
+            if self.kind in ('date', 'timestamp', 'time'):
+                numbers = valid.cast(pa.int32() if valid.type.bit_width == 32 else pa.int64()).to_numpy()
+            else:
+                numbers = valid.to_numpy(zero_copy_only=False)
+            hashes = pd.util.hash_array(numbers)
+            if self.kll is not None:
+                self.kll.update(numbers.astype(np.float64))
+
+        if self.min is None or bounds['min'] < self.min:
+            self.min = bounds['min']
+        if self.max is None or bounds['max'] > self.max:
+            self.max = bounds['max']
+        self.hll.update(hashes)
+        if self.heavy_hitters is not None:
+            self.heavy_hitters.update(valid)
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        for bound in ('min', 'max'):
+            mine, theirs = getattr(self, bound), getattr(other, bound)
+            if mine is None or (theirs is not None and (theirs < mine if bound == 'min' else theirs > mine)):
+                setattr(self, bound, theirs)
+        self.hll.merge(other.hll)
+        if self.kll is not None and other.kll is not None:
+            self.kll.merge(other.kll)
+        if self.heavy_hitters is not None and other.heavy_hitters is not None:
+            self.heavy_hitters.merge(other.heavy_hitters)
+
+    def _from_number(self, value):
+        """Sketch value back in the column's domain (day numbers → dates)"""
+        if value is None:
+            return None
+        if self.kind == 'date':
+            return EPOCH + timedelta(days=int(round(value)))
+        if self.kind == 'timestamp':
+            return pd.Timestamp(int(value), unit=self.unit)
+        return value
+
+    def summary(self):
+        total = self.count + self.nulls
+        summary = {
+            'type': self.type,
+            'kind': self.kind,
+            'count': self.count,
+            'nulls': self.nulls,
+            'null_pct': round(self.nulls / total * 100, 3) if total else 0.0,
+            'distinct': min(self.hll.estimate(), self.count),
+            'min': _jsonable(self.min),
+            'max': _jsonable(self.max),
+        }
+        if self.kll is not None:
+            summary['quantiles'] = {
+                f'p{int(q * 100):02d}': _jsonable(self._from_number(v))
+                for q, v in zip(QUANTILES, self.kll.quantiles(QUANTILES))
+            }
+        if self.heavy_hitters is not None:
+            summary['top_values'] = [[_jsonable(v), c] for v, c in self.heavy_hitters.frequent(10)]
+            summary['top_values_max_error'] = self.heavy_hitters.error
+        return summary
+
+    def state(self):
+        return {
+            'name': self.name, 'type': self.type, 'kind': self.kind,
+            'count': self.count, 'nulls': self.nulls,
+            'min': _jsonable(self.min), 'max': _jsonable(self.max),
+            'hll': self.hll.state(),
+            'kll': self.kll.state() if self.kll is not None else None,
+            'heavy_hitters': self.heavy_hitters.state() if self.heavy_hitters is not None else None,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        column = cls.__new__(cls)
+        column.name, column.type, column.kind = state['name'], state['type'], state['kind']
+        column.unit = column.type.split('[')[1].split(']')[0].split(',')[0] if column.kind == 'timestamp' else None
+        column.count, column.nulls = state['count'], state['nulls']
+        parse = {'date': date.fromisoformat, 'timestamp': datetime.fromisoformat,
+                 'time': time_of_day.fromisoformat}.get(column.kind)
+        column.min, column.max = [
+            parse(v) if parse and v is not None else v for v in (state['min'], state['max'])
+        ]
+        column.hll = HyperLogLog.from_state(state['hll'])
+        column.kll = KLLSketch.from_state(state['kll']) if state['kll'] else None
+        column.heavy_hitters = HeavyHitters.from_state(state['heavy_hitters']) if state['heavy_hitters'] else None
+        if parse and column.heavy_hitters is not None:
+            column.heavy_hitters.counters = {parse(v): c for v, c in column.heavy_hitters.counters.items()}
+        return column
+
+
+class TableProfile:
+    """Column profiles of one table"""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, table):
+        """Add one batch"""
+        self.rows += table.num_rows
+        for field in table.schema:
+            if field.name not in self.columns:
+                self.columns[field.name] = ColumnProfile(field.name, field.type)
+            self.columns[field.name].update(table.column(field.name))
+
+    def merge(self, other):
+        self.rows += other.rows
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+        return self
+
+    def to_dict(self, sources=None, seconds=None):
+        return {
+            'table': self.table_name,
+            'profiled_at': datetime.now().isoformat(timespec='seconds'),
+            'sources': sources or [],
+            'seconds': seconds,
+            'rows': self.rows,
+            'columns': {name: column.summary() for name, column in self.columns.items()},
+            'sketches': {name: column.state() for name, column in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, profile_dict):
+        """Rebuild a mergeable profile from a saved artifact"""
+        profile = cls(profile_dict['table'])
+        profile.rows = profile_dict['rows']
+        profile.columns = {name: ColumnProfile.from_state(state) for name, state in profile_dict['sketches'].items()}
+        return profile
+
+
+# ==================== PROFILING ====================
+
+def profile_unit(path, table_name, row_groups=None, batch_rows=BATCH_ROWS):
+    """Profile one work unit: a CSV file, a Parquet file or a range of its row groups"""
+    profile = TableProfile(table_name)
+    for batch in iter_table_batches(path, table_name, batch_rows, row_groups=row_groups):
+        profile.update(batch)
+    return profile
+
+
+def work_units(paths, unit_rows=UNIT_ROWS):
+    """(path, row groups) units: Parquet files split into row-group ranges of ~unit_rows, CSV files whole"""
+    units = []
+    for path in paths:
+        if not path.endswith('.parquet'):
+            units.append((path, None))
+            continue
+        metadata = pq.ParquetFile(path).metadata
+        row_groups, rows = [], 0
+        for index in range(metadata.num_row_groups):
+            row_groups.append(index)
+            rows += metadata.row_group(index).num_rows
+            if rows >= unit_rows:
+                units.append((path, row_groups))
+                row_groups, rows = [], 0
+        if row_groups or metadata.num_row_groups == 0:
+            units.append((path, row_groups))
+    return units
+
+
+def profile_table(table_name, paths, workers=MAX_WORKERS, batch_rows=BATCH_ROWS):
+    """Profile a table's files in parallel and merge the unit profiles"""
+    units = work_units(paths)
+    profile = TableProfile(table_name)
+    if workers <= 1 or len(units) == 1:
+        for path, row_groups in units:
+            profile.merge(profile_unit(path, table_name, row_groups, batch_rows))
+        return profile
+    with ProcessPoolExecutor(max_workers=min(workers, len(units))) as pool:
+        futures = [pool.submit(profile_unit, path, table_name, row_groups, batch_rows)
+                   for path, row_groups in units]
+        for future in futures:
+            profile.merge(future.result())
+    return profile
+
+
+def silver_tables():
+    """Silver table → Parquet files (a table is the directory above its key=value partitions)"""
+    tables = {}
+    for root, dirs, files in os.walk(SILVER_DIR):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('_', '.')) and not d.endswith('.__writing__'))
+        for name in sorted(f for f in files if f.endswith('.parquet')):
+            table_dir = root
+            while '=' in os.path.basename(table_dir):
+                table_dir = os.path.dirname(table_dir)
+            tables.setdefault(os.path.basename(table_dir), []).append(os.path.join(root, name))
+    return tables
+
+
+def save_profile(profile_dict, profile_dir=PROFILE_DIR):
+    """Write <TABLE>.profile.json"""
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, f"{profile_dict['table']}.profile.json")
+    with open(path, 'w') as f:
+        json.dump(profile_dict, f, indent=1, default=str)
+    return path
+
+
+def load_profile(path):
+    """TableProfile from a <TABLE>.profile.json artifact"""
+    with open(path) as f:
+        return TableProfile.from_dict(json.load(f))
+
+
+def print_profile(profile_dict):
+    """Print one line per column"""
+    print(f"\n{profile_dict['table']}: {profile_dict['rows']:,} rows | {profile_dict['seconds']:.2f}s")
+    print(f"  {'Column':22s} {'Kind':9s} {'Nulls':>7s} {'Distinct':>9s}  {'Min':>12s}  {'Median':>12s}  "
+          f"{'Max':>12s}  Top")
+    for name, c in profile_dict['columns'].items():
+        median = (c.get('quantiles') or {}).get('p50')
+        top = ', '.join(f"{v}({n})" for v, n in (c.get('top_values') or [])[:3])
+        print(f"  {name[:22]:22s} {c['kind']:9s} {c['null_pct']:6.1f}% {c['distinct']:9,}  "
+              f"{str(c['min'])[:12]:>12s}  {str(median if median is not None else '')[:12]:>12s}  "
+              f"{str(c['max'])[:12]:>12s}  {top[:40]}")
+
+
+def main():
+    """Profile tables in a single streaming pass"""
+    parser = argparse.ArgumentParser(description='Single-pass streaming column profiler')
+    parser.add_argument('tables', nargs='*', help='Tables to profile (default: all)')
+    parser.add_argument('--silver', action='store_true', help='Profile data/silver instead of bronze/raw')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f'Parallel work units (default {MAX_WORKERS})')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f'Rows per streamed batch (default {BATCH_ROWS:,})')
+    args = parser.parse_args()
+
+    if args.silver:
+        sources = silver_tables()
+    else:
+        sources = {name: [path] for name, path in locate_tables().items()}
+    names = args.tables or sorted(sources)
+
+    print("="*80)
+    print("COLUMN PROFILER")
+    print("="*80)
+    print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Sketches: HLL p={HLL_PRECISION} | KLL k={KLL_K} | Misra-Gries k={HEAVY_HITTERS} | "
+          f"{args.workers} workers")
+
+    for name in names:
+        if name not in sources:
+            print(f"\n{name}: not found")
+            continue
+        start = time.perf_counter()
+        profile = profile_table(name, sources[name], args.workers, args.batch_rows)
+        profile_dict = profile.to_dict(
+            sources=[os.path.relpath(p, PROJECT_ROOT) for p in sources[name]],
+            seconds=time.perf_counter() - start,
+        )
+        print_profile(profile_dict)
+        path = save_profile(profile_dict)
+        print(f"  ✓ {os.path.relpath(path, PROJECT_ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
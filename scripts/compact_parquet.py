@@ -0,0 +1,291 @@
+"""
+Small-File Compaction for Parquet Outputs
+Merges small Parquet files per table or partition up to a target size,
+re-sorted by the table's clustering key, and swaps them in atomically
+
+Compaction units:
+- table/partition directories (VBAK/ERDAT_MONTH=2025-09/, silver bucket dirs):
+  all Parquet files in the directory
+- flat folders (raw/cross_reference): <TABLE>.parquet plus appended
+  fragments named <TABLE>__<suffix>.parquet
+
+Only files below the small-file size are merged. Compacted files keep the page
+indexes and key-column Bloom filters of converted files, and a rewritten
+converted <TABLE>.parquet is recorded in the conversion manifest so the next
+conversion does not redo it.
+"""
+
+import os
+import json
+import shutil
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sap_schema import conform_table, has_schema, key_index_options
+from data_catalog import RAW_DIR
+from parquet_dataset import cluster_columns, sort_table, swap_directory
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+DEFAULT_ROOTS = [os.path.join(DATA_DIR, 'raw'), os.path.join(DATA_DIR, 'silver')]
+REPORT_PATH = os.path.join(PROJECT_ROOT, 'compaction_report.csv')
+RECOMMENDATIONS_PATH = os.path.join(DATA_DIR, 'benchmark', 'compression_recommendations.json')
+
+# Configuration
+TARGET_FILE_MB = 128
+SMALL_FILE_MB = 32           # files below this are merged
+DEFAULT_ROW_GROUP_ROWS = 131072
+DEFAULT_COMPRESSION = 'snappy'
+FRAGMENT_SEPARATOR = '__'
+
+
+def table_for_directory(directory):
+    """Registry table a directory belongs to (walking up through key=value partitions)"""
+    current = os.path.abspath(directory)
+    while True:
+        name = os.path.basename(current)
+        if '=' not in name:
+            return name if has_schema(name) else None
+        current = os.path.dirname(current)
+
+
+def table_for_file(file_name):
+    """Registry table of a flat file (<TABLE>.parquet or <TABLE>__<suffix>.parquet)"""
+    stem = os.path.splitext(file_name)[0].split(FRAGMENT_SEPARATOR)[0]
+    return stem if has_schema(stem) else None
+
+
+class ParquetCompactor:
+    """Merge small Parquet files up to a target size"""
+
+    def __init__(self, target_file_mb=TARGET_FILE_MB, small_file_mb=SMALL_FILE_MB, dry_run=False):
+        self.target_bytes = target_file_mb * 1024 * 1024
+        self.small_bytes = small_file_mb * 1024 * 1024
+        self.dry_run = dry_run
+        self.recommendations = self.load_recommendations()
+        self.report = []
+
+    def load_recommendations(self):
+        """Per-table codec/row-group settings from convert_to_parquet.py --benchmark, if run"""
+        if os.path.exists(RECOMMENDATIONS_PATH):
+            with open(RECOMMENDATIONS_PATH) as f:
+                return json.load(f)
+        return {}
+
+    def write_settings(self, table_name):
+        """Codec and row-group size for a table's compacted files"""
+        recommended = self.recommendations.get(table_name, {})
+        codec = recommended.get('compression', DEFAULT_COMPRESSION)
+        settings = {'row_group_size': recommended.get('row_group_size', DEFAULT_ROW_GROUP_ROWS)}
+        if '-' in codec:
+            codec, level = codec.split('-')
+            settings['compression_level'] = int(level)
+        settings['compression'] = codec
+        return settings
+
+    # ==================== DISCOVERY ====================
+
+    def find_units(self, roots):
+        """Compaction units: (table, directory, files, flat) under each root"""
+        units = []
+        for root in roots:
+            if not os.path.exists(root):
+                continue
+            for directory, dirs, files in os.walk(root):
+                # Skip directories mid-write or mid-swap and hidden folders (_spill)
+                dirs[:] = sorted(d for d in dirs if '.__' not in d and not d.startswith(('_', '.')))
+                parquet_files = sorted(f for f in files if f.endswith('.parquet'))
+                if not parquet_files:
+                    continue
+
+                table_name = table_for_directory(directory)
+                if table_name:
+                    units.append((table_name, directory, parquet_files, False))
+                    continue
+
+                groups = defaultdict(list)
+                for file_name in parquet_files:
+                    name = table_for_file(file_name)
+                    if name:
+                        groups[name].append(file_name)
+                for name, group in sorted(groups.items()):
+                    units.append((name, directory, group, True))
+        return units
+
+    def plan_bins(self, paths):
+        """Group small files into bins of about the target size (large files stay as they are)"""
+        small = [p for p in paths if os.path.getsize(p) < self.small_bytes]
+        bins = []
+        current, current_bytes = [], 0
+        for path in small:
+            size = os.path.getsize(path)
+            if current and current_bytes + size > self.target_bytes:
+                bins.append(current)
+                current, current_bytes = [], 0
+            current.append(path)
+            current_bytes += size
+        if current:
+            bins.append(current)
+        # A bin of one file gains nothing from a rewrite
+        return [b for b in bins if len(b) > 1]
+
+    # ==================== COMPACTION ====================
+
+    def merge_files(self, table_name, paths, output_path):
+        """Read, conform, sort and rewrite a bin of files as one file"""
+        tables = [conform_table(pq.read_table(p), table_name) for p in paths]
+        merged = pa.concat_tables(tables, promote_options='default').combine_chunks().unify_dictionaries()
+        sort_by = [c for c in cluster_columns(table_name) if c in merged.column_names]
+        if sort_by:
+            merged = sort_table(merged, sort_by)
+        settings = self.write_settings(table_name)
+        pq.write_table(merged, output_path, **settings,
+                       **key_index_options(table_name, merged.num_rows, settings['row_group_size']))
+        return merged.num_rows
+
+    def compact_directory(self, table_name, directory, paths, bins):
+        """Rebuild a partition directory beside the original and swap it in"""
+        new_dir = directory + '.__compacting__'
+        shutil.rmtree(new_dir, ignore_errors=True)
+        os.makedirs(new_dir)
+        merged = {p for b in bins for p in b}
+
+        # Untouched files are hard-linked (copied where links are unsupported)
+        for path in paths:
+            if path in merged:
+                continue
+            target = os.path.join(new_dir, os.path.basename(path))
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copy2(path, target)
+        for i, bin_paths in enumerate(bins):
+            self.merge_files(table_name, bin_paths, os.path.join(new_dir, f'compacted-{i:05d}.parquet'))
+
+        swap_directory(new_dir, directory)
+        return [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.parquet')]
+
+    def compact_flat(self, table_name, directory, paths, bins):
+        """Merge each bin of a flat table's file and appended fragments into one file
+
+        A bin holding <TABLE>.parquet is merged into it; a bin of fragments only
+        becomes one new fragment.
+        """
+        main_path = os.path.join(directory, f'{table_name}.parquet')
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        for i, bin_paths in enumerate(bins):
+            output_path = (main_path if main_path in bin_paths else
+                           os.path.join(directory, f'{table_name}{FRAGMENT_SEPARATOR}compacted-{stamp}-{i:05d}.parquet'))
+            tmp_path = output_path + '.tmp'
+            rows = self.merge_files(table_name, bin_paths, tmp_path)
+            # The output switches atomically; fragments are only removed once it holds their rows
+            os.replace(tmp_path, output_path)
+            for path in bin_paths:
+                if path != output_path:
+                    os.remove(path)
+            if output_path == main_path:
+                self.record_conversion(main_path, rows)
+        return sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                      if f.endswith('.parquet') and table_for_file(f) == table_name)
+
+    def record_conversion(self, parquet_path, rows):
+        """Point the conversion manifest at a rewritten converted file, so it is not reconverted"""
+        from convert_to_parquet import CSVToParquetConverter
+        csv_path = os.path.splitext(parquet_path)[0] + '.csv'
+        if os.path.commonpath([os.path.abspath(parquet_path), RAW_DIR]) != RAW_DIR:
+            return
+        converter = CSVToParquetConverter()
+        entry = converter.manifest['files'].get(os.path.relpath(csv_path, RAW_DIR))
+        if entry is None:
+            return
+        entry['parquet'] = converter.file_fingerprint(parquet_path)
+        entry['rows'] = rows
+        converter.save_manifest()
+
+    def compact_unit(self, table_name, directory, files, flat):
+        """Compact one table or partition and record before/after sizes"""
+        paths = [os.path.join(directory, f) for f in files]
+        before_bytes = sum(os.path.getsize(p) for p in paths)
+        bins = self.plan_bins(paths)
+        if not bins:
+            return
+
+        rel_dir = os.path.relpath(directory, DATA_DIR)
+        print(f"  {table_name:28s} {rel_dir:60s} {len(paths):4d} files", end=' ')
+        if self.dry_run:
+            print(f"→ would merge {sum(len(b) for b in bins)} files into {len(bins)}")
+            return
+
+        if flat:
+            after_paths = self.compact_flat(table_name, directory, paths, bins)
+        else:
+            after_paths = self.compact_directory(table_name, directory, paths, bins)
+        after_bytes = sum(os.path.getsize(p) for p in after_paths)
+        print(f"→ {len(after_paths):4d} files ({before_bytes / 1024:,.0f}KB → {after_bytes / 1024:,.0f}KB)")
+
+        self.report.append({
+            'table': table_name,
+            'path': rel_dir,
+            'files_before': len(paths),
+            'files_after': len(after_paths),
+            'bytes_before': before_bytes,
+            'bytes_after': after_bytes,
+        })
+
+    def compact_all(self, roots):
+        """Compact every unit with small files under the given roots"""
+        print("="*80)
+        print("PARQUET SMALL-FILE COMPACTION")
+        print("="*80)
+        print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Target: {self.target_bytes // (1024 * 1024)}MB files | "
+              f"Small: < {self.small_bytes // (1024 * 1024)}MB"
+              f"{' | DRY RUN' if self.dry_run else ''}\n")
+
+        for table_name, directory, files, flat in self.find_units(roots):
+            self.compact_unit(table_name, directory, files, flat)
+
+    def print_summary(self):
+        """Print files and bytes before and after"""
+        print("\n" + "="*80)
+        print("COMPACTION SUMMARY")
+        print("="*80)
+        if not self.report:
+            print("\nNothing compacted")
+            return
+
+        report = pd.DataFrame(self.report)
+        print(f"\nUnits Compacted: {len(report)}")
+        print(f"Files: {report['files_before'].sum():,} → {report['files_after'].sum():,}")
+        print(f"Size: {report['bytes_before'].sum() / (1024 * 1024):.2f}MB → "
+              f"{report['bytes_after'].sum() / (1024 * 1024):.2f}MB")
+        report.to_csv(REPORT_PATH, index=False)
+        print(f"\n✓ Detailed report saved to: {os.path.basename(REPORT_PATH)}")
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Compact small Parquet files')
+    parser.add_argument('roots', nargs='*', default=DEFAULT_ROOTS,
+                        help='Directories to compact (default: data/raw and data/silver)')
+    parser.add_argument('--target-mb', type=int, default=TARGET_FILE_MB,
+                        help=f'Target output file size in MB (default {TARGET_FILE_MB})')
+    parser.add_argument('--small-mb', type=int, default=SMALL_FILE_MB,
+                        help=f'Files below this size are merged (default {SMALL_FILE_MB})')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would be merged')
+    args = parser.parse_args()
+
+    compactor = ParquetCompactor(args.target_mb, args.small_mb, args.dry_run)
+    compactor.compact_all(args.roots)
+    compactor.print_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,52 +5,206 @@ Maintains folder structure and creates Parquet files in same directories
 
 import pandas as pd
 import os
+import glob
+import argparse
+import hashlib
+import json
+import shutil
+import tempfile
+import time
 from pathlib import Path
 from datetime import datetime
-import pyarrow as pa
 import pyarrow.parquet as pq
 
+from sap_schema import (
+    FLOAT_TYPES, SCHEMA_VERSION, get_columns, get_primary_key, has_schema,
+    SUPPORTS_KEY_INDEXES, ipc_path_for, key_index_options,
+    read_csv_table, read_parquet_table, write_ipc, write_parquet,
+)
+from arrow_ipc import DEFAULT_IPC_COMPRESSION, IPC_COMPRESSIONS, has_ipc_copy
+from data_catalog import BRONZE_DIR, RAW_DIR
+from parquet_dataset import (
+    DATASET_MIN_ROWS, DEFAULT_ROW_GROUP_ROWS, DEFAULT_TARGET_FILE_MB,
+    dataset_dir_for, has_layout, write_partitioned_dataset,
+)
+
 # Configuration
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw')
+# Landed CSVs are converted in place (data/raw, as laid out by the table catalog)
+DATA_DIR = RAW_DIR
+MANIFEST_PATH = os.path.join(DATA_DIR, '_conversion_manifest.json')
+COMPRESSION = 'snappy'
+# Smaller row groups let key statistics and Bloom filters skip more of a file
+ROW_GROUP_ROWS = 65536
+
+# Benchmark grid: (codec, level) × dictionary encoding × row-group size
+BENCHMARK_CODECS = [
+    ('snappy', None), ('zstd', 1), ('zstd', 3), ('zstd', 9),
+    ('lz4', None), ('gzip', None), ('none', None),
+]
+BENCHMARK_DICTIONARY = [True, False]
+BENCHMARK_ROW_GROUPS = [16384, 65536, 262144]
+BENCHMARK_REPEATS = 3
+# Query mix is read-heavy: weights for read time, file size and write time
+BENCHMARK_WEIGHTS = {'read': 0.5, 'size': 0.3, 'write': 0.2}
+BENCHMARK_DIR = os.path.join(PROJECT_ROOT, 'data', 'benchmark')
+BENCHMARK_REPORT = os.path.join(BENCHMARK_DIR, 'compression_benchmark.csv')
+BENCHMARK_RECOMMENDATIONS = os.path.join(BENCHMARK_DIR, 'compression_recommendations.json')
 
 
 class CSVToParquetConverter:
     """Convert all CSV files to Parquet format"""
 
-    def __init__(self):
+    def __init__(self, force=False, dataset=False, by_vkorg=False,
+                 target_file_mb=DEFAULT_TARGET_FILE_MB, row_group_rows=DEFAULT_ROW_GROUP_ROWS,
+                 ipc=True, ipc_compression=DEFAULT_IPC_COMPRESSION):
+        self.force = force
+        self.ipc = ipc
+        self.ipc_compression = ipc_compression
+        self.ipc_written = 0
+        self.dataset = dataset
+        self.by_vkorg = by_vkorg
+        self.target_file_mb = target_file_mb
+        self.row_group_rows = row_group_rows
+        self.datasets_written = 0
         self.conversion_stats = []
         self.total_files = 0
+        self.skipped_files = 0
         self.total_csv_size = 0
         self.total_parquet_size = 0
+        self.manifest = self.load_manifest()
+        self.seen_files = set()
 
     def get_file_size_mb(self, file_path):
         """Get file size in MB"""
         return os.path.getsize(file_path) / (1024 * 1024)
 
+    # ==================== CONVERSION MANIFEST ====================
+
+    def load_manifest(self):
+        """Load the manifest of previously converted files"""
+        if os.path.exists(MANIFEST_PATH):
+            with open(MANIFEST_PATH) as f:
+                manifest = json.load(f)
+            manifest.setdefault('datasets', {})
+            manifest.setdefault('ipc', {})
+            return manifest
+        return {'files': {}, 'datasets': {}, 'ipc': {}}
+
+    def save_manifest(self):
+        """Write the manifest atomically, dropping files that no longer exist"""
+        self.manifest['files'] = {
+            rel: entry for rel, entry in self.manifest['files'].items()
+            if os.path.exists(os.path.join(DATA_DIR, rel))
+        }
+        self.manifest['datasets'] = {
+            rel: entry for rel, entry in self.manifest['datasets'].items()
+            if os.path.isdir(dataset_dir_for(os.path.join(DATA_DIR, rel)))
+        }
+        self.manifest['ipc'] = {
+            rel: entry for rel, entry in self.manifest['ipc'].items()
+            if os.path.exists(ipc_path_for(os.path.join(DATA_DIR, rel)))
+        }
+        self.manifest['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        tmp_path = MANIFEST_PATH + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, MANIFEST_PATH)
+
+    def file_sha256(self, file_path, chunk_size=1 << 20):
+        """Content hash of a file, streamed in 1MB chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def file_fingerprint(self, file_path, content_hash=None):
+        """Size, mtime and content hash of a file"""
+        stat = os.stat(file_path)
+        return {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': content_hash or self.file_sha256(file_path),
+        }
+
+    def conversion_settings(self):
+        """Settings that change the Parquet output when they change"""
+        return {
+            'schema_version': SCHEMA_VERSION,
+            'compression': COMPRESSION,
+            'row_group_rows': ROW_GROUP_ROWS,
+            'key_indexes': SUPPORTS_KEY_INDEXES,
+        }
+
+    def is_up_to_date(self, csv_path, parquet_path):
+        """Check whether a CSV's Parquet output is current (cheap stat first, hash on doubt)"""
+        entry = self.manifest['files'].get(os.path.relpath(csv_path, DATA_DIR))
+        if self.force or entry is None or not os.path.exists(parquet_path):
+            return False
+        if entry.get('settings') != self.conversion_settings():
+            return False
+
+        parquet_stat = os.stat(parquet_path)
+        output = entry['parquet']
+        if parquet_stat.st_size != output['size'] or parquet_stat.st_mtime_ns != output['mtime_ns']:
+            return False
+
+        csv_stat = os.stat(csv_path)
+        source = entry['csv']
+        if csv_stat.st_size != source['size']:
+            return False
+        if csv_stat.st_mtime_ns != source['mtime_ns']:
+            # Regenerated file: only reconvert when the content actually changed
+            if self.file_sha256(csv_path) != source['sha256']:
+                return False
+            source['mtime_ns'] = csv_stat.st_mtime_ns
+        return True
+
+    def record_conversion(self, csv_path, parquet_path, row_count):
+        """Record source and output fingerprints for a converted file"""
+        self.manifest['files'][os.path.relpath(csv_path, DATA_DIR)] = {
+            'csv': self.file_fingerprint(csv_path),
+            'parquet': self.file_fingerprint(parquet_path),
+            'rows': row_count,
+            'settings': self.conversion_settings(),
+            'converted_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def land_bronze(self):
+        """Copy generated SAP CSVs from data/bronze into data/raw/sap when the bronze file is newer"""
+        landed = 0
+        for path in glob.glob(os.path.join(BRONZE_DIR, '**', '*.csv'), recursive=True):
+            target = os.path.join(DATA_DIR, 'sap', os.path.relpath(path, BRONZE_DIR))
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(path, target)
+            landed += 1
+        if landed:
+            print(f"✓ Landed {landed} bronze SAP files into {os.path.relpath(os.path.join(DATA_DIR, 'sap'), PROJECT_ROOT)}")
+        return landed
+
     def convert_csv_to_parquet(self, csv_path, parquet_path):
         """Convert single CSV file to Parquet"""
         try:
-            # Read CSV
-            df = pd.read_csv(csv_path)
-
-            # Convert to Parquet with compression
-            df.to_parquet(
-                parquet_path,
-                engine='pyarrow',
-                compression='snappy',
-                index=False
-            )
+            # Read CSV with registry types (zero-padded keys, dates, dictionary codes)
+            table = read_csv_table(csv_path)
 
-            return True, len(df)
+            # Convert to Parquet with compression, page indexes and Bloom filters on key columns
+            table_name = os.path.splitext(os.path.basename(csv_path))[0]
+            write_parquet(table, parquet_path, compression=COMPRESSION, row_group_size=ROW_GROUP_ROWS,
+                          **key_index_options(table_name, table.num_rows, ROW_GROUP_ROWS))
+
+            return True, table.num_rows
         except Exception as e:
             print(f"    ✗ Error converting {csv_path}: {str(e)}")
             return False, 0
 
     def convert_directory(self, directory):
-        """Convert all CSV files in a directory"""
-        csv_files = list(Path(directory).rglob('*.csv'))
+        """Convert the CSV files directly inside a directory (subdirectories are walked separately)"""
+        csv_files = sorted(Path(directory).glob('*.csv'))
 
         if not csv_files:
             return
@@ -60,13 +214,23 @@ class CSVToParquetConverter:
 
         for csv_file in csv_files:
             csv_path = str(csv_file)
-            parquet_path = csv_path.replace('.csv', '.parquet')
+            parquet_path = csv_path[:-len('.csv')] + '.parquet'
+
+            # Each file is converted at most once per run
+            if csv_path in self.seen_files:
+                continue
+            self.seen_files.add(csv_path)
 
             # Get file sizes
             csv_size = self.get_file_size_mb(csv_path)
+            file_name = os.path.basename(csv_path)
+
+            if self.is_up_to_date(csv_path, parquet_path):
+                print(f"  Skipping {file_name} (unchanged)")
+                self.skipped_files += 1
+                continue
 
             # Convert
-            file_name = os.path.basename(csv_path)
             print(f"  Converting {file_name}...", end=' ')
 
             success, row_count = self.convert_csv_to_parquet(csv_path, parquet_path)
@@ -90,6 +254,284 @@ class CSVToParquetConverter:
                 self.total_csv_size += csv_size
                 self.total_parquet_size += parquet_size
 
+                self.record_conversion(csv_path, parquet_path, row_count)
+
+    def merged_stats(self, stats_file):
+        """This run's stats merged into the previous stats file (rows of deleted CSVs dropped)"""
+        stats = pd.DataFrame(self.conversion_stats)
+        if os.path.exists(stats_file):
+            previous = pd.read_csv(stats_file)
+            if 'path' in previous.columns:
+                previous = previous[~previous['path'].isin(stats['path'])
+                                    & previous['path'].map(lambda rel: os.path.exists(os.path.join(DATA_DIR, rel)))]
+                stats = pd.concat([previous, stats], ignore_index=True)
+        return stats.sort_values('path').reset_index(drop=True)
+
+    # ==================== PARTITIONED DATASETS ====================
+
+    def dataset_settings(self):
+        """Settings that change the partitioned dataset layout when they change"""
+        return {
+            'schema_version': SCHEMA_VERSION,
+            'compression': COMPRESSION,
+            'by_vkorg': self.by_vkorg,
+            'target_file_mb': self.target_file_mb,
+            'row_group_rows': self.row_group_rows,
+        }
+
+    def build_dataset(self, parquet_path):
+        """Rewrite a transactional table as a partitioned dataset if its Parquet file changed"""
+        table_name = os.path.splitext(os.path.basename(parquet_path))[0]
+        dataset_dir = dataset_dir_for(parquet_path)
+        rel_path = os.path.relpath(parquet_path, DATA_DIR)
+        stat = os.stat(parquet_path)
+        source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        entry = self.manifest['datasets'].get(rel_path)
+        if (not self.force and entry is not None and os.path.isdir(dataset_dir)
+                and entry['parquet'] == source and entry['settings'] == self.dataset_settings()):
+            print(f"  Skipping {table_name}/ (unchanged)")
+            return
+
+        print(f"  Partitioning {table_name}...", end=' ')
+        try:
+            table = read_parquet_table(parquet_path, table_name)
+            result = write_partitioned_dataset(
+                table, table_name, dataset_dir,
+                by_vkorg=self.by_vkorg,
+                target_file_mb=self.target_file_mb,
+                row_group_rows=self.row_group_rows,
+                compression=COMPRESSION,
+            )
+        except Exception as e:
+            print(f"✗ Error: {str(e)}")
+            return
+
+        print(f"✓ ({result['rows']:,} rows, {result['partitions']} partitions, "
+              f"{result['files']} files, {result['bytes'] / (1024 * 1024):.2f}MB)")
+        if result['rows'] < DATASET_MIN_ROWS:
+            print(f"    ⚠ Below {DATASET_MIN_ROWS:,} rows the flat file scans faster "
+                  f"(python scripts/parquet_dataset.py {table_name})")
+        self.datasets_written += 1
+        self.manifest['datasets'][rel_path] = {
+            'parquet': source,
+            'partitions': result['partitions'],
+            'files': result['files'],
+            'settings': self.dataset_settings(),
+            'written_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def build_datasets(self):
+        """Partition every transactional table that has a dataset layout"""
+        transactional_dir = os.path.join(DATA_DIR, 'sap', 'transactional')
+        if not os.path.exists(transactional_dir):
+            return
+
+        print("\n" + "="*80)
+        print("PARTITIONED DATASETS")
+        print("="*80)
+        for parquet_file in sorted(Path(transactional_dir).glob('*/*.parquet')):
+            if has_layout(parquet_file.stem):
+                self.build_dataset(str(parquet_file))
+
+    # ==================== ARROW IPC COPIES ====================
+
+    def build_ipc_copy(self, parquet_path):
+        """Write a memory-mappable Arrow IPC copy of a Parquet file if it changed"""
+        table_name = os.path.splitext(os.path.basename(parquet_path))[0]
+        ipc_path = ipc_path_for(parquet_path)
+        rel_path = os.path.relpath(parquet_path, DATA_DIR)
+        stat = os.stat(parquet_path)
+        source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        settings = {'schema_version': SCHEMA_VERSION, 'compression': self.ipc_compression}
+
+        entry = self.manifest['ipc'].get(rel_path)
+        if (not self.force and entry is not None and os.path.exists(ipc_path)
+                and entry['parquet'] == source and entry['settings'] == settings):
+            print(f"  Skipping {table_name}.arrow (unchanged)")
+            return
+
+        print(f"  Writing {table_name}.arrow...", end=' ')
+        try:
+            table = write_ipc(read_parquet_table(parquet_path, table_name), ipc_path,
+                              table_name, compression=self.ipc_compression)
+        except Exception as e:
+            print(f"✗ Error: {str(e)}")
+            return
+
+        print(f"✓ ({table.num_rows:,} rows, {self.get_file_size_mb(ipc_path):.2f}MB)")
+        self.ipc_written += 1
+        self.manifest['ipc'][rel_path] = {
+            'parquet': source,
+            'settings': settings,
+            'written_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def build_ipc_copies(self):
+        """Arrow IPC copies of the most-read tables (including Parquet-only ones like VBAP)"""
+        print("\n" + "="*80)
+        print(f"ARROW IPC COPIES ({self.ipc_compression or 'uncompressed'})")
+        print("="*80)
+        for parquet_file in sorted(Path(DATA_DIR).rglob('*.parquet')):
+            if has_ipc_copy(parquet_file.stem):
+                self.build_ipc_copy(str(parquet_file))
+
+    # ==================== COMPRESSION BENCHMARK ====================
+
+    def benchmark_projection(self, table, table_name):
+        """Columns a typical query reads: primary key plus the first amount/quantity column"""
+        if not has_schema(table_name):
+            return table.column_names[:2]
+        columns = [c for c in get_primary_key(table_name) if c in table.column_names]
+        measures = [
+            name for name, (column_type, _) in get_columns(table_name).items()
+            if column_type in FLOAT_TYPES and name in table.column_names
+        ]
+        return columns + measures[:1] or table.column_names[:2]
+
+    def time_call(self, func):
+        """Best-of-N wall time for a call"""
+        best = float('inf')
+        for _ in range(BENCHMARK_REPEATS):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def benchmark_setting(self, table, path, codec, level, use_dictionary, row_group_size, projection):
+        """Write and read back one table with one setting"""
+        write_kwargs = {
+            'compression': codec,
+            'use_dictionary': use_dictionary,
+            'row_group_size': row_group_size,
+        }
+        if level is not None:
+            write_kwargs['compression_level'] = level
+
+        write_time = self.time_call(lambda: pq.write_table(table, path, **write_kwargs))
+        full_scan_time = self.time_call(lambda: pq.read_table(path))
+        projected_time = self.time_call(lambda: pq.read_table(path, columns=projection))
+
+        data_mb = table.nbytes / (1024 * 1024)
+        return {
+            'codec': codec if level is None else f'{codec}-{level}',
+            'dictionary': use_dictionary,
+            'row_group_size': row_group_size,
+            'file_size_mb': self.get_file_size_mb(path),
+            'write_mb_s': data_mb / write_time if write_time > 0 else 0,
+            'read_mb_s': data_mb / full_scan_time if full_scan_time > 0 else 0,
+            'write_ms': write_time * 1000,
+            'full_scan_ms': full_scan_time * 1000,
+            'projected_ms': projected_time * 1000,
+        }
+
+    def recommend_setting(self, results):
+        """Pick the setting with the lowest weighted cost relative to the best of each metric"""
+        best_read = min(r['full_scan_ms'] + r['projected_ms'] for r in results) or 1e-9
+        best_size = min(r['file_size_mb'] for r in results) or 1e-9
+        best_write = min(r['write_ms'] for r in results) or 1e-9
+
+        def cost(r):
+            return (BENCHMARK_WEIGHTS['read'] * (r['full_scan_ms'] + r['projected_ms']) / best_read
+                    + BENCHMARK_WEIGHTS['size'] * r['file_size_mb'] / best_size
+                    + BENCHMARK_WEIGHTS['write'] * r['write_ms'] / best_write)
+
+        for r in results:
+            r['cost'] = cost(r)
+        return min(results, key=lambda r: r['cost'])
+
+    def benchmark_table(self, csv_path, tmp_dir):
+        """Benchmark every setting in the grid on one table"""
+        table_name = os.path.splitext(os.path.basename(csv_path))[0]
+        table = read_csv_table(csv_path)
+        projection = self.benchmark_projection(table, table_name)
+        path = os.path.join(tmp_dir, f'{table_name}.parquet')
+
+        results = []
+        for codec, level in BENCHMARK_CODECS:
+            for use_dictionary in BENCHMARK_DICTIONARY:
+                for row_group_size in BENCHMARK_ROW_GROUPS:
+                    # Larger row groups than rows in the table give identical files
+                    if row_group_size > BENCHMARK_ROW_GROUPS[0] and row_group_size // 4 >= table.num_rows:
+                        continue
+                    result = self.benchmark_setting(
+                        table, path, codec, level, use_dictionary, row_group_size, projection,
+                    )
+                    result.update({'table': table_name, 'rows': table.num_rows})
+                    results.append(result)
+
+        recommended = self.recommend_setting(results)
+        for r in results:
+            r['recommended'] = r is recommended
+        return results, recommended
+
+    def run_benchmark(self, tables=None):
+        """Benchmark codecs, dictionary encoding and row-group sizes on each table"""
+        print("="*80)
+        print("PARQUET COMPRESSION BENCHMARK")
+        print("="*80)
+        print(f"Codecs: {', '.join(c if l is None else f'{c}-{l}' for c, l in BENCHMARK_CODECS)}")
+        print(f"Row groups: {', '.join(f'{n:,}' for n in BENCHMARK_ROW_GROUPS)} | "
+              f"Dictionary: on/off | Best of {BENCHMARK_REPEATS} (warm cache)")
+
+        csv_files = sorted(Path(DATA_DIR).rglob('*.csv'))
+        if tables:
+            csv_files = [f for f in csv_files if f.stem in tables]
+
+        all_results = []
+        recommendations = {}
+        tmp_dir = tempfile.mkdtemp(prefix='parquet_benchmark_')
+        try:
+            for csv_file in csv_files:
+                print(f"\n  {csv_file.stem}...", end=' ', flush=True)
+                results, best = self.benchmark_table(str(csv_file), tmp_dir)
+                all_results.extend(results)
+                recommendations[csv_file.stem] = {
+                    'compression': best['codec'],
+                    'use_dictionary': best['dictionary'],
+                    'row_group_size': best['row_group_size'],
+                    'file_size_mb': round(best['file_size_mb'], 4),
+                    'full_scan_ms': round(best['full_scan_ms'], 3),
+                    'projected_ms': round(best['projected_ms'], 3),
+                }
+                snappy = next(r for r in results if r['codec'] == 'snappy' and r['dictionary'])
+                print(f"✓ {len(results)} settings → {best['codec']}, "
+                      f"dictionary {'on' if best['dictionary'] else 'off'}, "
+                      f"{best['row_group_size']:,}-row groups "
+                      f"({best['file_size_mb']:.2f}MB vs snappy {snappy['file_size_mb']:.2f}MB, "
+                      f"scan {best['full_scan_ms']:.1f}ms vs {snappy['full_scan_ms']:.1f}ms)")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if not all_results:
+            print("\nNo tables to benchmark")
+            return
+
+        report = pd.DataFrame(all_results)
+        report = report[[
+            'table', 'rows', 'codec', 'dictionary', 'row_group_size', 'file_size_mb',
+            'write_mb_s', 'read_mb_s', 'write_ms', 'full_scan_ms', 'projected_ms',
+            'cost', 'recommended',
+        ]]
+        os.makedirs(BENCHMARK_DIR, exist_ok=True)
+        report.to_csv(BENCHMARK_REPORT, index=False)
+        with open(BENCHMARK_RECOMMENDATIONS, 'w') as f:
+            json.dump(recommendations, f, indent=2, sort_keys=True)
+
+        # Overall codec comparison (dictionary on, default row groups)
+        print("\n📊 Codec comparison (all tables, dictionary on):")
+        overall = (report[report['dictionary']]
+                   .groupby('codec')
+                   .agg(size_mb=('file_size_mb', 'sum'), write_mb_s=('write_mb_s', 'median'),
+                        read_mb_s=('read_mb_s', 'median'), projected_ms=('projected_ms', 'median'))
+                   .sort_values('size_mb'))
+        for codec, row in overall.iterrows():
+            print(f"  {codec:10s} {row['size_mb']:8.2f}MB  write {row['write_mb_s']:8.1f}MB/s  "
+                  f"read {row['read_mb_s']:8.1f}MB/s  projected {row['projected_ms']:6.2f}ms")
+
+        print(f"\n✓ Comparison report saved to: {os.path.relpath(BENCHMARK_REPORT, PROJECT_ROOT)}")
+        print(f"✓ Per-table recommendations saved to: {os.path.relpath(BENCHMARK_RECOMMENDATIONS, PROJECT_ROOT)}")
+
     def convert_all(self):
         """Convert all CSV files in data directory"""
         print("="*80)
@@ -97,8 +539,14 @@ class CSVToParquetConverter:
         print("="*80)
         print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Data Directory: {DATA_DIR}")
-
-        # Convert SAP data
+        if self.force:
+            print("Mode: --force (reconverting every file)")
+        if self.dataset:
+            print(f"Datasets: partitioned by ERDAT month{' + VKORG' if self.by_vkorg else ''}, "
+                  f"{self.target_file_mb}MB files, {self.row_group_rows:,}-row groups")
+
+        # Land freshly generated SAP tables, then convert SAP data
+        self.land_bronze()
         sap_dir = os.path.join(DATA_DIR, 'sap')
         if os.path.exists(sap_dir):
             print("\n" + "="*80)
@@ -124,6 +572,14 @@ class CSVToParquetConverter:
             print("="*80)
             self.convert_directory(xref_dir)
 
+        if self.dataset:
+            self.build_datasets()
+
+        if self.ipc:
+            self.build_ipc_copies()
+
+        self.save_manifest()
+
     def print_summary(self):
         """Print conversion summary"""
         print("\n" + "="*80)
@@ -131,6 +587,11 @@ class CSVToParquetConverter:
         print("="*80)
 
         print(f"\nFiles Converted: {self.total_files}")
+        print(f"Files Skipped (unchanged): {self.skipped_files}")
+        if self.dataset:
+            print(f"Partitioned Datasets Written: {self.datasets_written}")
+        if self.ipc:
+            print(f"Arrow IPC Copies Written: {self.ipc_written}")
         print(f"Total CSV Size: {self.total_csv_size:.2f} MB")
         print(f"Total Parquet Size: {self.total_parquet_size:.2f} MB")
 
@@ -148,11 +609,11 @@ class CSVToParquetConverter:
                       f"{stat['csv_size_mb']:6.2f}MB → {stat['parquet_size_mb']:6.2f}MB "
                       f"({stat['compression_ratio']:5.1f}% saved)")
 
-        # Save stats to CSV
+        # Save stats to CSV, keeping the rows of tables this run skipped
         stats_file = os.path.join(PROJECT_ROOT, 'conversion_stats.csv')
         if self.conversion_stats:
-            pd.DataFrame(self.conversion_stats).to_csv(stats_file, index=False)
-            print(f"\n✓ Detailed stats saved to: conversion_stats.csv")
+            self.merged_stats(stats_file).to_csv(stats_file, index=False)
+            print("\n✓ Detailed stats saved to: conversion_stats.csv")
 
         print("\n" + "="*80)
         print("CONVERSION COMPLETE!")
@@ -162,7 +623,40 @@ class CSVToParquetConverter:
 
 def main():
     """Main execution"""
-    converter = CSVToParquetConverter()
+    parser = argparse.ArgumentParser(description='Convert CSV files to Parquet')
+    parser.add_argument('--force', action='store_true',
+                        help='Reconvert every file, ignoring the conversion manifest')
+    parser.add_argument('--dataset', action='store_true',
+                        help='Also write transactional tables as hive-partitioned datasets (ERDAT month); '
+                             f'pays for date-range filters on tables over {DATASET_MIN_ROWS:,} rows')
+    parser.add_argument('--partition-by-vkorg', action='store_true',
+                        help='Add VKORG as a second partition level where the table has it')
+    parser.add_argument('--target-file-mb', type=int, default=DEFAULT_TARGET_FILE_MB,
+                        help=f'Target dataset file size in MB (default {DEFAULT_TARGET_FILE_MB})')
+    parser.add_argument('--row-group-rows', type=int, default=DEFAULT_ROW_GROUP_ROWS,
+                        help=f'Rows per row group in dataset files (default {DEFAULT_ROW_GROUP_ROWS})')
+    parser.add_argument('--no-ipc', action='store_true',
+                        help='Skip the memory-mappable Arrow IPC copies of frequently read tables')
+    parser.add_argument('--ipc-compression', choices=sorted(IPC_COMPRESSIONS), default='none',
+                        help='Arrow IPC compression (none = zero-copy memory mapping, default)')
+    parser.add_argument('--benchmark', nargs='*', metavar='TABLE',
+                        help='Benchmark codecs/encodings/row groups instead of converting '
+                             '(optionally only the named tables)')
+    args = parser.parse_args()
+
+    converter = CSVToParquetConverter(
+        force=args.force,
+        dataset=args.dataset,
+        by_vkorg=args.partition_by_vkorg,
+        target_file_mb=args.target_file_mb,
+        row_group_rows=args.row_group_rows,
+        ipc=not args.no_ipc,
+        ipc_compression=IPC_COMPRESSIONS[args.ipc_compression],
+    )
+    if args.benchmark is not None:
+        converter.run_benchmark(args.benchmark)
+        return
+
     converter.convert_all()
     converter.print_summary()
 
@@ -8,12 +8,10 @@ import numpy as np
 import os
 from datetime import datetime, timedelta
 
-# Paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-SAP_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw', 'sap')
-CRM_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw', 'crm')
-XREF_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw', 'cross_reference')
+from data_catalog import output_dir, read_table_pandas
+
+# Paths (source tables are read through the catalog: freshest copy, IPC → Parquet → CSV, cached per process)
+XREF_DIR = output_dir('cross_reference')
 
 # Create cross-reference directory
 os.makedirs(XREF_DIR, exist_ok=True)
@@ -33,8 +31,8 @@ class CRMSAPLinker:
         print("Creating Account ↔ Customer Master Link...")
 
         # Load data
-        accounts = pd.read_csv(f'{CRM_DIR}/Account.csv')
-        kna1 = pd.read_csv(f'{SAP_DIR}/master/customer/KNA1.csv')
+        accounts = read_table_pandas('Account')
+        kna1 = read_table_pandas('KNA1')
 
         # Filter only Customer accounts in CRM
         customer_accounts = accounts[accounts['Type'].str.contains('Customer', na=False)]
@@ -72,8 +70,8 @@ class CRMSAPLinker:
         print("Creating Opportunity ↔ Sales Order Link...")
 
         # Load data
-        opportunities = pd.read_csv(f'{CRM_DIR}/Opportunity.csv')
-        vbak = pd.read_csv(f'{SAP_DIR}/transactional/sales_orders/VBAK.csv')
+        opportunities = read_table_pandas('Opportunity')
+        vbak = read_table_pandas('VBAK')
         account_xref = self.account_customer_xref
 
         # Filter Closed Won opportunities only
@@ -96,7 +94,7 @@ class CRMSAPLinker:
             if pd.isna(opp.get('SAP_KUNNR')):
                 continue
 
-            opp_close_date = datetime.strptime(opp['CloseDate'], '%Y-%m-%d')
+            opp_close_date = opp['CloseDate']
 
             # Find SAP orders for this customer created around close date
             customer_orders = vbak[
@@ -124,7 +122,7 @@ class CRMSAPLinker:
                 'SAP_KUNNR': sap_order['KUNNR'],
                 'LinkType': 'Opportunity_to_Order',
                 'AmountVariance': float(opp['Amount']) - float(sap_order['NETWR']),
-                'DaysFromCloseToOrder': (datetime.strptime(str(sap_order['ERDAT']), '%Y%m%d') - opp_close_date).days,
+                'DaysFromCloseToOrder': (sap_order['ERDAT'] - opp_close_date).days,
                 'CreatedDate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             })
 
@@ -141,8 +139,8 @@ class CRMSAPLinker:
         print("Creating Contact ↔ Partner Function Link...")
 
         # Load data
-        contacts = pd.read_csv(f'{CRM_DIR}/Contact.csv')
-        knvp = pd.read_csv(f'{SAP_DIR}/master/customer/KNVP.csv')
+        contacts = read_table_pandas('Contact')
+        knvp = read_table_pandas('KNVP')
         account_xref = self.account_customer_xref
 
         # Merge contacts with account cross-reference
@@ -198,8 +196,8 @@ class CRMSAPLinker:
         print("Creating Quote ↔ Sales Order Link...")
 
         # Load data
-        quotes = pd.read_csv(f'{CRM_DIR}/Quote.csv')
-        opportunities = pd.read_csv(f'{CRM_DIR}/Opportunity.csv')
+        quotes = read_table_pandas('Quote')
+        opportunities = read_table_pandas('Opportunity')
 
         # Use existing opportunity-order link
         opp_order_xref = self.opportunity_order_xref
@@ -241,16 +239,10 @@ class CRMSAPLinker:
         print(f"  ✓ Linked to SAP Orders: {len(self.quote_order_xref):,}")
         return self.quote_order_xref
 
-    def create_analytics_views(self):
-        """Create denormalized analytical views combining CRM and SAP"""
-        print("\nCreating Analytical Views...")
-
-        # View 1: Customer 360 View
-        print("  Creating Customer 360 View...")
-
-        accounts = pd.read_csv(f'{CRM_DIR}/Account.csv')
-        kna1 = pd.read_csv(f'{SAP_DIR}/master/customer/KNA1.csv')
-        vbak = pd.read_csv(f'{SAP_DIR}/transactional/sales_orders/VBAK.csv')
+    def customer_360_view(self):
+        """CRM accounts linked to SAP customers, with SAP order statistics"""
+        accounts = read_table_pandas('Account')
+        vbak = read_table_pandas('VBAK')
 
         customer_360 = self.account_customer_xref.merge(
             accounts, left_on='CRM_AccountId', right_on='Id', how='left'
@@ -264,40 +256,45 @@ class CRMSAPLinker:
         }).reset_index()
         order_stats.columns = ['SAP_KUNNR', 'TotalOrders', 'TotalRevenue', 'FirstOrderDate', 'LastOrderDate']
 
-        customer_360 = customer_360.merge(order_stats, on='SAP_KUNNR', how='left')
-        customer_360.to_csv(f'{XREF_DIR}/Customer_360_View.csv', index=False)
-        print(f"    ✓ Customer 360 View: {len(customer_360):,} records")
-
-        # View 2: Opportunity to Order Analysis
-        print("  Creating Opportunity-to-Order Analysis View...")
+        return customer_360.merge(order_stats, on='SAP_KUNNR', how='left')
 
+    def opportunity_order_view(self):
+        """Opportunity-order links with amount-match and timely-closure flags"""
         opp_order_view = self.opportunity_order_xref.copy()
         opp_order_view['AmountMatch'] = (abs(opp_order_view['AmountVariance']) / opp_order_view['CRM_Amount'] * 100 < 10)
         opp_order_view['TimelyClosure'] = opp_order_view['DaysFromCloseToOrder'].between(-30, 30)
+        return opp_order_view
 
-        opp_order_view.to_csv(f'{XREF_DIR}/Opportunity_Order_Analysis.csv', index=False)
-        print(f"    ✓ Opportunity-Order Analysis: {len(opp_order_view):,} records")
-
-        # View 3: Quote-to-Cash Cycle
-        print("  Creating Quote-to-Cash Cycle View...")
-
-        quotes = pd.read_csv(f'{CRM_DIR}/Quote.csv')
-        vbrk = pd.read_csv(f'{SAP_DIR}/transactional/billing/VBRK.csv')
+    def quote_to_cash_view(self):
+        """Quote-order links with quote header details"""
+        quotes = read_table_pandas('Quote')
 
-        quote_cash = self.quote_order_xref.merge(
+        return self.quote_order_xref.merge(
             quotes[['Id', 'QuoteNumber', 'OpportunityId', 'CreatedDate', 'ExpirationDate']],
             left_on='CRM_QuoteId',
             right_on='Id',
             how='left'
         )
 
-        # Add billing info
-        billing_by_order = vbrk.groupby('KUNAG').agg({
-            'VBELN': 'count',
-            'NETWR': 'sum',
-            'FKDAT': 'max'
-        }).reset_index()
+    def create_analytics_views(self):
+        """Create denormalized analytical views combining CRM and SAP"""
+        print("\nCreating Analytical Views...")
+
+        # View 1: Customer 360 View
+        print("  Creating Customer 360 View...")
+        customer_360 = self.customer_360_view()
+        customer_360.to_csv(f'{XREF_DIR}/Customer_360_View.csv', index=False)
+        print(f"    ✓ Customer 360 View: {len(customer_360):,} records")
 
+        # View 2: Opportunity to Order Analysis
+        print("  Creating Opportunity-to-Order Analysis View...")
+        opp_order_view = self.opportunity_order_view()
+        opp_order_view.to_csv(f'{XREF_DIR}/Opportunity_Order_Analysis.csv', index=False)
+        print(f"    ✓ Opportunity-Order Analysis: {len(opp_order_view):,} records")
+
+        # View 3: Quote-to-Cash Cycle
+        print("  Creating Quote-to-Cash Cycle View...")
+        quote_cash = self.quote_to_cash_view()
         quote_cash.to_csv(f'{XREF_DIR}/Quote_to_Cash_View.csv', index=False)
         print(f"    ✓ Quote-to-Cash View: {len(quote_cash):,} records")
 
@@ -316,14 +313,14 @@ class CRMSAPLinker:
         print(f"\nData Quality Metrics:")
 
         # Opportunity matching rate
-        opportunities = pd.read_csv(f'{CRM_DIR}/Opportunity.csv')
+        opportunities = read_table_pandas('Opportunity')
         closed_won = len(opportunities[opportunities['StageName'] == 'Closed Won'])
         if closed_won > 0:
             match_rate = len(self.opportunity_order_xref) / closed_won * 100
             print(f"  Closed Won Opportunity Match Rate: {match_rate:.1f}%")
 
         # Quote matching rate
-        quotes = pd.read_csv(f'{CRM_DIR}/Quote.csv')
+        quotes = read_table_pandas('Quote')
         accepted_quotes = len(quotes[quotes['Status'] == 'Accepted'])
         if accepted_quotes > 0:
             quote_match_rate = len(self.quote_order_xref) / accepted_quotes * 100
@@ -0,0 +1,306 @@
+"""
+Table Catalog and Shared Data Access
+Logical table name → layer, area, file and registry schema, plus one read path
+for every script: the fastest fresh format (Arrow IPC → Parquet → CSV),
+column projection and row filters pushed into pyarrow, and a process-wide
+cache of the tables read
+
+Layers
+- bronze: source files. The SAP generator writes data/bronze and the converter
+  lands copies (with their Parquet/IPC conversions) in data/raw/sap; CRM and
+  cross-reference tables live in data/raw/crm and data/raw/cross_reference.
+  When a table exists in several places the freshest copy wins, Parquet
+  over CSV when it is at least as new.
+- silver: typed, deduplicated Parquet datasets (one directory per table)
+- lake: versioned tables with a transaction log (scripts/lake_table.py); reads
+  see the latest committed snapshot, never a half-written file
+"""
+
+import os
+import argparse
+import threading
+from collections import OrderedDict
+
+import pyarrow.parquet as pq
+
+from sap_schema import (
+    arrow_schema, fresh_ipc_copy, has_schema, read_csv_table, read_ipc_table, read_parquet_table, to_pandas,
+)
+from lake_table import LAKE_DIR, VersionedTable, is_versioned, latest_version
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+BRONZE_DIR = os.path.join(DATA_DIR, 'bronze')
+RAW_DIR = os.path.join(DATA_DIR, 'raw')
+SILVER_DIR = os.path.join(DATA_DIR, 'silver')
+
+# Layer → area → roots searched for table files (the first root is where writers put new files)
+LAYERS = {
+    'bronze': {
+        'sap': [BRONZE_DIR, os.path.join(RAW_DIR, 'sap')],
+        'crm': [os.path.join(RAW_DIR, 'crm')],
+        'cross_reference': [os.path.join(RAW_DIR, 'cross_reference')],
+    },
+    'silver': {
+        'sap': [SILVER_DIR],
+    },
+    'lake': {
+        'sap': [os.path.join(LAKE_DIR, 'sap')],
+        'crm': [os.path.join(LAKE_DIR, 'crm')],
+        'cross_reference': [os.path.join(LAKE_DIR, 'cross_reference')],
+    },
+}
+DEFAULT_LAYER = 'bronze'
+
+# Process-wide table cache
+CACHE_BUDGET_MB = 1024
+
+
+def output_dir(area, layer=DEFAULT_LAYER):
+    """Directory new files of an area are written to (data/bronze for SAP, data/raw/crm for CRM, ...)"""
+    return LAYERS[layer][area][0]
+
+
+# ==================== CATALOG ====================
+
+def _skip_dir(name):
+    # Temporary compaction/conversion directories and internal state
+    return '.__' in name or name.startswith(('_', '.'))
+
+
+def discover(layer=DEFAULT_LAYER):
+    """{table: entry} of the registry tables found in a layer
+
+    An entry holds the table's layer, area, subdir (relative to the area root,
+    e.g. master/customer), every candidate file and its registry schema.
+    """
+    entries = {}
+    for area, roots in LAYERS[layer].items():
+        for root in roots:
+            for directory, dirs, files in os.walk(root):
+                dirs[:] = sorted(d for d in dirs if not _skip_dir(d))
+                if layer in ('silver', 'lake'):
+                    # Silver and lake tables are directories (buckets, month partitions, transaction log)
+                    table_name = os.path.basename(directory)
+                    if (has_schema(table_name) and directory != root
+                            and (layer == 'silver' or is_versioned(directory))):
+                        dirs[:] = []
+                        candidates = [directory]
+                    else:
+                        continue
+                else:
+                    candidates = [os.path.join(directory, f) for f in sorted(files)
+                                  if os.path.splitext(f)[1] in ('.csv', '.parquet')
+                                  and has_schema(os.path.splitext(f)[0])]
+                for path in candidates:
+                    table_name = os.path.splitext(os.path.basename(path))[0]
+                    entry = entries.setdefault(table_name, {
+                        'name': table_name,
+                        'layer': layer,
+                        'area': area,
+                        'subdir': os.path.relpath(os.path.dirname(path), root),
+                        'files': [],
+                        'schema': arrow_schema(table_name),
+                    })
+                    entry['files'].append(path)
+    return entries
+
+
+_catalogs = {}
+_catalog_lock = threading.Lock()
+
+
+def catalog(layer=DEFAULT_LAYER, refresh=False):
+    """Discovered entries of a layer (walked once per process unless refreshed)"""
+    with _catalog_lock:
+        if refresh or layer not in _catalogs:
+            _catalogs[layer] = discover(layer)
+        return _catalogs[layer]
+
+
+def choose_file(paths):
+    """Newest CSV, unless a Parquet copy (or dataset) is at least as new"""
+    csv_paths = [p for p in paths if p.endswith('.csv') and os.path.exists(p)]
+    newest_csv = max((os.path.getmtime(p) for p in csv_paths), default=0)
+    for path in paths:
+        if not path.endswith('.csv') and os.path.exists(path) and os.path.getmtime(path) >= newest_csv:
+            return path
+    return max(csv_paths, key=os.path.getmtime) if csv_paths else None
+
+
+def locate(table_name, layer=DEFAULT_LAYER):
+    """File (or silver dataset directory) to read a table from, None when the layer lacks it"""
+    entry = catalog(layer).get(table_name)
+    return choose_file(entry['files']) if entry else None
+
+
+def locate_tables(layer=DEFAULT_LAYER):
+    """{table: file to read} for every table of a layer"""
+    files = {name: locate(name, layer) for name in catalog(layer)}
+    return {name: path for name, path in files.items() if path}
+
+
+def read_format(path):
+    """Format a read of the file actually uses: versioned, ipc, parquet or csv"""
+    if os.path.isdir(path) and is_versioned(path):
+        return 'versioned'
+    if fresh_ipc_copy(path) or str(path).endswith('.arrow'):
+        return 'ipc'
+    if str(path).endswith('.parquet') or os.path.isdir(path):
+        return 'parquet'
+    return 'csv'
+
+
+# ==================== READS ====================
+
+def filter_expression(filters):
+    """pyarrow filters (DNF list of (column, op, value) tuples or an Expression) as an Expression"""
+    if filters is None or not isinstance(filters, list):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def filter_columns(filters):
+    """Columns a DNF filter list references (None: unknown, read every column)"""
+    if filters is not None and not isinstance(filters, list):
+        return None
+    if not filters:
+        return []
+    clauses = filters if isinstance(filters[0], list) else [filters]
+    return [column for clause in clauses for column, _, _ in clause]
+
+
+def read_file(path, table_name, columns=None, filters=None):
+    """Typed Arrow table from the fastest fresh format, projected and filtered in pyarrow"""
+    expression = filter_expression(filters)
+    fmt = read_format(path)
+    if fmt == 'versioned':
+        # Only the files of the latest committed version
+        return VersionedTable(path, table_name).read(columns, expression)
+    if fmt == 'parquet':
+        # Row-group statistics and hive partitions prune before decoding
+        return read_parquet_table(path, table_name, columns, filters=expression)
+
+    # IPC is memory-mapped and CSV has no statistics: filter after a projected read
+    read_columns = columns
+    if columns is not None and expression is not None:
+        extra = filter_columns(filters)
+        read_columns = None if extra is None else list(dict.fromkeys(list(columns) + extra))
+    if fmt == 'ipc':
+        table = read_ipc_table(fresh_ipc_copy(path) or path, table_name, read_columns)
+    else:
+        table = read_csv_table(path, table_name, read_columns)
+    if expression is not None:
+        table = table.filter(expression)
+    return table.select(columns) if columns is not None else table
+
+
+class ReadCache:
+    """Process-wide LRU of tables read through the catalog, with a memory budget (thread-safe)
+
+    Entries are keyed by file, file versions and filter; a cached read serves
+    any narrower projection of the same rows.
+    """
+
+    def __init__(self, budget_mb=CACHE_BUDGET_MB):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.tables = OrderedDict()
+        self.used_bytes = 0
+        self.stats = {'reads': 0, 'hits': 0, 'evictions': 0, 'bytes_cached': 0}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(path, filters):
+        if read_format(path) == 'versioned':
+            versions = (latest_version(path),)
+        else:
+            versions = tuple(os.stat(p).st_mtime_ns for p in (path, fresh_ipc_copy(path)) if p)
+        return (str(path), versions, str(filter_expression(filters)))
+
+    def get(self, path, table_name, columns=None, filters=None):
+        """Table from the cache, read (with the union of cached and requested columns) on a miss"""
+        key = self.key(path, filters)
+        requested = columns
+        with self.lock:
+            entry = self.tables.get(key)
+            if entry is not None and (entry[0] is None or (columns is not None and set(columns) <= set(entry[0]))):
+                self.tables.move_to_end(key)
+                self.stats['hits'] += 1
+                table = entry[1]
+                return table.select(columns) if columns is not None else table
+            if entry is not None:
+                columns = None if columns is None else list(dict.fromkeys(entry[0] + list(columns)))
+
+        table = read_file(path, table_name, columns, filters)
+        with self.lock:
+            if key in self.tables:
+                self.used_bytes -= self.tables.pop(key)[2]
+            self.tables[key] = (None if columns is None else list(columns), table, table.nbytes)
+            self.used_bytes += table.nbytes
+            self.stats['reads'] += 1
+            self.stats['bytes_cached'] += table.nbytes
+            # The newest table stays even if it alone exceeds the budget
+            while self.used_bytes > self.budget_bytes and len(self.tables) > 1:
+                self.used_bytes -= self.tables.popitem(last=False)[1][2]
+                self.stats['evictions'] += 1
+        return table.select(requested) if requested is not None else table
+
+    def clear(self):
+        """Drop every cached table"""
+        with self.lock:
+            self.tables.clear()
+            self.used_bytes = 0
+
+
+read_cache = ReadCache()
+
+
+def read_table(table_name, columns=None, filters=None, layer=DEFAULT_LAYER, cache=True):
+    """Typed Arrow table of a catalog table
+
+    columns projects the read; filters (pyarrow DNF list or Expression) selects
+    rows, pruned by Parquet statistics/partitions where the format allows.
+    """
+    path = locate(table_name, layer)
+    if path is None:
+        raise FileNotFoundError(f"{table_name} not found in the {layer} layer")
+    if not cache:
+        return read_file(path, table_name, columns, filters)
+    return read_cache.get(path, table_name, columns, filters)
+
+
+def read_table_pandas(table_name, columns=None, filters=None, layer=DEFAULT_LAYER, cache=True):
+    """Typed pandas DataFrame of a catalog table (a new frame per call, safe to modify)"""
+    return to_pandas(read_table(table_name, columns, filters, layer, cache))
+
+
+# ==================== MAIN ====================
+
+def main():
+    """Print the catalog: where each table is read from and in which format"""
+    parser = argparse.ArgumentParser(description='Table catalog')
+    parser.add_argument('tables', nargs='*', help='Only these tables (default: all)')
+    parser.add_argument('--layer', choices=list(LAYERS), default=DEFAULT_LAYER, help='Layer to list')
+    args = parser.parse_args()
+
+    print("="*80)
+    print(f"TABLE CATALOG ({args.layer.upper()})")
+    print("="*80)
+    entries = catalog(args.layer)
+    print(f"\n  {'Table':26s} {'Area':16s} {'Format':9s} {'Copies':>6s}  Path")
+    for name in sorted(entries, key=lambda n: (entries[n]['area'], entries[n]['subdir'], n)):
+        if args.tables and name not in args.tables:
+            continue
+        entry = entries[name]
+        path = choose_file(entry['files'])
+        if path is None:
+            continue
+        print(f"  {name:26s} {entry['area']:16s} {read_format(path):9s} {len(entry['files']):6d}  "
+              f"{os.path.relpath(path, PROJECT_ROOT)}")
+    print(f"\nTables: {len(entries)}")
+
+
+if __name__ == "__main__":
+    main()
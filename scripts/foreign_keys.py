@@ -0,0 +1,396 @@
+"""
+Foreign-Key Catalog and Streaming Referential Integrity Checker
+Every FK relationship across SAP SD, Salesforce CRM and the cross-reference
+tables, checked chunk by chunk against compact parent key sets
+
+Parent keys are held as sorted int64 arrays (digit-only keys such as VBELN,
+KUNNR or VBELN+POSNR packed into one integer) plus a sorted string array for
+the rest (Salesforce Ids, alphanumeric material numbers). Child tables are
+streamed in batches and probed with a binary search, so memory scales with
+the number of parent keys, not with table rows.
+"""
+
+import os
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from sap_schema import bytes_to_read, file_columns, get_columns, get_primary_key, iter_table_batches
+from data_catalog import locate_tables
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+REPORT_PATH = os.path.join(PROJECT_ROOT, 'referential_integrity_report.csv')
+
+# Configuration
+BATCH_ROWS = 250_000
+SAMPLE_ROWS = 5
+MAX_PACKED_DIGITS = 18       # digits that always fit a signed int64
+KEY_SEPARATOR = '\x1f'
+
+
+def fk(group, child, columns, parent, parent_columns=None, where=None, severity='error'):
+    """Catalog entry: child columns → parent columns (default: the parent's primary key)"""
+    return {
+        'group': group,
+        'child': child,
+        'columns': columns,
+        'parent': parent,
+        'parent_columns': parent_columns or columns,
+        'where': where or {},
+        'severity': severity,
+    }
+
+
+# ==================== CATALOG ====================
+
+FOREIGN_KEYS = [
+    # SAP master data
+    fk('SAP Master Data', 'KNVV', ['KUNNR'], 'KNA1'),
+    fk('SAP Master Data', 'KNB1', ['KUNNR'], 'KNA1'),
+    fk('SAP Master Data', 'KNVP', ['KUNNR'], 'KNA1'),
+    fk('SAP Master Data', 'KNVP', ['KUNN2'], 'KNA1', ['KUNNR']),
+    fk('SAP Master Data', 'KNVV', ['VKORG'], 'TVKO'),
+    fk('SAP Master Data', 'KNB1', ['BUKRS'], 'T001'),
+    fk('SAP Master Data', 'KNA1', ['LAND1'], 'T005'),
+    fk('SAP Master Data', 'TVKO', ['BUKRS'], 'T001'),
+    fk('SAP Master Data', 'T001', ['LAND1'], 'T005'),
+    fk('SAP Master Data', 'MARC', ['MATNR'], 'MARA'),
+    fk('SAP Master Data', 'MAKT', ['MATNR'], 'MARA'),
+    fk('SAP Master Data', 'MVKE', ['MATNR'], 'MARA'),
+    fk('SAP Master Data', 'MVKE', ['VKORG'], 'TVKO'),
+    fk('SAP Master Data', 'MARA', ['MATKL'], 'T023'),
+    fk('SAP Master Data', 'MARA', ['PRDHA'], 'T171T', ['PRODH'], severity='warning'),
+
+    # Sales orders (KONV condition records are numbered by the order: KNUMV = VBELN)
+    fk('SAP Sales Orders', 'VBAK', ['KUNNR'], 'KNA1'),
+    fk('SAP Sales Orders', 'VBAK', ['VKORG'], 'TVKO'),
+    fk('SAP Sales Orders', 'VBAK', ['VTWEG'], 'TVTW'),
+    fk('SAP Sales Orders', 'VBAK', ['SPART'], 'TSPA'),
+    fk('SAP Sales Orders', 'VBAP', ['VBELN'], 'VBAK'),
+    fk('SAP Sales Orders', 'VBAP', ['MATNR'], 'MARA'),
+    fk('SAP Sales Orders', 'VBUK', ['VBELN'], 'VBAK'),
+    fk('SAP Sales Orders', 'VBUP', ['VBELN', 'POSNR'], 'VBAP'),
+    fk('SAP Sales Orders', 'VBEP', ['VBELN', 'POSNR'], 'VBAP'),
+    fk('SAP Sales Orders', 'VBPA', ['VBELN'], 'VBAK'),
+    fk('SAP Sales Orders', 'VBPA', ['KUNNR'], 'KNA1'),
+    fk('SAP Sales Orders', 'KONV', ['KNUMV'], 'VBAK', ['VBELN']),
+
+    # Deliveries
+    fk('SAP Deliveries', 'LIKP', ['KUNNR'], 'KNA1'),
+    fk('SAP Deliveries', 'LIKP', ['VKORG'], 'TVKO'),
+    fk('SAP Deliveries', 'LIPS', ['VBELN'], 'LIKP'),
+    fk('SAP Deliveries', 'LIPS', ['MATNR'], 'MARA'),
+    fk('SAP Deliveries', 'LIPS', ['VGBEL', 'VGPOS'], 'VBAP', ['VBELN', 'POSNR']),
+
+    # Billing
+    fk('SAP Billing', 'VBRK', ['KUNAG'], 'KNA1', ['KUNNR']),
+    fk('SAP Billing', 'VBRK', ['KUNRG'], 'KNA1', ['KUNNR']),
+    fk('SAP Billing', 'VBRK', ['VKORG'], 'TVKO'),
+    fk('SAP Billing', 'VBRP', ['VBELN'], 'VBRK'),
+    fk('SAP Billing', 'VBRP', ['MATNR'], 'MARA'),
+    fk('SAP Billing', 'VBRP', ['VGBEL', 'VGPOS'], 'LIPS', ['VBELN', 'POSNR']),
+    fk('SAP Billing', 'VBRP', ['AUBEL', 'AUPOS'], 'VBAP', ['VBELN', 'POSNR']),
+
+    # Document flow (VBTYP: C = order, J = delivery, M = invoice)
+    fk('SAP Document Flow', 'VBFA', ['VBELV', 'POSNV'], 'VBAP', ['VBELN', 'POSNR'], {'VBTYP_V': 'C'}),
+    fk('SAP Document Flow', 'VBFA', ['VBELV', 'POSNV'], 'LIPS', ['VBELN', 'POSNR'], {'VBTYP_V': 'J'}),
+    fk('SAP Document Flow', 'VBFA', ['VBELN', 'POSNN'], 'LIPS', ['VBELN', 'POSNR'], {'VBTYP_N': 'J'}),
+    fk('SAP Document Flow', 'VBFA', ['VBELN', 'POSNN'], 'VBRP', ['VBELN', 'POSNR'], {'VBTYP_N': 'M'}),
+
+    # Shipments
+    fk('SAP Shipments', 'VTTP', ['TKNUM'], 'VTTK'),
+    fk('SAP Shipments', 'VTTP', ['VBELN'], 'LIKP'),
+
+    # Salesforce CRM (Activity WhoId/WhatId are polymorphic and not checked)
+    fk('Salesforce CRM', 'Contact', ['AccountId'], 'Account', ['Id']),
+    fk('Salesforce CRM', 'Opportunity', ['AccountId'], 'Account', ['Id']),
+    fk('Salesforce CRM', 'Opportunity', ['CampaignId'], 'Campaign', ['Id']),
+    fk('Salesforce CRM', 'OpportunityLineItem', ['OpportunityId'], 'Opportunity', ['Id']),
+    fk('Salesforce CRM', 'Quote', ['OpportunityId'], 'Opportunity', ['Id']),
+    fk('Salesforce CRM', 'Quote', ['AccountId'], 'Account', ['Id']),
+    fk('Salesforce CRM', 'Case', ['AccountId'], 'Account', ['Id']),
+    fk('Salesforce CRM', 'Case', ['ContactId'], 'Contact', ['Id']),
+    fk('Salesforce CRM', 'Lead', ['ConvertedAccountId'], 'Account', ['Id']),
+    # Converted contacts/opportunities may since have been deleted in CRM
+    fk('Salesforce CRM', 'Lead', ['ConvertedContactId'], 'Contact', ['Id'], severity='warning'),
+    fk('Salesforce CRM', 'Lead', ['ConvertedOpportunityId'], 'Opportunity', ['Id'], severity='warning'),
+
+    # Cross-reference links
+    fk('Cross-Reference', 'Account_Customer_XREF', ['CRM_AccountId'], 'Account', ['Id']),
+    fk('Cross-Reference', 'Account_Customer_XREF', ['SAP_KUNNR'], 'KNA1', ['KUNNR']),
+    fk('Cross-Reference', 'Opportunity_Order_XREF', ['CRM_OpportunityId'], 'Opportunity', ['Id']),
+    fk('Cross-Reference', 'Opportunity_Order_XREF', ['CRM_AccountId'], 'Account', ['Id']),
+    fk('Cross-Reference', 'Opportunity_Order_XREF', ['SAP_VBELN'], 'VBAK', ['VBELN']),
+    fk('Cross-Reference', 'Opportunity_Order_XREF', ['SAP_KUNNR'], 'KNA1', ['KUNNR']),
+    fk('Cross-Reference', 'Contact_Partner_XREF', ['CRM_ContactId'], 'Contact', ['Id']),
+    fk('Cross-Reference', 'Contact_Partner_XREF', ['CRM_AccountId'], 'Account', ['Id']),
+    fk('Cross-Reference', 'Contact_Partner_XREF', ['SAP_KUNNR'], 'KNA1', ['KUNNR']),
+    fk('Cross-Reference', 'Quote_Order_XREF', ['CRM_QuoteId'], 'Quote', ['Id']),
+    fk('Cross-Reference', 'Quote_Order_XREF', ['CRM_OpportunityId'], 'Opportunity', ['Id']),
+    fk('Cross-Reference', 'Quote_Order_XREF', ['SAP_VBELN'], 'VBAK', ['VBELN']),
+]
+
+
+def fk_name(entry):
+    """Display name of a relationship (VBAP.VBELN → VBAK.VBELN)"""
+    where = ''.join(f" [{c}={v}]" for c, v in entry['where'].items())
+    return (f"{entry['child']}.{'+'.join(entry['columns'])} → "
+            f"{entry['parent']}.{'+'.join(entry['parent_columns'])}{where}")
+
+
+# ==================== KEY ENCODING ====================
+
+def key_widths(table_name, columns):
+    """Registry lengths of key columns (used to pack composite keys into one integer)"""
+    specs = get_columns(table_name)
+    return [specs[c][1] for c in columns]
+
+
+def encode_keys(table, columns, widths):
+    """Encode key columns of a batch: packed int64 where every part is digits, else joined strings
+
+    Returns (present, numeric, ints, strings): present/numeric are row masks,
+    ints holds the numeric rows and strings the remaining present rows.
+    """
+    arrays = [pc.cast(table.column(c), pa.string()) for c in columns]
+    present = np.ones(table.num_rows, dtype=bool)
+    for array in arrays:
+        present &= pc.fill_null(pc.not_equal(array, ''), False).to_numpy(zero_copy_only=False)
+
+    # The first part may use whatever digits the trailing parts leave in an int64
+    lead_digits = MAX_PACKED_DIGITS - sum(widths[1:])
+    numeric = present.copy()
+    if lead_digits < 1:
+        numeric[:] = False
+    else:
+        for array, digits in zip(arrays, [lead_digits] + widths[1:]):
+            numeric &= pc.fill_null(
+                pc.match_substring_regex(array, f'^[0-9]{{1,{digits}}}$'), False
+            ).to_numpy(zero_copy_only=False)
+
+    numeric_mask = pa.array(numeric)
+    ints = None
+    for array, width in zip(arrays, widths):
+        part = pc.cast(pc.filter(array, numeric_mask), pa.int64()).to_numpy(zero_copy_only=False)
+        ints = part if ints is None else ints * (10 ** width) + part
+
+    other_mask = pa.array(present & ~numeric)
+    joined = pc.binary_join_element_wise(*[pc.filter(a, other_mask) for a in arrays], KEY_SEPARATOR)
+    strings = np.asarray(joined.to_numpy(zero_copy_only=False), dtype=object)
+    return present, numeric, ints, strings
+
+
+def contains(sorted_keys, values):
+    """Membership of values in a sorted array (binary search)"""
+    if len(sorted_keys) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_keys, values)
+    positions[positions == len(sorted_keys)] = 0
+    return sorted_keys[positions] == values
+
+
+def union_keys(key_sets):
+    """Sorted distinct union of (int64, string) key sets"""
+    ints = [k[0] for k in key_sets]
+    strings = [k[1] for k in key_sets]
+    return (np.unique(np.concatenate(ints)) if ints else np.array([], dtype=np.int64),
+            np.unique(np.concatenate(strings)) if strings else np.array([], dtype=object))
+
+
+# ==================== CHECKER ====================
+
+def format_result(r):
+    """Report lines for one relationship result"""
+    if r['status'] == 'SKIPPED':
+        return [f"  - {r['relationship']}: skipped ({r['message']})"]
+    if r['status'] == 'OK':
+        return [f"  ✓ {r['relationship']}: all {r['checked']:,} references valid"]
+    mark = '✗' if r['severity'] == 'error' else '⚠'
+    lines = [f"  {mark} {r['relationship']}: {r['violations']:,} of {r['checked']:,} invalid"]
+    return lines + [f"      e.g. {sample}" for sample in r['samples']]
+
+
+class ForeignKeyChecker:
+    """Evaluate catalog relationships by streaming child tables against parent key sets"""
+
+    def __init__(self, table_files=None, batch_rows=BATCH_ROWS, sample_rows=SAMPLE_ROWS):
+        self.table_files = table_files if table_files is not None else locate_tables()
+        self.batch_rows = batch_rows
+        self.sample_rows = sample_rows
+        self.key_sets = {}
+        self.results = []
+        # Checks may run on a thread pool; each key set is still built only once
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        # Bytes read by the current thread's check (parent reads count for the check that builds the set)
+        self.io = threading.local()
+
+    def parent_keys(self, table_name, columns):
+        """Sorted distinct (int64, string) keys of a parent table (built once per column set)"""
+        cache_key = (table_name, tuple(columns))
+        with self.lock:
+            key_lock = self.key_locks.setdefault(cache_key, threading.Lock())
+        with key_lock:
+            if cache_key in self.key_sets:
+                return self.key_sets[cache_key]
+            self.key_sets[cache_key] = self.read_keys(table_name, columns)
+            return self.key_sets[cache_key]
+
+    def read_keys(self, table_name, columns, row_groups=None):
+        """Sorted distinct (int64, string) keys of a table file (optionally some Parquet row groups)"""
+        path = self.table_files[table_name]
+        widths = key_widths(table_name, columns)
+        self.io.bytes_read = getattr(self.io, 'bytes_read', 0) + bytes_to_read(path, columns, row_groups)
+        int_parts, string_parts = [], []
+        for batch in iter_table_batches(path, table_name, self.batch_rows, columns=columns, row_groups=row_groups):
+            _, _, ints, strings = encode_keys(batch, columns, widths)
+            int_parts.append(np.unique(ints))
+            string_parts.append(np.unique(strings))
+        return union_keys(list(zip(int_parts, string_parts)))
+
+    def new_result(self, entry):
+        """Empty result record for a relationship"""
+        return {
+            'group': entry['group'],
+            'relationship': fk_name(entry),
+            'child': entry['child'],
+            'parent': entry['parent'],
+            'severity': entry['severity'],
+            'rows': 0,
+            'checked': 0,
+            'blank': 0,
+            'violations': 0,
+            'bytes_read': 0,
+            'samples': [],
+        }
+
+    def child_columns(self, entry, result):
+        """Child columns to read (keys, filters, sample key), or None after marking the result SKIPPED"""
+        child, parent = entry['child'], entry['parent']
+        missing = [t for t in (child, parent) if t not in self.table_files]
+        if missing:
+            result['status'] = 'SKIPPED'
+            result['message'] = f"no file for {', '.join(missing)}"
+            return None
+
+        available = file_columns(self.table_files[child])
+        sample_columns = [c for c in get_primary_key(child) if c not in entry['columns']]
+        needed = list(dict.fromkeys(entry['columns'] + list(entry['where']) + sample_columns))
+        absent = [c for c in needed if c not in available]
+        if absent:
+            result['status'] = 'SKIPPED'
+            result['message'] = f"{child} has no column {', '.join(absent)}"
+            return None
+        return needed
+
+    def probe(self, entry, batches, parent_keys, result):
+        """Count and sample child references missing from the parent key set"""
+        parent_ints, parent_strings = parent_keys
+        widths = key_widths(entry['parent'], entry['parent_columns'])
+        sample_columns = [c for c in get_primary_key(entry['child']) if c not in entry['columns']]
+        for batch in batches:
+            for column, value in entry['where'].items():
+                batch = batch.filter(pc.equal(pc.cast(batch.column(column), pa.string()), value))
+            result['rows'] += batch.num_rows
+
+            present, numeric, ints, strings = encode_keys(batch, entry['columns'], widths)
+            valid = np.ones(batch.num_rows, dtype=bool)
+            valid[numeric] = contains(parent_ints, ints)
+            valid[present & ~numeric] = contains(parent_strings, strings)
+            violating = present & ~valid
+
+            result['checked'] += int(present.sum())
+            result['blank'] += int((~present).sum())
+            result['violations'] += int(violating.sum())
+            if violating.any() and len(result['samples']) < self.sample_rows:
+                rows = batch.select(entry['columns'] + sample_columns).filter(pa.array(violating))
+                take = self.sample_rows - len(result['samples'])
+                result['samples'].extend(rows.slice(0, take).to_pylist())
+        return result
+
+    def check(self, entry):
+        """Violation counts and sample rows for one relationship"""
+        result = self.new_result(entry)
+        needed = self.child_columns(entry, result)
+        if needed is None:
+            return result
+
+        start = time.perf_counter()
+        child_path = self.table_files[entry['child']]
+        self.io.bytes_read = bytes_to_read(child_path, needed)
+        parent_keys = self.parent_keys(entry['parent'], entry['parent_columns'])
+        batches = iter_table_batches(child_path, entry['child'], self.batch_rows, columns=needed)
+        self.probe(entry, batches, parent_keys, result)
+
+        result['seconds'] = time.perf_counter() - start
+        result['bytes_read'] = self.io.bytes_read
+        result['status'] = 'OK' if result['violations'] == 0 else 'FAILED'
+        return result
+
+    def check_all(self, catalog=FOREIGN_KEYS, tables=None):
+        """Check every relationship (optionally only those touching the given tables)"""
+        for entry in catalog:
+            if tables and entry['child'] not in tables and entry['parent'] not in tables:
+                continue
+            self.results.append(self.check(entry))
+        return self.results
+
+    def key_set_bytes(self):
+        """Memory held by the parent key sets"""
+        return sum(ints.nbytes + sum(len(s) + 49 for s in strings)
+                   for ints, strings in self.key_sets.values())
+
+    def print_results(self):
+        """Print results grouped by catalog group"""
+        group = None
+        for r in self.results:
+            if r['group'] != group:
+                group = r['group']
+                print(f"\n{group}:")
+            for line in format_result(r):
+                print(line)
+
+    def save_report(self, path=REPORT_PATH):
+        """Write one row per relationship"""
+        report = pd.DataFrame([
+            {k: (str(v) if k == 'samples' else v) for k, v in r.items()} for r in self.results
+        ])
+        report.to_csv(path, index=False)
+        return path
+
+
+def main():
+    """Check every catalog relationship"""
+    parser = argparse.ArgumentParser(description='Streaming referential integrity check')
+    parser.add_argument('tables', nargs='*', help='Only relationships touching these tables (default: all)')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f'Child rows per probe batch (default {BATCH_ROWS:,})')
+    parser.add_argument('--sample-rows', type=int, default=SAMPLE_ROWS,
+                        help=f'Violating rows kept per relationship (default {SAMPLE_ROWS})')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("REFERENTIAL INTEGRITY CHECK")
+    print("="*80)
+    checker = ForeignKeyChecker(batch_rows=args.batch_rows, sample_rows=args.sample_rows)
+    start = time.perf_counter()
+    results = checker.check_all(tables=args.tables)
+    checker.print_results()
+
+    failed = [r for r in results if r['status'] == 'FAILED']
+    print(f"\nRelationships: {len(results)} | failed: {len(failed)} | "
+          f"skipped: {sum(r['status'] == 'SKIPPED' for r in results)}")
+    print(f"Parent key sets: {len(checker.key_sets)} ({checker.key_set_bytes() / (1024 * 1024):.2f}MB) | "
+          f"{time.perf_counter() - start:.2f}s")
+    print(f"\n✓ Report saved to: {os.path.basename(checker.save_report())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ import random
 from faker import Faker
 import os
 
+from data_catalog import output_dir
+
 # Initialize Faker
 fake = Faker(['en_US'])
 Faker.seed(42)
@@ -25,10 +27,8 @@ NUM_OPPORTUNITIES_PER_ACCOUNT = 2
 NUM_CASES_PER_ACCOUNT = 5
 NUM_QUOTES_PER_OPP = 1
 
-# Get absolute paths
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw', 'crm')
+# Output directory (data/raw/crm, from the table catalog)
+OUTPUT_DIR = output_dir('crm')
 
 
 class SalesforceCRMGenerator:
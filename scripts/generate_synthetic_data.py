@@ -10,6 +10,8 @@ import random
 from faker import Faker
 import os
 
+from data_catalog import output_dir
+
 # Initialize Faker with multiple locales
 fake = Faker(['en_US', 'de_DE', 'en_GB', 'fr_FR'])
 Faker.seed(42)
@@ -22,10 +24,8 @@ NUM_MATERIALS = 2000  # Reduced for testing, can scale to 200K
 NUM_ORDERS_PER_DAY = 500
 NUM_DAYS = 30
 
-# Get absolute path to project root
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'data')
+# Output directory (data/bronze, from the table catalog)
+OUTPUT_DIR = output_dir('sap')
 
 
 class SAPDataGenerator:
@@ -99,7 +99,7 @@ class SAPDataGenerator:
             {'BUKRS': '3000', 'BUTXT': 'UK Limited', 'WAERS': 'GBP', 'LAND1': 'GB'},
         ]
         df = pd.DataFrame(data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/organizational/T001.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/organizational/T001.csv', index=False)
         return df
 
     def generate_tvko_sales_orgs(self):
@@ -110,7 +110,7 @@ class SAPDataGenerator:
             {'VKORG': '3000', 'VTEXT': 'UK Sales Org', 'BUKRS': '3000'},
         ]
         df = pd.DataFrame(data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/organizational/TVKO.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/organizational/TVKO.csv', index=False)
         return df
 
     def generate_tvtw_distribution_channels(self):
@@ -121,7 +121,7 @@ class SAPDataGenerator:
             {'VTWEG': '30', 'VTEXT': 'E-Commerce'},
         ]
         df = pd.DataFrame(data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/organizational/TVTW.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/organizational/TVTW.csv', index=False)
         return df
 
     def generate_tspa_divisions(self):
@@ -132,7 +132,7 @@ class SAPDataGenerator:
             {'SPART': '02', 'VTEXT': 'Machinery'},
         ]
         df = pd.DataFrame(data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/organizational/TSPA.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/organizational/TSPA.csv', index=False)
         return df
 
     def generate_t023_material_groups(self):
@@ -143,7 +143,7 @@ class SAPDataGenerator:
             'MATKL': groups,
             'WGBEZ': descriptions
         })
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/organizational/T023.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/organizational/T023.csv', index=False)
         return df
 
     def generate_t005_countries(self):
@@ -156,7 +156,7 @@ class SAPDataGenerator:
             {'LAND1': 'CN', 'LANDX': 'China', 'NATIO': 'CN'},
         ]
         df = pd.DataFrame(countries)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/organizational/T005.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/organizational/T005.csv', index=False)
         return df
 
     def generate_t171t_product_hierarchy(self):
@@ -169,7 +169,7 @@ class SAPDataGenerator:
                 'VTEXT': f'Product Group {i}'
             })
         df = pd.DataFrame(hierarchies)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/product_hierarchy/T171T.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/product_hierarchy/T171T.csv', index=False)
         return df
 
     # ==================== CUSTOMER MASTER DATA ====================
@@ -192,7 +192,7 @@ class SAPDataGenerator:
                 'LOEVM': ''  # Not deleted
             })
         df = pd.DataFrame(customers)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/customer/KNA1.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/customer/KNA1.csv', index=False)
         return df
 
     def generate_knvv_customer_sales(self):
@@ -214,7 +214,7 @@ class SAPDataGenerator:
                     'LPRIO': np.random.choice(['01', '02']),  # Delivery priority
                 })
         df = pd.DataFrame(sales_data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/customer/KNVV.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/customer/KNVV.csv', index=False)
         return df
 
     def generate_knb1_customer_company(self):
@@ -230,7 +230,7 @@ class SAPDataGenerator:
                 'FDGRV': '',  # Planning group
             })
         df = pd.DataFrame(company_data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/customer/KNB1.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/customer/KNB1.csv', index=False)
         return df
 
     def generate_knvp_customer_partners(self):
@@ -248,7 +248,7 @@ class SAPDataGenerator:
                     'KUNN2': sales_data['KUNNR'],  # Partner is same customer for simplicity
                 })
         df = pd.DataFrame(partners)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/customer/KNVP.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/customer/KNVP.csv', index=False)
         return df
 
     # ==================== MATERIAL MASTER DATA ====================
@@ -269,7 +269,7 @@ class SAPDataGenerator:
                 'LAEDA': (datetime.now() - timedelta(days=random.randint(1, 100))).strftime('%Y%m%d'),
             })
         df = pd.DataFrame(materials)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/material/MARA.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/material/MARA.csv', index=False)
         return df
 
     def generate_marc_material_plant(self):
@@ -290,7 +290,7 @@ class SAPDataGenerator:
                     'EKGRP': '001',  # Purchasing group
                 })
         df = pd.DataFrame(plant_data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/material/MARC.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/material/MARC.csv', index=False)
         return df
 
     def generate_makt_material_descriptions(self):
@@ -307,7 +307,7 @@ class SAPDataGenerator:
                 'MAKTX': f'{random.choice(material_names)} {random.choice(["Pro", "Plus", "Standard", "Premium", "Basic"])} {random.randint(100, 9999)}'
             })
         df = pd.DataFrame(descriptions)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/material/MAKT.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/material/MAKT.csv', index=False)
         return df
 
     def generate_mvke_material_sales(self):
@@ -327,7 +327,7 @@ class SAPDataGenerator:
                     'KTGRM': '01',  # Account assignment group
                 })
         df = pd.DataFrame(sales_data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/master/material/MVKE.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/master/material/MVKE.csv', index=False)
         return df
 
     # ==================== TRANSACTION DATA - SALES ORDERS ====================
@@ -380,7 +380,7 @@ class SAPDataGenerator:
                     })
 
         df = pd.DataFrame(orders)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/sales_orders/VBAK.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/sales_orders/VBAK.csv', index=False)
         return df
 
     def generate_vbap_sales_items(self):
@@ -419,7 +419,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(items)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/sales_orders/VBAP.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/sales_orders/VBAP.csv', index=False)
         return df
 
     def generate_vbuk_order_status(self):
@@ -440,7 +440,7 @@ class SAPDataGenerator:
             })
 
         df = pd.DataFrame(status_data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/sales_orders/VBUK.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/sales_orders/VBUK.csv', index=False)
         return df
 
     def generate_vbup_item_status(self):
@@ -460,7 +460,7 @@ class SAPDataGenerator:
             })
 
         df = pd.DataFrame(status_data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/sales_orders/VBUP.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/sales_orders/VBUP.csv', index=False)
         return df
 
     def generate_vbep_schedule_lines(self):
@@ -486,7 +486,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(schedule_lines)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/sales_orders/VBEP.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/sales_orders/VBEP.csv', index=False)
         return df
 
     # ==================== TRANSACTION DATA - DELIVERIES ====================
@@ -521,7 +521,7 @@ class SAPDataGenerator:
             })
 
         df = pd.DataFrame(deliveries)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/deliveries/LIKP.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/deliveries/LIKP.csv', index=False)
         return df
 
     def generate_lips_delivery_items(self):
@@ -552,7 +552,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(delivery_items)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/deliveries/LIPS.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/deliveries/LIPS.csv', index=False)
         return df
 
     # ==================== TRANSACTION DATA - BILLING ====================
@@ -588,7 +588,7 @@ class SAPDataGenerator:
             })
 
         df = pd.DataFrame(billing_docs)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/billing/VBRK.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/billing/VBRK.csv', index=False)
         return df
 
     def generate_vbrp_billing_items(self):
@@ -622,7 +622,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(billing_items)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/billing/VBRP.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/billing/VBRP.csv', index=False)
         return df
 
     # ==================== TRANSACTION DATA - SUPPORT TABLES ====================
@@ -662,7 +662,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(doc_flows)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/document_flow/VBFA.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/document_flow/VBFA.csv', index=False)
         return df
 
     def generate_konv_pricing(self):
@@ -692,7 +692,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(pricing_data)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/pricing/KONV.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/pricing/KONV.csv', index=False)
         return df
 
     def generate_vbpa_partners(self):
@@ -712,7 +712,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(partners)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/partners/VBPA.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/partners/VBPA.csv', index=False)
         return df
 
     def generate_vttk_shipments(self):
@@ -739,7 +739,7 @@ class SAPDataGenerator:
             })
 
         df = pd.DataFrame(shipments)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/shipment/VTTK.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/shipment/VTTK.csv', index=False)
         return df
 
     def generate_vttp_shipment_items(self):
@@ -760,7 +760,7 @@ class SAPDataGenerator:
                 })
 
         df = pd.DataFrame(shipment_items)
-        df.to_csv(f'{OUTPUT_DIR}/bronze/transactional/shipment/VTTP.csv', index=False)
+        df.to_csv(f'{OUTPUT_DIR}/transactional/shipment/VTTP.csv', index=False)
         return df
 
     def save_all_data(self):
@@ -797,11 +797,11 @@ def main():
     generator.generate_transaction_data()
     generator.save_all_data()
 
-    print(f"\nAll CSV files saved to: {OUTPUT_DIR}/bronze/")
+    print(f"\nAll CSV files saved to: {OUTPUT_DIR}/")
     print("\nNext steps:")
     print("  1. Review the generated CSV files")
     print("  2. Convert CSVs to Parquet format for ADLS upload")
-    print("  3. Upload to Azure Data Lake Storage Gen2")
+    print("  3. Upload to Azure Data Lake Storage Gen2 (scripts/upload_to_adls.py)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,299 @@
+"""
+Incremental Partition-Aware Referential Integrity
+Persists per-partition validation state so a run only scans the partitions
+that are new or changed since the previous run
+
+Partitions are Parquet row groups, identified by a fingerprint of their
+metadata: row count, chunk sizes and column statistics. A CSV file is a single
+partition, so any change to a CSV source re-checks the whole table; runs are
+only proportional to the new data on Parquet input (convert_to_parquet.py).
+The state keeps
+- per relationship: rows, violations and samples of every child partition,
+  plus the fingerprint of the parent key set they were checked against
+- per parent key: the encoded key set of every parent partition
+
+A run reads keys only from new parent partitions and compares the rebuilt key
+set with the previous one. Removed keys revalidate every child partition;
+added keys revalidate only the partitions that had violations. A relationship
+last checked against an older key set than the stored one (a run limited to
+other tables advanced it) is revalidated in full. New or changed child
+partitions are probed and the whole-table result is re-aggregated from the
+stored partition results.
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sap_schema import bytes_to_read, iter_table_batches
+from foreign_keys import FOREIGN_KEYS, ForeignKeyChecker, contains, key_widths, union_keys
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+STATE_DIR = os.path.join(PROJECT_ROOT, 'data', 'quality', 'validation_state')
+RESULTS_FILE = 'fk_partitions.json'
+KEY_SET_DIR = 'key_sets'
+
+
+# ==================== PARTITIONS ====================
+
+def fingerprint(parts):
+    """Short stable hash of JSON-serializable metadata"""
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()[:16]
+
+
+def table_partitions(path):
+    """Partitions of a table file: [{'fingerprint', 'rows', 'row_groups'}] from metadata only"""
+    if not str(path).endswith('.parquet'):
+        stat = os.stat(path)
+        return [{'fingerprint': fingerprint([os.path.basename(path), stat.st_size, stat.st_mtime_ns]),
+                 'rows': None, 'row_groups': None}]
+
+    metadata = pq.read_metadata(path)
+    partitions = []
+    seen = set()
+    for index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(index)
+        parts = [row_group.num_rows, row_group.total_byte_size]
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            stats = chunk.statistics
+            bounds = [stats.null_count, stats.min, stats.max] if stats is not None and stats.has_min_max else None
+            parts.append([chunk.path_in_schema, chunk.total_compressed_size, bounds])
+        key = fingerprint(parts)
+        # Identical row groups within a file stay distinct partitions
+        while key in seen:
+            key = fingerprint([key, index])
+        seen.add(key)
+        partitions.append({'fingerprint': key, 'rows': row_group.num_rows, 'row_groups': [index]})
+    return partitions
+
+
+# ==================== PERSISTED KEY SETS ====================
+
+def key_set_path(state_dir, table_name, columns):
+    """Stored key set of a parent key (one row per partition)"""
+    return os.path.join(state_dir, KEY_SET_DIR, f"{table_name}.{'-'.join(columns)}.parquet")
+
+
+def _list_array(arrays, value_type):
+    offsets = np.concatenate([[0], np.cumsum([len(a) for a in arrays])]).astype(np.int32)
+    values = np.concatenate(arrays) if arrays else np.array([])
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values, type=value_type))
+
+
+def save_key_set(path, partitions, widths):
+    """Write {fingerprint: (ints, strings)} with the key widths used to encode it"""
+    fingerprints = list(partitions)
+    table = pa.table({
+        'partition': pa.array(fingerprints, pa.string()),
+        'int_keys': _list_array([partitions[f][0] for f in fingerprints], pa.int64()),
+        'string_keys': _list_array([partitions[f][1] for f in fingerprints], pa.string()),
+    }).replace_schema_metadata({'widths': json.dumps(widths)})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def load_key_set(path, widths):
+    """{fingerprint: (ints, strings)}; empty when missing or encoded with other widths"""
+    if not os.path.exists(path):
+        return {}
+    table = pq.read_table(path)
+    if json.loads(table.schema.metadata.get(b'widths', b'null')) != widths:
+        return {}
+    partitions = {}
+    int_keys = table.column('int_keys').combine_chunks()
+    string_keys = table.column('string_keys').combine_chunks()
+    int_values = int_keys.values.to_numpy()
+    string_values = np.asarray(string_keys.values.to_numpy(zero_copy_only=False), dtype=object)
+    int_offsets, string_offsets = int_keys.offsets.to_numpy(), string_keys.offsets.to_numpy()
+    for i, key in enumerate(table.column('partition').to_pylist()):
+        partitions[key] = (int_values[int_offsets[i]:int_offsets[i + 1]],
+                           string_values[string_offsets[i]:string_offsets[i + 1]])
+    return partitions
+
+
+# ==================== CHECKER ====================
+
+class IncrementalForeignKeyChecker(ForeignKeyChecker):
+    """ForeignKeyChecker that reuses stored partition results and parent key sets"""
+
+    def __init__(self, table_files=None, state_dir=STATE_DIR, **kwargs):
+        super().__init__(table_files, **kwargs)
+        self.state_dir = state_dir
+        results_path = os.path.join(state_dir, RESULTS_FILE)
+        self.state = {}
+        if os.path.exists(results_path):
+            with open(results_path) as f:
+                self.state = json.load(f)
+        self.new_state = {}
+        # (table, columns) → 'new', 'unchanged', 'added' or 'removed' since the previous run
+        self.key_changes = {}
+        # (table, columns) → fingerprints of the stored and the current parent key set
+        self.key_fingerprints = {}
+        self.pending_key_sets = {}
+        self.stats = {'partitions': 0, 'partitions_checked': 0, 'rows': 0, 'rows_scanned': 0}
+
+    def parent_keys(self, table_name, columns):
+        """Parent key set rebuilt from stored partitions plus keys of new partitions"""
+        cache_key = (table_name, tuple(columns))
+        with self.lock:
+            key_lock = self.key_locks.setdefault(cache_key, threading.Lock())
+        with key_lock:
+            if cache_key in self.key_sets:
+                return self.key_sets[cache_key]
+            widths = key_widths(table_name, columns)
+            path = key_set_path(self.state_dir, table_name, columns)
+            stored = load_key_set(path, widths)
+            partitions = {}
+            for partition in table_partitions(self.table_files[table_name]):
+                key = partition['fingerprint']
+                partitions[key] = stored[key] if key in stored else \
+                    self.read_keys(table_name, columns, partition['row_groups'])
+            keys = union_keys(list(partitions.values()))
+
+            if not stored:
+                change = 'new'
+            elif set(partitions) == set(stored):
+                change = 'unchanged'
+            else:
+                old_ints, old_strings = union_keys(list(stored.values()))
+                kept = contains(keys[0], old_ints).all() and contains(keys[1], old_strings).all()
+                if not kept:
+                    change = 'removed'
+                else:
+                    change = 'added' if len(keys[0]) + len(keys[1]) > len(old_ints) + len(old_strings) \
+                        else 'unchanged'
+            if set(partitions) != set(stored):
+                self.pending_key_sets[path] = (partitions, widths)
+            self.key_changes[cache_key] = change
+            self.key_fingerprints[cache_key] = {
+                'stored': fingerprint(sorted(stored)) if stored else None,
+                'current': fingerprint(sorted(partitions)),
+            }
+            self.key_sets[cache_key] = keys
+            return keys
+
+    def parent_change(self, entry, name):
+        """Parent key change since this relationship was last checked
+
+        The stored key set is shared by every relationship on the parent key;
+        the computed change only applies to relationships checked against it.
+        """
+        cache_key = (entry['parent'], tuple(entry['parent_columns']))
+        fingerprints = self.key_fingerprints[cache_key]
+        checked_against = self.state.get(name, {}).get('parent_key_set')
+        if checked_against is not None and checked_against == fingerprints['current']:
+            return 'unchanged'
+        if checked_against is None or checked_against != fingerprints['stored']:
+            return 'removed'
+        return self.key_changes[cache_key]
+
+    def check(self, entry):
+        """Probe new or changed child partitions; aggregate the rest from stored state"""
+        result = self.new_result(entry)
+        needed = self.child_columns(entry, result)
+        if needed is None:
+            return result
+
+        start = time.perf_counter()
+        child, name = entry['child'], result['relationship']
+        child_path = self.table_files[child]
+        self.io.bytes_read = 0
+        parent_keys = self.parent_keys(entry['parent'], entry['parent_columns'])
+        parent = (entry['parent'], tuple(entry['parent_columns']))
+        change = self.parent_change(entry, name)
+        stored = self.state.get(name, {}).get('partitions', {})
+
+        partitions = {}
+        scanned = rows_scanned = 0
+        for partition in table_partitions(child_path):
+            key = partition['fingerprint']
+            previous = stored.get(key)
+            if previous is not None and (change == 'unchanged' or (change == 'added' and not previous['violations'])):
+                partitions[key] = previous
+                continue
+            self.io.bytes_read += bytes_to_read(child_path, needed, partition['row_groups'])
+            batches = iter_table_batches(child_path, child, self.batch_rows, columns=needed,
+                                         row_groups=partition['row_groups'])
+            partitions[key] = self.probe(
+                entry, batches, parent_keys, {'rows': 0, 'checked': 0, 'blank': 0, 'violations': 0, 'samples': []}
+            )
+            scanned += 1
+            rows_scanned += partitions[key]['rows']
+
+        for part in partitions.values():
+            for field in ('rows', 'checked', 'blank', 'violations'):
+                result[field] += part[field]
+            result['samples'].extend(part['samples'][:self.sample_rows - len(result['samples'])])
+        result.update(partitions=len(partitions), partitions_checked=scanned, rows_scanned=rows_scanned,
+                      parent_change=change)
+        with self.lock:
+            self.new_state[name] = {'child_file': os.path.relpath(child_path, PROJECT_ROOT),
+                                    'parent_key_set': self.key_fingerprints[parent]['current'],
+                                    'partitions': partitions}
+            self.stats['partitions'] += len(partitions)
+            self.stats['partitions_checked'] += scanned
+            self.stats['rows'] += result['rows']
+            self.stats['rows_scanned'] += rows_scanned
+
+        result['seconds'] = time.perf_counter() - start
+        result['bytes_read'] = self.io.bytes_read
+        result['status'] = 'OK' if result['violations'] == 0 else 'FAILED'
+        return result
+
+    def save_state(self):
+        """Persist partition results, then the key sets they were checked against
+
+        Results go first: if the key sets are not written, the next run still
+        sees the older key sets as changed and revalidates conservatively.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        results_path = os.path.join(self.state_dir, RESULTS_FILE)
+        with open(results_path + '.tmp', 'w') as f:
+            json.dump({**self.state, **self.new_state}, f, default=str)
+        os.replace(results_path + '.tmp', results_path)
+        for path, (partitions, widths) in self.pending_key_sets.items():
+            save_key_set(path, partitions, widths)
+        return results_path
+
+    def summary(self):
+        """One-line partition reuse summary"""
+        s = self.stats
+        return (f"{s['partitions_checked']:,} of {s['partitions']:,} child partitions validated | "
+                f"{s['rows_scanned']:,} of {s['rows']:,} rows scanned | "
+                f"{len(self.pending_key_sets)} parent key sets updated")
+
+
+def main():
+    """Incrementally check every catalog relationship"""
+    parser = argparse.ArgumentParser(description='Incremental partition-aware referential integrity check')
+    parser.add_argument('tables', nargs='*', help='Only relationships touching these tables (default: all)')
+    parser.add_argument('--state-dir', default=STATE_DIR,
+                        help='Validation state directory (default: data/quality/validation_state)')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("INCREMENTAL REFERENTIAL INTEGRITY CHECK")
+    print("="*80)
+    checker = IncrementalForeignKeyChecker(state_dir=args.state_dir)
+    start = time.perf_counter()
+    results = checker.check_all(FOREIGN_KEYS, tables=args.tables)
+    checker.print_results()
+    print(f"\nRelationships: {len(results)} | "
+          f"failed: {sum(r['status'] == 'FAILED' for r in results)} | {time.perf_counter() - start:.2f}s")
+    print(f"Incremental: {checker.summary()}")
+    print(f"\n✓ State saved to: {os.path.relpath(checker.save_state(), PROJECT_ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Integer Surrogate Keys for SAP Document and Master Keys
+Maps the zero-padded string keys (10-character VBELN/KUNNR, 18-character
+MATNR/PRDHA) to dense integer ids with one persisted, bidirectional dictionary
+per key domain
+
+- Domains group the columns that share a number range: VBELN/VBELV/VGBEL/AUBEL
+  are all SD document numbers, KUNNR/KUNAG/... all customer numbers.
+- Ids are assigned in order of first appearance and never change, so tables
+  built at different times join on them. Each batch of new keys gets ids in
+  key order.
+- The silver build adds a <COLUMN>_SK column next to every key column; join
+  paths read and join those and decode back to strings only for presentation.
+"""
+
+import os
+import argparse
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from sap_schema import file_columns
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+# Leading underscore: the table catalog does not treat the dictionaries as silver tables
+KEYS_DIR = os.path.join(DATA_DIR, 'silver', '_keys')
+
+# Key domain → columns drawing on its number range (SAP_ prefixed cross-reference columns included)
+KEY_DOMAINS = {
+    'VBELN': ['VBELN', 'VBELV', 'VGBEL', 'AUBEL'],
+    'KUNNR': ['KUNNR', 'KUNN2', 'KUNAG', 'KUNRG'],
+    'MATNR': ['MATNR'],
+    'PRDHA': ['PRDHA', 'PRODH'],
+}
+COLUMN_DOMAINS = {column: domain for domain, columns in KEY_DOMAINS.items() for column in columns}
+SURROGATE_SUFFIX = '_SK'
+
+# Configuration
+BENCHMARK_REPEATS = 5
+
+
+def key_domain(column_name):
+    """Key domain of a column (None for columns that are not encoded)"""
+    base_name = column_name[4:] if column_name.startswith('SAP_') else column_name
+    return COLUMN_DOMAINS.get(base_name)
+
+
+def surrogate_name(column_name):
+    """Surrogate id column of a key column (VBELN → VBELN_SK)"""
+    return column_name + SURROGATE_SUFFIX
+
+
+def has_surrogate_keys(path, columns):
+    """Whether a table file/dataset carries surrogate ids for all the given key columns"""
+    available = set(file_columns(path))
+    return all(surrogate_name(c) in available for c in columns)
+
+
+# ==================== DICTIONARIES ====================
+
+class KeyDictionary:
+    """Append-only key ↔ id mapping of one domain (id = position in the key array)"""
+
+    def __init__(self, domain, keys=None):
+        self.domain = domain
+        self.keys = keys if keys is not None else pa.array([], pa.string())
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def id_type(self):
+        """int32 while the domain fits, int64 beyond"""
+        return pa.int32() if len(self.keys) < 2**31 else pa.int64()
+
+    def encode(self, array, extend=False):
+        """Ids of the keys (null for blank keys and, unless extending, for unknown keys)"""
+        if not pa.types.is_string(array.type):
+            array = pc.cast(array, pa.string())
+        text = pc.if_else(pc.equal(array, ''), pa.scalar(None, pa.string()), array)
+        ids = pc.index_in(text, value_set=self.keys)
+        if extend:
+            new = pc.unique(pc.filter(text, pc.and_(pc.is_null(ids), pc.is_valid(text))))
+            if isinstance(new, pa.ChunkedArray):
+                new = new.combine_chunks()
+            if len(new):
+                self.keys = pa.concat_arrays([self.keys, pc.take(new, pc.sort_indices(new))])
+                ids = pc.index_in(text, value_set=self.keys)
+        return ids.cast(self.id_type)
+
+    def decode(self, ids):
+        """Keys of the ids (null ids stay null)"""
+        return pc.take(self.keys, ids)
+
+    def path(self, key_dir=KEYS_DIR):
+        return os.path.join(key_dir, f'{self.domain}.parquet')
+
+    def save(self, key_dir=KEYS_DIR):
+        """Write the dictionary (ID, KEY) and swap it in atomically"""
+        os.makedirs(key_dir, exist_ok=True)
+        table = pa.table({'ID': pa.array(range(len(self.keys)), self.id_type), 'KEY': self.keys})
+        tmp_path = self.path(key_dir) + '.__writing__'
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.path(key_dir))
+
+    @classmethod
+    def load(cls, domain, key_dir=KEYS_DIR):
+        """Persisted dictionary of a domain (empty when none has been built)"""
+        path = os.path.join(key_dir, f'{domain}.parquet')
+        if not os.path.exists(path):
+            return cls(domain)
+        keys = pq.read_table(path, columns=['KEY']).column('KEY')
+        return cls(domain, keys.combine_chunks() if keys.num_chunks != 1 else keys.chunk(0))
+
+
+class KeyEncoder:
+    """Dictionaries of every domain: encode key columns of tables, decode ids back"""
+
+    def __init__(self, key_dir=KEYS_DIR):
+        self.key_dir = key_dir
+        self.dictionaries = {}
+
+    def dictionary(self, domain):
+        if domain not in self.dictionaries:
+            self.dictionaries[domain] = KeyDictionary.load(domain, self.key_dir)
+        return self.dictionaries[domain]
+
+    def encode(self, column_name, array, extend=False):
+        """Surrogate ids of a key column's values"""
+        return self.dictionary(key_domain(column_name)).encode(array, extend)
+
+    def decode(self, column_name, ids):
+        """Key strings of a key column's surrogate ids"""
+        return self.dictionary(key_domain(column_name)).decode(ids)
+
+    def add_surrogates(self, table, extend=False):
+        """Table with a <COLUMN>_SK id column after every key column (new keys get ids when extending)"""
+        for name in list(table.column_names):
+            if key_domain(name) is None or surrogate_name(name) in table.column_names:
+                continue
+            ids = self.encode(name, table.column(name), extend)
+            table = table.add_column(table.schema.get_field_index(name) + 1, surrogate_name(name), ids)
+        return table
+
+    def decode_table(self, table):
+        """Presentation form: every <COLUMN>_SK replaced by the key strings"""
+        for name in list(table.column_names):
+            if not name.endswith(SURROGATE_SUFFIX) or key_domain(name[:-len(SURROGATE_SUFFIX)]) is None:
+                continue
+            column = name[:-len(SURROGATE_SUFFIX)]
+            index = table.schema.get_field_index(name)
+            if column in table.column_names:
+                table = table.remove_column(index)
+            else:
+                table = table.set_column(index, column, self.decode(column, table.column(name)))
+        return table
+
+    def save(self):
+        """Persist every dictionary loaded or extended"""
+        for dictionary in self.dictionaries.values():
+            dictionary.save(self.key_dir)
+
+
+# ==================== BENCHMARK ====================
+
+def benchmark_joins(repeats=BENCHMARK_REPEATS):
+    """Revenue-cube joins on string keys vs surrogate ids over the silver tables
+
+    Returns one row per step with the best-of-repeats seconds and the memory
+    of the key columns for both forms.
+    """
+    from data_catalog import locate, read_table_pandas
+
+    joins = [
+        ('VBAP ⋈ VBAK on VBELN', 'VBAP', 'VBAK', ['VBELN']),
+        ('⋈ MARA on MATNR', None, 'MARA', ['MATNR']),
+        ('⋈ KNVV on KUNNR', None, 'KNVV', ['KUNNR']),
+    ]
+    columns = {'VBAK': ['VBELN', 'KUNNR'], 'VBAP': ['VBELN', 'MATNR'], 'MARA': ['MATNR'], 'KNVV': ['KUNNR']}
+    for table_name, keys in columns.items():
+        path = locate(table_name, 'silver')
+        if path is None or not has_surrogate_keys(path, keys):
+            raise SystemExit(f"silver {table_name} has no surrogate keys: run scripts/build_silver.py first")
+
+    def best(func):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    results = []
+    frames = {}
+    for form in ('string', 'surrogate'):
+        def load():
+            loaded = {}
+            for table_name, keys in columns.items():
+                names = keys if form == 'string' else [surrogate_name(k) for k in keys]
+                frame = read_table_pandas(table_name, columns=names, layer='silver', cache=False)
+                loaded[table_name] = frame.rename(columns={surrogate_name(k): k for k in keys})
+            return loaded
+        seconds, frames[form] = best(load)
+        memory = sum(f.memory_usage(deep=True, index=False).sum() for f in frames[form].values())
+        results.append({'step': 'read key columns', 'form': form, 'seconds': seconds, 'bytes': memory})
+
+        detail = frames[form]['VBAP']
+        for label, _, right, on in joins:
+            right_frame = frames[form][right].drop_duplicates(on)
+            seconds, joined = best(lambda: detail.merge(right_frame, on=on, how='left'))
+            memory = joined.memory_usage(deep=True, index=False).sum()
+            results.append({'step': label, 'form': form, 'seconds': seconds, 'bytes': memory})
+            detail = joined
+    return results
+
+
+def print_benchmark(results):
+    by_step = {}
+    for r in results:
+        by_step.setdefault(r['step'], {})[r['form']] = r
+    print("\n" + "="*80)
+    print("STRING KEYS VS SURROGATE IDS (silver, best of "
+          f"{BENCHMARK_REPEATS})")
+    print("="*80)
+    print(f"  {'Step':24s} {'String s':>10s} {'Id s':>10s} {'Speedup':>8s} "
+          f"{'String MB':>10s} {'Id MB':>8s} {'Memory':>8s}")
+    for step, forms in by_step.items():
+        s, i = forms['string'], forms['surrogate']
+        print(f"  {step:24s} {s['seconds']:10.4f} {i['seconds']:10.4f} {s['seconds'] / i['seconds']:7.1f}x "
+              f"{s['bytes'] / 1024 / 1024:10.2f} {i['bytes'] / 1024 / 1024:8.2f} "
+              f"{1 - i['bytes'] / s['bytes']:7.0%}↓")
+
+
+# ==================== MAIN ====================
+
+def main():
+    """Show the key dictionaries, decode ids, or benchmark joins on them"""
+    parser = argparse.ArgumentParser(description='Integer surrogate keys of SAP key domains')
+    parser.add_argument('--decode', nargs='+', metavar=('DOMAIN', 'ID'),
+                        help='Print the keys of surrogate ids of a domain (e.g. --decode KUNNR 0 1 2)')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Time revenue-cube joins on string keys vs surrogate ids (silver)')
+    args = parser.parse_args()
+
+    encoder = KeyEncoder()
+    if args.decode:
+        domain, ids = args.decode[0], [int(i) for i in args.decode[1:]]
+        if domain not in KEY_DOMAINS:
+            raise SystemExit(f"Unknown domain {domain} (choose from {', '.join(KEY_DOMAINS)})")
+        for id_, key in zip(ids, encoder.dictionary(domain).decode(pa.array(ids)).to_pylist()):
+            print(f"{id_}\t{key}")
+        return
+
+    print("="*80)
+    print("SURROGATE KEY DICTIONARIES")
+    print("="*80)
+    print(f"\n  {'Domain':8s} {'Keys':>10s} {'Id type':>8s} {'File KB':>8s}  Columns")
+    for domain, columns in KEY_DOMAINS.items():
+        dictionary = encoder.dictionary(domain)
+        path = dictionary.path()
+        size = os.path.getsize(path) / 1024 if os.path.exists(path) else 0
+        print(f"  {domain:8s} {len(dictionary):10,} {str(dictionary.id_type):>8s} {size:8.1f}  "
+              f"{', '.join(columns)}")
+    print(f"\nDictionaries: {os.path.relpath(KEYS_DIR, PROJECT_ROOT)} (built by scripts/build_silver.py)")
+
+    if args.benchmark:
+        print_benchmark(benchmark_joins())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Embedded SQL over the Local Parquet Lake
+Registers every catalog table as a DuckDB view and runs the queries documented
+in CRM_SAP_LINKAGE.md, with DuckDB's multi-threaded vectorized execution
+directly on the Parquet files
+
+Views
+- raw/bronze tables by name (KNA1, Account, Account_Customer_XREF, ...) plus
+  the documented aliases SAP_<TABLE> and CRM_<TABLE>
+- silver tables in the silver schema (silver.VBAK), hive partitions included
+
+A table whose freshest copy is a CSV (no Parquet yet, or an outdated one) is
+read once through the catalog and scanned as a typed Arrow table, so zero-padded
+keys and dates keep their registry types.
+
+DuckDB is optional: pip install duckdb
+"""
+
+import os
+import argparse
+import time
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from data_catalog import catalog, locate, read_cache, read_table, read_table_pandas
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+# Documented view aliases by catalog area
+AREA_PREFIXES = {'sap': 'SAP_', 'crm': 'CRM_'}
+SILVER_SCHEMA = 'silver'
+
+# Configuration
+PRINT_ROWS = 20
+BENCHMARK_REPEATS = 5
+
+
+# ==================== QUERIES ====================
+
+# CRM_SAP_LINKAGE.md queries in DuckDB's dialect (DATEDIFF/DATE_SUB rewritten,
+# GROUP BY ALL for the Customer 360 roll-up)
+QUERIES = {
+    'account_customer': ('SAP customer details for CRM accounts', """
+        SELECT a.Name AS AccountName, x.SAP_KUNNR, k.NAME1 AS SAP_CustomerName, k.LAND1 AS Country
+        FROM CRM_Account a
+        JOIN Account_Customer_XREF x ON a.Id = x.CRM_AccountId
+        JOIN SAP_KNA1 k ON x.SAP_KUNNR = k.KUNNR
+    """),
+    'revenue_leakage': ('Closed-won opportunities without an SAP order', """
+        SELECT o.Name, o.Amount, o.CloseDate, o.AccountId, 'No SAP Order Found' AS Issue
+        FROM CRM_Opportunity o
+        LEFT JOIN Opportunity_Order_XREF x ON o.Id = x.CRM_OpportunityId
+        WHERE o.StageName = 'Closed Won'
+          AND x.SAP_VBELN IS NULL
+    """),
+    'decision_makers': ('Sold-to contacts of SAP customers', """
+        SELECT c.FirstName || ' ' || c.LastName AS ContactName, c.Title, c.Email,
+               x.SAP_KUNNR, x.SAP_PARVW AS PartnerFunction
+        FROM CRM_Contact c
+        JOIN Contact_Partner_XREF x ON c.Id = x.CRM_ContactId
+        WHERE x.SAP_PARVW = 'AG'
+    """),
+    'quote_conversion': ('Quote-to-order conversion and pricing variance', """
+        SELECT q.QuoteNumber, q.TotalPrice AS QuoteAmount, x.SAP_NETWR AS OrderAmount, x.AmountVariance,
+               CASE
+                   WHEN ABS(x.AmountVariance) / q.TotalPrice < 0.05 THEN 'Match'
+                   WHEN ABS(x.AmountVariance) / q.TotalPrice < 0.10 THEN 'Close'
+                   ELSE 'Variance'
+               END AS MatchStatus
+        FROM CRM_Quote q
+        JOIN Quote_Order_XREF x ON q.Id = x.CRM_QuoteId
+    """),
+    'customer_intelligence': ('Top 100 customers from the Customer 360 view', """
+        SELECT CRM_AccountName, Industry, AnnualRevenue AS CRM_Revenue, TotalOrders AS SAP_Orders,
+               TotalRevenue AS SAP_Revenue,
+               date_diff('day', FirstOrderDate, LastOrderDate) AS CustomerLifetimeDays
+        FROM Customer_360_View
+        ORDER BY TotalRevenue DESC NULLS LAST
+        LIMIT 100
+    """),
+    'opportunity_order_quality': ('Opportunity-to-order conversion quality', """
+        SELECT COUNT(*) AS TotalLinks,
+               SUM(CASE WHEN AmountMatch THEN 1 ELSE 0 END) AS AmountMatches,
+               SUM(CASE WHEN TimelyClosure THEN 1 ELSE 0 END) AS TimelyClosures,
+               AVG(ABS(AmountVariance)) AS AvgVariance,
+               AVG(DaysFromCloseToOrder) AS AvgDaysToOrder
+        FROM Opportunity_Order_Analysis
+    """),
+    'quote_to_cash': ('Quote-to-cash cycle', """
+        SELECT QuoteNumber, OpportunityId, SAP_VBELN AS OrderNumber, CRM_TotalPrice AS QuoteValue,
+               SAP_NETWR AS OrderValue, AmountVariance, LinkType
+        FROM Quote_to_Cash_View
+    """),
+    'recent_leakage': ('Unlinked closed-won deals of the last 90 days', """
+        SELECT o.Name AS OpportunityName, o.Amount AS DealValue, o.CloseDate, a.Name AS AccountName,
+               o.OwnerId AS SalesRep, date_diff('day', o.CloseDate, CURRENT_DATE) AS DaysSinceClosed
+        FROM CRM_Opportunity o
+        LEFT JOIN Opportunity_Order_XREF x ON o.Id = x.CRM_OpportunityId
+        JOIN CRM_Account a ON o.AccountId = a.Id
+        WHERE o.StageName = 'Closed Won'
+          AND x.SAP_VBELN IS NULL
+          AND o.CloseDate >= CURRENT_DATE - INTERVAL 90 DAY
+        ORDER BY o.Amount DESC
+    """),
+    'quote_accuracy': ('Accepted quotes fulfilled at the quoted price', """
+        SELECT q.QuoteNumber, q.TotalPrice AS QuotedAmount, x.SAP_NETWR AS OrderAmount, x.AmountVariance,
+               (x.AmountVariance / q.TotalPrice * 100) AS VariancePct,
+               CASE
+                   WHEN ABS(x.AmountVariance / q.TotalPrice) < 0.05 THEN 'Accurate'
+                   WHEN ABS(x.AmountVariance / q.TotalPrice) < 0.10 THEN 'Acceptable'
+                   ELSE 'Discrepancy'
+               END AS AccuracyRating
+        FROM CRM_Quote q
+        JOIN Quote_Order_XREF x ON q.Id = x.CRM_QuoteId
+        WHERE q.Status = 'Accepted'
+    """),
+    'customer_360_intelligence': ('Customer 360 with contacts, open opportunities and cases', """
+        SELECT c.CRM_AccountName AS CustomerName, c.Industry, c.AnnualRevenue AS CompanyRevenue,
+               c.TotalOrders AS OrderCount, c.TotalRevenue AS PurchaseHistory,
+               (c.TotalRevenue / NULLIF(c.TotalOrders, 0)) AS AvgOrderValue,
+               date_diff('day', c.FirstOrderDate, c.LastOrderDate) AS CustomerLifetimeDays,
+               COUNT(DISTINCT cnt.CRM_ContactId) AS DecisionMakers,
+               COUNT(DISTINCT opp.Id) AS OpenOpportunities,
+               SUM(CASE WHEN cs.Status != 'Closed' THEN 1 ELSE 0 END) AS OpenCases
+        FROM Customer_360_View c
+        LEFT JOIN Contact_Partner_XREF cnt ON c.SAP_KUNNR = cnt.SAP_KUNNR
+        LEFT JOIN CRM_Opportunity opp ON c.CRM_AccountId = opp.AccountId AND opp.IsClosed = FALSE
+        LEFT JOIN CRM_Case cs ON c.CRM_AccountId = cs.AccountId
+        GROUP BY ALL
+        ORDER BY PurchaseHistory DESC NULLS LAST
+    """),
+}
+
+# CRMSAPLinker.create_analytics_views as SQL: view → (linker method, query)
+ANALYTICS_VIEWS = {
+    'Customer_360_View': ('customer_360_view', """
+        SELECT x.* RENAME (CreatedDate AS CreatedDate_x), a.* RENAME (CreatedDate AS CreatedDate_y),
+               o.TotalOrders, o.TotalRevenue, o.FirstOrderDate, o.LastOrderDate
+        FROM Account_Customer_XREF x
+        LEFT JOIN CRM_Account a ON x.CRM_AccountId = a.Id
+        LEFT JOIN (
+            SELECT KUNNR AS SAP_KUNNR, COUNT(VBELN) AS TotalOrders, SUM(NETWR) AS TotalRevenue,
+                   MIN(ERDAT) AS FirstOrderDate, MAX(ERDAT) AS LastOrderDate
+            FROM SAP_VBAK
+            GROUP BY KUNNR
+        ) o ON x.SAP_KUNNR = o.SAP_KUNNR
+    """),
+    'Opportunity_Order_Analysis': ('opportunity_order_view', """
+        SELECT *,
+               COALESCE(ABS(AmountVariance) / CRM_Amount * 100 < 10, FALSE) AS AmountMatch,
+               COALESCE(DaysFromCloseToOrder BETWEEN -30 AND 30, FALSE) AS TimelyClosure
+        FROM Opportunity_Order_XREF
+    """),
+    'Quote_to_Cash_View': ('quote_to_cash_view', """
+        SELECT x.* RENAME (CreatedDate AS CreatedDate_x), q.Id, q.QuoteNumber, q.OpportunityId,
+               q.CreatedDate AS CreatedDate_y, q.ExpirationDate
+        FROM Quote_Order_XREF x
+        LEFT JOIN CRM_Quote q ON x.CRM_QuoteId = q.Id
+    """),
+}
+
+
+# ==================== ENGINE ====================
+
+def quote_identifier(name):
+    """SQL identifier (table names such as Case are keywords)"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def parquet_scan(path):
+    """DuckDB table function reading a Parquet file or a (hive-partitioned) dataset directory"""
+    if os.path.isdir(path):
+        pattern = os.path.join(path, '**', '*.parquet').replace("'", "''")
+        return f"read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)"
+    return "read_parquet('{}')".format(str(path).replace("'", "''"))
+
+
+class LakeQueryEngine:
+    """DuckDB connection with a view per catalog table"""
+
+    def __init__(self, threads=None, layers=('bronze', 'silver')):
+        if duckdb is None:
+            raise ImportError("lake_sql needs DuckDB: pip install duckdb")
+        config = {'threads': threads} if threads else {}
+        self.con = duckdb.connect(database=':memory:', config=config)
+        self.views = {}
+        for layer in layers:
+            self.register_layer(layer)
+
+    def register_layer(self, layer):
+        """Create (or replace) the views of one catalog layer"""
+        schema = SILVER_SCHEMA if layer == 'silver' else None
+        if schema:
+            self.con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        for name, entry in sorted(catalog(layer).items()):
+            path = locate(name, layer)
+            if path is None:
+                continue
+            view = f"{schema}.{quote_identifier(name)}" if schema else quote_identifier(name)
+            if str(path).endswith('.csv'):
+                # Typed through the catalog; DuckDB scans the Arrow table in place
+                arrow_name = f"__arrow_{layer}_{name}"
+                self.con.register(arrow_name, read_table(name, layer=layer))
+                source, kind = quote_identifier(arrow_name), 'arrow'
+            else:
+                source, kind = parquet_scan(path), 'parquet'
+            self.con.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM {source}")
+            self.views[f"{schema}.{name}" if schema else name] = (kind, path)
+
+            prefix = AREA_PREFIXES.get(entry['area'])
+            if prefix and not schema:
+                self.con.execute(f"CREATE OR REPLACE VIEW {quote_identifier(prefix + name)} AS SELECT * FROM {view}")
+
+    def sql(self, query):
+        """Query result as a pandas DataFrame"""
+        return self.con.execute(query).df()
+
+    def arrow(self, query):
+        """Query result as an Arrow table"""
+        return self.con.execute(query).fetch_arrow_table()
+
+    def query(self, name):
+        """Run a documented query (QUERIES) or an analytics view build (ANALYTICS_VIEWS) by name"""
+        if name in QUERIES:
+            return self.sql(QUERIES[name][1])
+        if name in ANALYTICS_VIEWS:
+            return self.sql(ANALYTICS_VIEWS[name][1])
+        raise KeyError(f"Unknown query: {name}")
+
+
+# ==================== BENCHMARK ====================
+
+def best_time(func, repeats):
+    """Best wall time in ms over repeats, with the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, result
+
+
+def same_result(actual, expected):
+    """Whether two frames hold the same rows and values (row order and dtypes aside)"""
+    if list(actual.columns) != list(expected.columns) or len(actual) != len(expected):
+        return False
+
+    def normalized(frame):
+        frame = frame.copy()
+        for name in frame.columns:
+            column = frame[name]
+            if isinstance(column.dtype, pd.CategoricalDtype) or column.dtype == object \
+                    or pd.api.types.is_string_dtype(column):
+                frame[name] = column.astype(object).where(column.notna(), None)
+            elif pd.api.types.is_datetime64_any_dtype(column):
+                frame[name] = column.astype('datetime64[ns]')
+        return frame.sort_values(list(frame.columns), na_position='last', key=lambda c: c.astype(str))\
+            .reset_index(drop=True)
+
+    try:
+        pd.testing.assert_frame_equal(normalized(actual), normalized(expected), check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def benchmark_analytics_views(engine, repeats=BENCHMARK_REPEATS):
+    """Time CRMSAPLinker's pandas view builds against the same views in DuckDB
+
+    The pandas side reads its inputs through the catalog (cache cleared every
+    run), DuckDB scans the Parquet files; both return DataFrames.
+    """
+    from create_crm_sap_links import CRMSAPLinker
+
+    def pandas_build(method):
+        read_cache.clear()
+        linker = CRMSAPLinker()
+        linker.account_customer_xref = read_table_pandas('Account_Customer_XREF')
+        linker.opportunity_order_xref = read_table_pandas('Opportunity_Order_XREF')
+        linker.quote_order_xref = read_table_pandas('Quote_Order_XREF')
+        return getattr(linker, method)()
+
+    results = []
+    for view, (method, query) in ANALYTICS_VIEWS.items():
+        pandas_ms, expected = best_time(lambda: pandas_build(method), repeats)
+        duckdb_ms, actual = best_time(lambda: engine.sql(query), repeats)
+        results.append({
+            'view': view,
+            'rows': len(actual),
+            'pandas_ms': pandas_ms,
+            'duckdb_ms': duckdb_ms,
+            'speedup': pandas_ms / duckdb_ms if duckdb_ms else float('inf'),
+            'match': same_result(actual, expected),
+        })
+    return results
+
+
+def print_benchmark(results, threads):
+    """Print pandas vs DuckDB timings per view"""
+    print(f"\n  {'View':28s} {'Rows':>8s} {'pandas ms':>10s} {'DuckDB ms':>10s} {'Speedup':>8s}  Same result")
+    for r in results:
+        print(f"  {r['view']:28s} {r['rows']:8,} {r['pandas_ms']:10.1f} {r['duckdb_ms']:10.1f} "
+              f"{r['speedup']:7.1f}x  {'✓' if r['match'] else '✗'}")
+    print(f"\n  DuckDB threads: {threads}")
+
+
+# ==================== MAIN ====================
+
+def main():
+    """Run documented queries or ad-hoc SQL over the lake"""
+    parser = argparse.ArgumentParser(description='DuckDB SQL over the local Parquet lake')
+    parser.add_argument('queries', nargs='*', help=f"Documented queries to run ({', '.join(QUERIES)})")
+    parser.add_argument('--sql', help='Ad-hoc SQL to run')
+    parser.add_argument('--list', action='store_true', help='List views and documented queries')
+    parser.add_argument('--benchmark', action='store_true', help='Compare with the pandas analytics views')
+    parser.add_argument('--threads', type=int, help='DuckDB threads (default: all cores)')
+    parser.add_argument('--limit', type=int, default=PRINT_ROWS, help=f'Rows to print (default {PRINT_ROWS})')
+    parser.add_argument('--output', help='Write the (last) result to this .csv or .parquet file')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("LAKE SQL")
+    print("="*80)
+    if duckdb is None:
+        raise SystemExit("✗ DuckDB is not installed: pip install duckdb")
+    engine = LakeQueryEngine(threads=args.threads)
+    threads = engine.con.execute("SELECT current_setting('threads')").fetchone()[0]
+    parquet_views = sum(kind == 'parquet' for kind, _ in engine.views.values())
+    print(f"Views: {len(engine.views)} ({parquet_views} on Parquet, {len(engine.views) - parquet_views} on "
+          f"Arrow tables read from CSV) | threads: {threads}")
+
+    if args.list or not (args.queries or args.sql or args.benchmark):
+        print("\nViews:")
+        for name, (kind, path) in engine.views.items():
+            print(f"  {name:34s} {kind:8s} {os.path.relpath(path, PROJECT_ROOT)}")
+        print("\nDocumented queries:")
+        for name, (description, _) in QUERIES.items():
+            print(f"  {name:28s} {description}")
+
+    result = None
+    runs = [(name, QUERIES[name][1]) for name in args.queries if name in QUERIES]
+    unknown = [name for name in args.queries if name not in QUERIES]
+    if unknown:
+        raise SystemExit(f"Unknown query: {', '.join(unknown)} (see --list)")
+    if args.sql:
+        runs.append(('sql', args.sql))
+    for name, query in runs:
+        start = time.perf_counter()
+        result = engine.sql(query)
+        print(f"\n{name}: {len(result):,} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(result.head(args.limit).to_string(index=False))
+
+    if args.output and result is not None:
+        if args.output.endswith('.parquet'):
+            result.to_parquet(args.output, index=False)
+        else:
+            result.to_csv(args.output, index=False)
+        print(f"\n✓ Result saved to: {args.output}")
+
+    if args.benchmark:
+        print_benchmark(benchmark_analytics_views(engine), threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+Versioned Lake Tables with a Transaction Log
+Immutable Parquet data files plus a JSON transaction log per table: writers
+never touch a file a reader may be reading, and every version stays readable
+until it is vacuumed
+
+Layout (data/lake/<area>/<subdir>/<TABLE>/)
+- part-<uuid>.parquet data files (under ERDAT_MONTH=YYYY-MM/ for transactional tables)
+- _txn_log/<version>.json, one commit per version: the files it adds and removes
+- _txn_log/<version>.checkpoint.json every few versions: the full file list, so
+  a snapshot replays only the commits after the newest checkpoint
+
+A commit is atomic: the log entry is written to a temporary file and hard-linked
+to its version number, which fails if another writer took that version first.
+The writer then re-reads the log and retries on the next version, unless a file
+it removes was removed by the other commit (conflict). Data files written by a
+commit that never lands are never referenced and are removed by vacuum.
+"""
+
+import os
+import json
+import uuid
+import argparse
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from sap_schema import arrow_schema, conform_table, has_schema
+from parquet_dataset import MONTH_COLUMN, add_month_column, cluster_columns, has_layout, sort_table
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+LAKE_DIR = os.path.join(PROJECT_ROOT, 'data', 'lake')
+
+LOG_DIR_NAME = '_txn_log'
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+
+# Configuration
+CHECKPOINT_INTERVAL = 10
+COMMIT_RETRIES = 20
+COMPRESSION = 'snappy'
+VACUUM_RETAIN_VERSIONS = 10
+ORPHAN_GRACE_SECONDS = 3600  # uncommitted files younger than this may belong to a running writer
+PRINT_ROWS = 10
+
+
+class CommitConflict(Exception):
+    """A concurrent commit removed files this commit depends on"""
+
+
+def is_versioned(path):
+    """Whether a directory is a versioned lake table"""
+    return os.path.isdir(os.path.join(path, LOG_DIR_NAME))
+
+
+def latest_version(path):
+    """Newest committed version of a lake table (-1 when nothing is committed)"""
+    versions = [int(n[:-5]) for n in os.listdir(os.path.join(path, LOG_DIR_NAME))
+                if n.endswith('.json') and not n.endswith(CHECKPOINT_SUFFIX) and n[:-5].isdigit()]
+    return max(versions, default=-1)
+
+
+# ==================== TABLE ====================
+
+class VersionedTable:
+    """One lake table: snapshot reads at any version, atomic commits, compaction, restore and vacuum"""
+
+    def __init__(self, path, table_name=None):
+        self.path = path
+        self.table_name = table_name or os.path.basename(path)
+        self.log_dir = os.path.join(path, LOG_DIR_NAME)
+
+    # -------- log --------
+
+    def log_path(self, version, suffix='.json'):
+        return os.path.join(self.log_dir, f'{version:020d}{suffix}')
+
+    def latest_version(self):
+        return latest_version(self.path) if os.path.isdir(self.log_dir) else -1
+
+    def commit_entry(self, version):
+        with open(self.log_path(version)) as f:
+            return json.load(f)
+
+    def history(self):
+        """Every commit, oldest first"""
+        return [self.commit_entry(v) for v in range(self.latest_version() + 1)]
+
+    def snapshot(self, version=None):
+        """{'version', 'timestamp', 'files': {relative path: add entry}} as of a version (default: latest)"""
+        latest = self.latest_version()
+        version = latest if version is None else version
+        if version < 0 or version > latest:
+            raise ValueError(f"{self.table_name} has versions 0..{latest}, not {version}")
+
+        files, start = {}, 0
+        # Newest checkpoint at or before the version, then replay the commits after it
+        for checkpoint in range(version - version % CHECKPOINT_INTERVAL, -1, -CHECKPOINT_INTERVAL):
+            if os.path.exists(self.log_path(checkpoint, CHECKPOINT_SUFFIX)):
+                with open(self.log_path(checkpoint, CHECKPOINT_SUFFIX)) as f:
+                    files = json.load(f)['files']
+                start = checkpoint + 1
+                break
+        entry = None
+        for v in range(start, version + 1):
+            entry = self.commit_entry(v)
+            for removed in entry['remove']:
+                files.pop(removed, None)
+            for added in entry['add']:
+                files[added['path']] = added
+        timestamp = (entry or self.commit_entry(version))['timestamp']
+        return {'version': version, 'timestamp': timestamp, 'files': files}
+
+    def version_as_of(self, timestamp):
+        """Newest version committed at or before a timestamp (ISO format)"""
+        versions = [c['version'] for c in self.history() if c['timestamp'] <= timestamp]
+        if not versions:
+            raise ValueError(f"{self.table_name} has no version as of {timestamp}")
+        return versions[-1]
+
+    def commit(self, operation, add, remove=(), parameters=None):
+        """Append a commit to the log; its version
+
+        Retries on the next version when another writer committed first, as
+        long as every file this commit removes is still part of the table.
+        """
+        os.makedirs(self.log_dir, exist_ok=True)
+        for _ in range(COMMIT_RETRIES):
+            version = self.latest_version() + 1
+            if remove and version > 0:
+                active = self.snapshot(version - 1)['files']
+                gone = [p for p in remove if p not in active]
+                if gone:
+                    raise CommitConflict(f"{self.table_name}: {len(gone)} file(s) removed by a concurrent commit "
+                                         f"(e.g. {gone[0]})")
+            entry = {
+                'version': version,
+                'timestamp': datetime.now().isoformat(timespec='microseconds'),
+                'operation': operation,
+                'parameters': parameters or {},
+                'add': add,
+                'remove': list(remove),
+            }
+            tmp_path = os.path.join(self.log_dir, f'.{uuid.uuid4().hex}.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f, indent=1)
+            try:
+                # link() never replaces an existing entry: exactly one writer gets each version
+                os.link(tmp_path, self.log_path(version))
+            except FileExistsError:
+                continue
+            finally:
+                os.remove(tmp_path)
+            if version % CHECKPOINT_INTERVAL == 0 and version > 0:
+                self.write_checkpoint(version)
+            return version
+        raise CommitConflict(f"{self.table_name}: no free version after {COMMIT_RETRIES} attempts")
+
+    def write_checkpoint(self, version):
+        snapshot = self.snapshot(version)
+        tmp_path = self.log_path(version, CHECKPOINT_SUFFIX) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.log_path(version, CHECKPOINT_SUFFIX))
+
+    # -------- data files --------
+
+    def partition_columns(self):
+        return [MONTH_COLUMN] if has_layout(self.table_name) else []
+
+    def write_files(self, table):
+        """Write a table as new immutable data files (not yet part of any version); their add entries"""
+        partitions = self.partition_columns()
+        if partitions and MONTH_COLUMN not in table.column_names:
+            table = add_month_column(table, self.table_name)
+        order = [c for c in cluster_columns(self.table_name) if c in table.column_names]
+        groups = [({}, table)]
+        if partitions:
+            values = table.column(MONTH_COLUMN).to_numpy(zero_copy_only=False)
+            groups = [({MONTH_COLUMN: str(month)}, table.filter(pa.array(values == month)).drop([MONTH_COLUMN]))
+                      for month in sorted(set(values))]
+
+        add = []
+        for partition, part in groups:
+            subdir = '/'.join(f'{k}={v}' for k, v in partition.items())
+            relpath = '/'.join(filter(None, [subdir, f'part-{uuid.uuid4().hex}.parquet']))
+            path = os.path.join(self.path, *relpath.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pq.write_table(sort_table(part, order) if order else part, path, compression=COMPRESSION)
+            add.append({'path': relpath, 'partition': partition, 'rows': part.num_rows,
+                        'bytes': os.path.getsize(path)})
+        return add
+
+    def read(self, columns=None, filters=None, version=None):
+        """Arrow table of a snapshot (default: latest), projected and filtered in pyarrow"""
+        snapshot = self.snapshot(version)
+        paths = [os.path.join(self.path, *p.split('/')) for p in sorted(snapshot['files'])]
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            raise FileNotFoundError(f"{self.table_name} version {snapshot['version']} was vacuumed "
+                                    f"({len(missing)} data file(s) gone)")
+        if not paths:
+            schema = arrow_schema(self.table_name) if has_schema(self.table_name) else pa.schema([])
+            table = schema.empty_table()
+            return table.select(columns) if columns is not None else table
+        dataset = ds.dataset(paths, format='parquet', partitioning='hive', partition_base_dir=self.path)
+        if filters is not None and isinstance(filters, list):
+            filters = pq.filters_to_expression(filters)
+        table = dataset.to_table(columns=columns, filter=filters)
+        # Parquet has no time32[s]: restore the registry types
+        return conform_table(table, self.table_name) if has_schema(self.table_name) else table
+
+    # -------- operations --------
+
+    def append(self, table):
+        """Add rows as a new version (existing files untouched)"""
+        return self.commit('APPEND', self.write_files(table), parameters={'rows': table.num_rows})
+
+    def overwrite(self, table):
+        """Replace the table's rows as a new version (older versions stay readable)"""
+        current = self.snapshot()['files'] if self.latest_version() >= 0 else {}
+        return self.commit('OVERWRITE', self.write_files(table), remove=sorted(current),
+                           parameters={'rows': table.num_rows})
+
+    def compact(self, min_files=2):
+        """Merge each partition's files into one file as a new version (None when nothing to do)"""
+        files = self.snapshot()['files']
+        by_partition = {}
+        for relpath, entry in files.items():
+            by_partition.setdefault(json.dumps(entry['partition'], sort_keys=True), []).append(relpath)
+
+        add, remove = [], []
+        order = cluster_columns(self.table_name)
+        for key, relpaths in sorted(by_partition.items()):
+            if len(relpaths) < min_files:
+                continue
+            table = pa.concat_tables([pq.read_table(os.path.join(self.path, *p.split('/'))) for p in sorted(relpaths)],
+                                     promote_options='default')
+            order_present = [c for c in order if c in table.column_names]
+            partition = json.loads(key)
+            if partition:
+                table = table.append_column(MONTH_COLUMN, pa.array([partition[MONTH_COLUMN]] * table.num_rows))
+            add.extend(self.write_files(sort_table(table, order_present) if order_present else table))
+            remove.extend(relpaths)
+        if not remove:
+            return None
+        return self.commit('COMPACT', add, remove=sorted(remove),
+                           parameters={'files_removed': len(remove), 'files_added': len(add)})
+
+    def restore(self, version):
+        """Make an older version current again, as a new version"""
+        target = self.snapshot(version)['files']
+        current = self.snapshot()['files']
+        missing = [p for p in target if not os.path.exists(os.path.join(self.path, *p.split('/')))]
+        if missing:
+            raise FileNotFoundError(f"{self.table_name} version {version} was vacuumed; cannot restore it")
+        add = [entry for p, entry in target.items() if p not in current]
+        remove = sorted(p for p in current if p not in target)
+        return self.commit('RESTORE', add, remove=remove, parameters={'version': version})
+
+    def vacuum(self, retain_versions=VACUUM_RETAIN_VERSIONS, dry_run=False):
+        """Delete data files no retained version references; (files, bytes) deleted
+
+        The newest retain_versions versions stay readable. Unreferenced files
+        younger than the grace period are kept: a writer may be about to commit them.
+        """
+        latest = self.latest_version()
+        keep = set()
+        for version in range(max(0, latest - retain_versions + 1), latest + 1):
+            keep.update(self.snapshot(version)['files'])
+
+        deleted, freed = [], 0
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        for directory, dirs, names in os.walk(self.path):
+            dirs[:] = [d for d in dirs if d != LOG_DIR_NAME]
+            for name in names:
+                path = os.path.join(directory, name)
+                relpath = os.path.relpath(path, self.path).replace(os.sep, '/')
+                if not name.endswith('.parquet') or relpath in keep or os.path.getmtime(path) > cutoff:
+                    continue
+                freed += os.path.getsize(path)
+                deleted.append(relpath)
+                if not dry_run:
+                    os.remove(path)
+        if deleted and not dry_run:
+            self.commit('VACUUM', [], parameters={'files_deleted': len(deleted), 'bytes_freed': freed,
+                                                  'retain_versions': retain_versions})
+        return deleted, freed
+
+
+# ==================== CATALOG ====================
+
+def lake_path(table_name, layer='bronze'):
+    """Lake directory of a catalog table (same area and subdirectory as its source)"""
+    from data_catalog import catalog, output_dir
+    entry = catalog(layer).get(table_name)
+    if entry is None:
+        raise FileNotFoundError(f"{table_name} not found in the {layer} layer")
+    return os.path.join(output_dir(entry['area'], 'lake'), entry['subdir'], table_name)
+
+
+def ingest(table_name, layer='bronze', append=False):
+    """Commit a catalog table's current contents to its lake table; (version, rows)"""
+    from data_catalog import read_table
+    table = read_table(table_name, layer=layer, cache=False)
+    if MONTH_COLUMN in table.column_names:
+        table = table.drop([MONTH_COLUMN])
+    lake_table = VersionedTable(lake_path(table_name, layer), table_name)
+    version = lake_table.append(table) if append else lake_table.overwrite(table)
+    return version, table.num_rows
+
+
+def lake_tables():
+    """{table: path} of every versioned table under data/lake"""
+    tables = {}
+    for directory, dirs, _ in os.walk(LAKE_DIR):
+        if LOG_DIR_NAME in dirs:
+            tables[os.path.basename(directory)] = directory
+            dirs[:] = []
+    return tables
+
+
+# ==================== MAIN ====================
+
+def print_history(lake_table):
+    print(f"\n  {lake_table.table_name}")
+    print(f"  {'Version':>7s}  {'Timestamp':26s} {'Operation':10s} {'Added':>6s} {'Removed':>8s} {'Rows added':>11s}")
+    for c in lake_table.history():
+        print(f"  {c['version']:7d}  {c['timestamp']:26s} {c['operation']:10s} {len(c['add']):6d} "
+              f"{len(c['remove']):8d} {sum(a['rows'] for a in c['add']):11,}")
+
+
+def main():
+    """Main execution"""
+    commands = ['list', 'ingest', 'history', 'show', 'compact', 'restore', 'vacuum']
+    parser = argparse.ArgumentParser(description='Versioned lake tables with a transaction log')
+    parser.add_argument('command', choices=commands, help='Operation')
+    parser.add_argument('tables', nargs='*', help='Tables (ingest default: every bronze table)')
+    parser.add_argument('--layer', default='bronze', help='Catalog layer ingest reads from (default bronze)')
+    parser.add_argument('--append', action='store_true', help='ingest: append instead of overwrite')
+    parser.add_argument('--version', type=int, help='show: snapshot version; restore: version to restore')
+    parser.add_argument('--as-of', help='show: snapshot as of an ISO timestamp (2025-10-30T12:00:00)')
+    parser.add_argument('--retain-versions', type=int, default=VACUUM_RETAIN_VERSIONS,
+                        help=f'vacuum: versions kept readable (default {VACUUM_RETAIN_VERSIONS})')
+    parser.add_argument('--dry-run', action='store_true', help='vacuum: only list the files to delete')
+    args = parser.parse_args()
+
+    print("="*80)
+    print(f"LAKE TABLES: {args.command.upper()}")
+    print("="*80)
+
+    if args.command == 'ingest':
+        from data_catalog import catalog
+        for name in args.tables or sorted(catalog(args.layer)):
+            start = time.perf_counter()
+            version, rows = ingest(name, args.layer, args.append)
+            print(f"  ✓ {name:26s} v{version:<4d} {rows:10,} rows  ({time.perf_counter() - start:.2f}s)")
+        return
+
+    tables = lake_tables()
+    names = args.tables or sorted(tables)
+    unknown = [n for n in names if n not in tables]
+    if unknown:
+        raise SystemExit(f"Not in the lake: {', '.join(unknown)} (run: lake_table.py ingest {' '.join(unknown)})")
+
+    if args.command == 'list':
+        print(f"\n  {'Table':26s} {'Version':>7s} {'Files':>6s} {'Rows':>10s} {'MB':>8s}  Path")
+        for name in names:
+            snapshot = VersionedTable(tables[name], name).snapshot()
+            files = snapshot['files'].values()
+            print(f"  {name:26s} {snapshot['version']:7d} {len(files):6d} {sum(f['rows'] for f in files):10,} "
+                  f"{sum(f['bytes'] for f in files) / 1024 / 1024:8.2f}  {os.path.relpath(tables[name], PROJECT_ROOT)}")
+        return
+
+    for name in names:
+        lake_table = VersionedTable(tables[name], name)
+        if args.command == 'history':
+            print_history(lake_table)
+        elif args.command == 'show':
+            version = lake_table.version_as_of(args.as_of) if args.as_of else args.version
+            table = lake_table.read(version=version)
+            snapshot = lake_table.snapshot(version)
+            print(f"\n  {name} version {snapshot['version']} ({snapshot['timestamp']}): {table.num_rows:,} rows")
+            print(table.slice(0, PRINT_ROWS).to_pandas().to_string(index=False))
+        elif args.command == 'compact':
+            version = lake_table.compact()
+            print(f"  {'✓' if version is not None else '='} {name}: "
+                  f"{f'compacted as v{version}' if version is not None else 'nothing to compact'}")
+        elif args.command == 'restore':
+            if args.version is None:
+                parser.error('restore needs --version')
+            print(f"  ✓ {name}: version {args.version} restored as v{lake_table.restore(args.version)}")
+        elif args.command == 'vacuum':
+            deleted, freed = lake_table.vacuum(args.retain_versions, args.dry_run)
+            print(f"  ✓ {name}: {len(deleted)} file(s), {freed / 1024 / 1024:.2f}MB "
+                  f"{'would be ' if args.dry_run else ''}deleted")
+
+
+if __name__ == "__main__":
+    main()
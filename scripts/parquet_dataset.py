@@ -0,0 +1,365 @@
+"""
+Hive-Partitioned Parquet Datasets for SAP Transactional Tables
+Partitions by creation month (optionally sales org) and clusters rows so
+row-group min/max statistics allow predicate pushdown
+
+Measured with the benchmark below: month partitions pay for date-range filters
+once a table has many rows over many months (3.9x at 143k VBAK rows over 24
+months, 11x at 1M rows). On the generated data (~14k rows over 2 months) every
+filtered scan is slower than on the flat file (0.6-0.8x), since the flat file
+is a single row group and the partitions only add files to open. Key and sales
+org filters are not helped by month partitions (every month holds every
+customer) unless VKORG is a partition level.
+"""
+
+import os
+import shutil
+import argparse
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from sap_schema import get_primary_key, has_schema, read_table, write_parquet
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw')
+
+MONTH_COLUMN = 'ERDAT_MONTH'
+DEFAULT_TARGET_FILE_MB = 128
+DEFAULT_ROW_GROUP_ROWS = 65536
+# Below this many rows a flat file's scans beat the partitioned dataset (see module docstring)
+DATASET_MIN_ROWS = 100_000
+
+# Partition date column, clustering key and sales org column per transactional table
+DATASET_LAYOUTS = {
+    'VBAK': {'date_column': 'ERDAT', 'cluster_by': ['KUNNR', 'VBELN'], 'vkorg_column': 'VKORG'},
+    'VBAP': {'date_column': 'ERDAT', 'cluster_by': ['VBELN', 'POSNR'], 'vkorg_column': None},
+    'VBEP': {'date_column': 'ERDAT', 'cluster_by': ['VBELN', 'POSNR', 'ETENR'], 'vkorg_column': None},
+    'LIKP': {'date_column': 'ERDAT', 'cluster_by': ['KUNNR', 'VBELN'], 'vkorg_column': 'VKORG'},
+    'LIPS': {'date_column': 'ERDAT', 'cluster_by': ['VBELN', 'POSNR'], 'vkorg_column': None},
+    'VBRK': {'date_column': 'ERDAT', 'cluster_by': ['KUNAG', 'VBELN'], 'vkorg_column': 'VKORG'},
+    'VBRP': {'date_column': 'ERDAT', 'cluster_by': ['VBELN', 'POSNR'], 'vkorg_column': None},
+    'VBFA': {'date_column': 'ERDAT', 'cluster_by': ['VBELV', 'VBELN'], 'vkorg_column': None},
+    'VTTK': {'date_column': 'ERDAT', 'cluster_by': ['TKNUM'], 'vkorg_column': None},
+    'VTTP': {'date_column': 'ERDAT', 'cluster_by': ['TKNUM', 'TPNUM'], 'vkorg_column': None},
+}
+
+
+def has_layout(table_name):
+    """Check whether a table is written as a partitioned dataset"""
+    return table_name in DATASET_LAYOUTS
+
+
+def cluster_columns(table_name):
+    """Sort order for a table's files: dataset clustering key, else the primary key"""
+    if has_layout(table_name):
+        return DATASET_LAYOUTS[table_name]['cluster_by']
+    return get_primary_key(table_name) if has_schema(table_name) else []
+
+
+def dataset_dir_for(source_path):
+    """Dataset directory for a table file (VBAK.csv → VBAK/)"""
+    return os.path.splitext(source_path)[0]
+
+
+def partition_columns(table_name, by_vkorg=False):
+    """Hive partition columns for a table"""
+    layout = DATASET_LAYOUTS[table_name]
+    columns = [MONTH_COLUMN]
+    if by_vkorg and layout['vkorg_column']:
+        columns.append(layout['vkorg_column'])
+    return columns
+
+
+def add_month_column(table, table_name):
+    """Derive the YYYY-MM partition value from the table's date column"""
+    dates = table.column(DATASET_LAYOUTS[table_name]['date_column'])
+    month = pc.strftime(dates.cast(pa.timestamp('s')), format='%Y-%m')
+    month = pc.fill_null(month, '__HIVE_DEFAULT_PARTITION__')
+    return table.append_column(MONTH_COLUMN, month)
+
+
+def sort_table(table, columns):
+    """Sort by columns (dictionary-encoded codes sort by their string value)"""
+    keys = []
+    for name in columns:
+        column = table.column(name)
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(pa.string())
+        keys.append(column)
+    sort_keys = pa.table(keys, names=[f'k{i}' for i in range(len(keys))])
+    indices = pc.sort_indices(sort_keys, sort_keys=[(f'k{i}', 'ascending') for i in range(len(keys))])
+    return table.take(indices)
+
+
+def _partition_codes(table, columns):
+    """Integer code per row identifying its partition (rows must be sorted by partition)"""
+    codes = np.zeros(table.num_rows, dtype=np.int64)
+    for name in columns:
+        encoded = pc.dictionary_encode(table.column(name).cast(pa.string())).combine_chunks()
+        codes = codes * (len(encoded.dictionary) + 1) + encoded.indices.to_numpy(zero_copy_only=False)
+    return codes
+
+
+def _sorting_columns(schema, columns):
+    """Parquet sorting_columns metadata (newer pyarrow only)"""
+    if not hasattr(pq, 'SortingColumn'):
+        return None
+    return [pq.SortingColumn(schema.get_field_index(name)) for name in columns]
+
+
+def _write_partition(part, out_dir, cluster_by, target_file_bytes, row_group_rows, compression,
+                     file_prefix='part'):
+    """Write one partition as files of ~target size, row groups in clustering order"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = []
+    writer = None
+    sink = None
+    for offset in range(0, part.num_rows, row_group_rows):
+        if writer is None:
+            path = os.path.join(out_dir, f'{file_prefix}-{len(files):05d}.parquet')
+            sink = pa.OSFile(path, 'wb')
+            kwargs = {}
+            sorting = _sorting_columns(part.schema, cluster_by)
+            if sorting:
+                kwargs['sorting_columns'] = sorting
+            writer = pq.ParquetWriter(sink, part.schema, compression=compression, **kwargs)
+            files.append(path)
+        writer.write_table(part.slice(offset, row_group_rows), row_group_size=row_group_rows)
+        if sink.tell() >= target_file_bytes:
+            writer.close()
+            sink.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+        sink.close()
+    return files
+
+
+def write_partition_files(table, table_name, root_dir, by_vkorg=False,
+                          target_file_mb=DEFAULT_TARGET_FILE_MB,
+                          row_group_rows=DEFAULT_ROW_GROUP_ROWS, compression='snappy',
+                          file_prefix='part'):
+    """Sort, split by partition and write a table under root_dir (no swap)"""
+    layout = DATASET_LAYOUTS[table_name]
+    part_columns = partition_columns(table_name, by_vkorg)
+    cluster_by = [c for c in layout['cluster_by'] if c in table.column_names]
+
+    table = add_month_column(table, table_name)
+    table = sort_table(table, part_columns + cluster_by)
+
+    codes = _partition_codes(table, part_columns)
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate([[0], boundaries]).astype(int)
+    ends = np.concatenate([boundaries, [table.num_rows]]).astype(int)
+    data_columns = [c for c in table.column_names if c not in part_columns]
+
+    files = []
+    partitions = set()
+    for start, end in zip(starts, ends):
+        part = table.slice(start, end - start)
+        subdir = os.path.join(root_dir, *[
+            f'{name}={part.column(name)[0].as_py()}' for name in part_columns
+        ])
+        partitions.add(subdir)
+        files.extend(_write_partition(
+            part.select(data_columns), subdir, cluster_by,
+            target_file_mb * 1024 * 1024, row_group_rows, compression, file_prefix,
+        ))
+    return files, partitions
+
+
+def swap_directory(new_dir, target_dir):
+    """Replace target_dir with new_dir (readers never see a half-written directory)"""
+    old_dir = target_dir + '.__old__'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(target_dir):
+        os.replace(target_dir, old_dir)
+    os.replace(new_dir, target_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def write_partitioned_dataset(table, table_name, dataset_dir, by_vkorg=False,
+                              target_file_mb=DEFAULT_TARGET_FILE_MB,
+                              row_group_rows=DEFAULT_ROW_GROUP_ROWS, compression='snappy'):
+    """Write a table as a hive-partitioned, clustered dataset and swap it in atomically"""
+    tmp_dir = dataset_dir + '.__writing__'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    files, partitions = write_partition_files(
+        table, table_name, tmp_dir, by_vkorg, target_file_mb, row_group_rows, compression,
+    )
+    total_bytes = sum(os.path.getsize(f) for f in files)
+    swap_directory(tmp_dir, dataset_dir)
+
+    return {
+        'partitions': len(partitions),
+        'files': len(files),
+        'bytes': total_bytes,
+        'rows': table.num_rows,
+    }
+
+
+def dataset_partition_columns(dataset_dir):
+    """Partition column names from the first branch of a hive directory tree"""
+    columns = []
+    current = dataset_dir
+    while True:
+        subdirs = sorted(d for d in os.listdir(current) if '=' in d)
+        if not subdirs:
+            return columns
+        columns.append(subdirs[0].split('=', 1)[0])
+        current = os.path.join(current, subdirs[0])
+
+
+def open_dataset(dataset_dir):
+    """Open a partitioned dataset keeping partition values as strings (no '1000' → 1000)"""
+    schema = pa.schema([(name, pa.string()) for name in dataset_partition_columns(dataset_dir)])
+    return ds.dataset(dataset_dir, format='parquet',
+                      partitioning=ds.partitioning(schema, flavor='hive'))
+
+
+def date_range_filter(table_name, start, end):
+    """Filter on the date column plus the partition months it spans (enables pruning)"""
+    date_column = DATASET_LAYOUTS[table_name]['date_column']
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return (
+        ds.field(MONTH_COLUMN).isin(months)
+        & (ds.field(date_column) >= pa.scalar(start, pa.date32()))
+        & (ds.field(date_column) <= pa.scalar(end, pa.date32()))
+    )
+
+
+# ==================== PRUNING BENCHMARK ====================
+
+def total_row_groups(dataset):
+    """Row groups across every file of a dataset"""
+    return sum(fragment.metadata.num_row_groups for fragment in dataset.get_fragments())
+
+
+def _scan_stats(dataset, expression):
+    """Files and row groups a scan touches after partition and statistics pruning"""
+    fragments = list(dataset.get_fragments(filter=expression))
+    row_groups = 0
+    for fragment in fragments:
+        row_groups += len(fragment.split_by_row_group(filter=expression, schema=dataset.schema))
+    return len(fragments), row_groups
+
+
+def _timed_scan(dataset, expression, repeats=5):
+    """Best-of-N wall time for a filtered scan"""
+    best = float('inf')
+    rows = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = dataset.to_table(filter=expression).num_rows
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def benchmark_pruning(table_name, flat_path, dataset_dir):
+    """Compare typical filtered scans on a flat file vs the partitioned dataset"""
+    table = read_table(flat_path, table_name)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Flat baseline written from the same typed table, so only the layout differs
+        flat_copy = os.path.join(tmp_dir, f'{table_name}.parquet')
+        write_parquet(table, flat_copy, table_name)
+        return _run_queries(table_name, table, ds.dataset(flat_copy, format='parquet'),
+                            open_dataset(dataset_dir))
+
+
+def _run_queries(table_name, sample, flat, partitioned):
+    """Time each typical filter on both layouts"""
+    layout = DATASET_LAYOUTS[table_name]
+    date_column = layout['date_column']
+    dates = pc.drop_null(sample.column(date_column))
+    first, last = pc.min(dates).as_py(), pc.max(dates).as_py()
+    week_end = date.fromordinal(min(first.toordinal() + 6, last.toordinal()))
+    key_column = layout['cluster_by'][0]
+    key_value = sample.column(key_column)[sample.num_rows // 2].as_py()
+
+    queries = [
+        (f'{date_column} first 7 days', date_range_filter(table_name, first, week_end),
+         (ds.field(date_column) >= pa.scalar(first, pa.date32()))
+         & (ds.field(date_column) <= pa.scalar(week_end, pa.date32()))),
+        (f'{key_column} = {key_value}', ds.field(key_column) == key_value,
+         ds.field(key_column) == key_value),
+    ]
+    if layout['vkorg_column']:
+        vkorg = layout['vkorg_column']
+        queries.append((f'{vkorg} = 1000', ds.field(vkorg) == '1000', ds.field(vkorg) == '1000'))
+
+    flat_total = total_row_groups(flat)
+    dataset_total = total_row_groups(partitioned)
+    results = []
+    for label, dataset_filter, flat_filter in queries:
+        flat_time, flat_rows = _timed_scan(flat, flat_filter)
+        part_time, part_rows = _timed_scan(partitioned, dataset_filter)
+        flat_files, flat_groups = _scan_stats(flat, flat_filter)
+        part_files, part_groups = _scan_stats(partitioned, dataset_filter)
+        results.append({
+            'query': label,
+            'rows': part_rows,
+            'flat_rows': flat_rows,
+            'flat_ms': flat_time * 1000,
+            'dataset_ms': part_time * 1000,
+            'flat_row_groups': f'{flat_groups}/{flat_total}',
+            'dataset_row_groups': f'{part_groups}/{dataset_total}',
+            'dataset_files': part_files,
+            'speedup': flat_time / part_time if part_time > 0 else float('inf'),
+        })
+    return results
+
+
+def print_benchmark(table_name, results):
+    """Print the pruning benchmark table"""
+    print(f"\n📊 Pruning benchmark: {table_name}")
+    print(f"  {'Query':32s} {'Rows':>8s} {'Flat ms':>9s} {'Part ms':>9s} "
+          f"{'Flat RGs':>9s} {'Part RGs':>9s} {'Speedup':>8s}")
+    for r in results:
+        print(f"  {r['query']:32s} {r['rows']:8,} {r['flat_ms']:9.2f} {r['dataset_ms']:9.2f} "
+              f"{r['flat_row_groups']:>9s} {r['dataset_row_groups']:>9s} {r['speedup']:7.1f}x")
+    print("  (RGs = row groups read / total after partition and min/max pruning)")
+    slower = [r['query'] for r in results if r['speedup'] < 1]
+    if not slower:
+        print("  ✓ Partitioned dataset faster for every query")
+        return
+    print(f"  ⚠ Flat file faster for: {', '.join(slower)}")
+    if all(r['flat_row_groups'].endswith('/1') for r in results):
+        print(f"    (the flat file is a single row group: partitioning rarely pays below "
+              f"{DATASET_MIN_ROWS:,} rows)")
+
+
+def main():
+    """Benchmark partition pruning for converted transactional tables"""
+    parser = argparse.ArgumentParser(description='Partitioned dataset pruning benchmark')
+    parser.add_argument('tables', nargs='*', default=['VBAK', 'LIKP', 'VBRK'],
+                        help='Tables to benchmark (must have been converted with --dataset)')
+    args = parser.parse_args()
+
+    for root, _, files in os.walk(DATA_DIR):
+        for file_name in sorted(files):
+            table_name, ext = os.path.splitext(file_name)
+            if ext != '.parquet' or table_name not in args.tables:
+                continue
+            flat_path = os.path.join(root, file_name)
+            dataset_dir = dataset_dir_for(flat_path)
+            if not os.path.isdir(dataset_dir):
+                print(f"  {table_name}: no dataset at {dataset_dir} (run convert_to_parquet.py --dataset)")
+                continue
+            print_benchmark(table_name, benchmark_pruning(table_name, flat_path, dataset_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Point Lookups on Parquet Using Statistics and Bloom Filters
+Skips row groups whose min/max or split-block Bloom filter rules out the
+key, then reads only the remaining row groups
+"""
+
+import os
+import random
+import argparse
+import tempfile
+import time
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from sap_schema import key_index_options, read_table
+
+try:
+    import xxhash
+except ImportError:  # optional: pure-Python XXH64 below is fast enough for single keys
+    xxhash = None
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'raw')
+
+# Benchmark configuration: table → lookup columns
+BENCHMARK_LOOKUPS = {
+    'VBAK': ['VBELN', 'KUNNR'],
+    'VBAP': ['VBELN', 'MATNR'],
+    'KNA1': ['KUNNR'],
+    'MARA': ['MATNR'],
+}
+BENCHMARK_ROW_GROUP_ROWS = 4096
+BENCHMARK_KEYS = 50
+
+# Split-block Bloom filter constants (Parquet spec)
+SBBF_SALT = [
+    0x47b6137b, 0x44974d91, 0x8824ad5b, 0xa2b7289d,
+    0x705495c7, 0x2df1424b, 0x9efc4947, 0x5c6bfb31,
+]
+
+# ==================== XXH64 ====================
+
+_P1 = 11400714785074694791
+_P2 = 14029467366897019727
+_P3 = 1609587929392839161
+_P4 = 9650029242287828579
+_P5 = 2870177450012600261
+_MASK = (1 << 64) - 1
+
+
+def _rotl(x, r):
+    return ((x << r) | (x >> (64 - r))) & _MASK
+
+
+def _round(acc, lane):
+    acc = (acc + lane * _P2) & _MASK
+    return (_rotl(acc, 31) * _P1) & _MASK
+
+
+def _merge_round(acc, value):
+    acc ^= _round(0, value)
+    return (acc * _P1 + _P4) & _MASK
+
+
+def xxh64(data, seed=0):
+    """XXH64 hash (the hash Parquet Bloom filters use)"""
+    if xxhash is not None:
+        return xxhash.xxh64_intdigest(data, seed)
+
+    n = len(data)
+    i = 0
+    if n >= 32:
+        v1 = (seed + _P1 + _P2) & _MASK
+        v2 = (seed + _P2) & _MASK
+        v3 = seed
+        v4 = (seed - _P1) & _MASK
+        while i + 32 <= n:
+            v1 = _round(v1, int.from_bytes(data[i:i + 8], 'little'))
+            v2 = _round(v2, int.from_bytes(data[i + 8:i + 16], 'little'))
+            v3 = _round(v3, int.from_bytes(data[i + 16:i + 24], 'little'))
+            v4 = _round(v4, int.from_bytes(data[i + 24:i + 32], 'little'))
+            i += 32
+        h = (_rotl(v1, 1) + _rotl(v2, 7) + _rotl(v3, 12) + _rotl(v4, 18)) & _MASK
+        for v in (v1, v2, v3, v4):
+            h = _merge_round(h, v)
+    else:
+        h = (seed + _P5) & _MASK
+
+    h = (h + n) & _MASK
+    while i + 8 <= n:
+        h ^= _round(0, int.from_bytes(data[i:i + 8], 'little'))
+        h = (_rotl(h, 27) * _P1 + _P4) & _MASK
+        i += 8
+    if i + 4 <= n:
+        h ^= (int.from_bytes(data[i:i + 4], 'little') * _P1) & _MASK
+        h = (_rotl(h, 23) * _P2 + _P3) & _MASK
+        i += 4
+    while i < n:
+        h ^= (data[i] * _P5) & _MASK
+        h = (_rotl(h, 11) * _P1) & _MASK
+        i += 1
+
+    h ^= h >> 33
+    h = (h * _P2) & _MASK
+    h ^= h >> 29
+    h = (h * _P3) & _MASK
+    h ^= h >> 32
+    return h
+
+
+def _read_varint(data, pos):
+    """Thrift compact-protocol unsigned varint"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        result |= (byte & 0x7F) << shift
+        pos += 1
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def plain_encode(value, physical_type):
+    """Bytes Parquet hashes for a value (PLAIN encoding without length prefix)"""
+    if physical_type == 'BYTE_ARRAY':
+        return value.encode('utf-8') if isinstance(value, str) else bytes(value)
+    if physical_type == 'INT32':
+        return int(value).to_bytes(4, 'little', signed=True)
+    if physical_type == 'INT64':
+        return int(value).to_bytes(8, 'little', signed=True)
+    return None
+
+
+# ==================== LOOKUP READER ====================
+
+class PointLookupReader:
+    """Look up rows by a single key value, skipping row groups via statistics and Bloom filters"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet_file = pq.ParquetFile(path)
+        self.metadata = self.parquet_file.metadata
+        self.handle = open(path, 'rb')
+        self.bitsets = {}
+        self.last_stats = {}
+
+    def close(self):
+        """Close the file handle"""
+        self.handle.close()
+
+    def bloom_bitset(self, row_group, column_index):
+        """Bloom filter bitset of one column chunk (None when the chunk has none)"""
+        key = (row_group, column_index)
+        if key not in self.bitsets:
+            chunk = self.metadata.row_group(row_group).column(column_index)
+            offset, length = chunk.bloom_filter_offset, chunk.bloom_filter_length
+            bitset = None
+            if offset and length:
+                self.handle.seek(offset)
+                data = self.handle.read(length)
+                # BloomFilterHeader starts with field 1 (numBytes, i32, zigzag varint)
+                if data[0] == 0x15:
+                    zigzag, _ = _read_varint(data, 1)
+                    num_bytes = (zigzag >> 1) ^ -(zigzag & 1)
+                    bitset = data[-num_bytes:]
+            self.bitsets[key] = bitset
+        return self.bitsets[key]
+
+    def bloom_might_contain(self, row_group, column_index, value):
+        """Split-block Bloom filter probe (False = value definitely absent)"""
+        chunk = self.metadata.row_group(row_group).column(column_index)
+        bitset = self.bloom_bitset(row_group, column_index)
+        encoded = plain_encode(value, chunk.physical_type)
+        if bitset is None or encoded is None:
+            return True
+
+        h = xxh64(encoded)
+        num_blocks = len(bitset) // 32
+        block = (((h >> 32) * num_blocks) >> 32) * 32
+        key = h & 0xFFFFFFFF
+        for i, salt in enumerate(SBBF_SALT):
+            bit = ((key * salt) & 0xFFFFFFFF) >> 27
+            word = int.from_bytes(bitset[block + 4 * i:block + 4 * i + 4], 'little')
+            if not word & (1 << bit):
+                return False
+        return True
+
+    def candidate_row_groups(self, column, value):
+        """Row groups that may contain the value"""
+        column_index = self.parquet_file.schema_arrow.get_field_index(column)
+        stats = {'row_groups': self.metadata.num_row_groups, 'skipped_minmax': 0, 'skipped_bloom': 0}
+        candidates = []
+        for row_group in range(self.metadata.num_row_groups):
+            statistics = self.metadata.row_group(row_group).column(column_index).statistics
+            if statistics is not None and statistics.has_min_max:
+                if not statistics.min <= value <= statistics.max:
+                    stats['skipped_minmax'] += 1
+                    continue
+            if not self.bloom_might_contain(row_group, column_index, value):
+                stats['skipped_bloom'] += 1
+                continue
+            candidates.append(row_group)
+        stats['read'] = len(candidates)
+        self.last_stats = stats
+        return candidates
+
+    def lookup(self, column, value, columns=None):
+        """Rows where column == value"""
+        candidates = self.candidate_row_groups(column, value)
+        if not candidates:
+            return self.parquet_file.schema_arrow.empty_table().select(columns or self.parquet_file.schema_arrow.names)
+        read_columns = None if columns is None else list(dict.fromkeys(columns + [column]))
+        table = self.parquet_file.read_row_groups(candidates, columns=read_columns)
+        table = table.filter(pc.equal(table.column(column), value))
+        return table.select(columns) if columns else table
+
+
+# ==================== BENCHMARK ====================
+
+def _time_lookups(func, keys):
+    """Average latency in ms over a list of keys"""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) * 1000 / len(keys)
+
+
+def benchmark_table(table_name, source_path, columns, row_group_rows=BENCHMARK_ROW_GROUP_ROWS):
+    """Lookup latency on a plain file vs a file with page indexes and Bloom filters"""
+    table = read_table(source_path, table_name)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain_path = os.path.join(tmp_dir, 'plain.parquet')
+        indexed_path = os.path.join(tmp_dir, 'indexed.parquet')
+        pq.write_table(table, plain_path, row_group_size=row_group_rows)
+        pq.write_table(table, indexed_path, row_group_size=row_group_rows,
+                       **key_index_options(table_name, table.num_rows, row_group_rows))
+        overhead = os.path.getsize(indexed_path) / os.path.getsize(plain_path) - 1
+
+        reader = PointLookupReader(indexed_path)
+        for column in columns:
+            values = pc.unique(table.column(column)).to_pylist()
+            rng = random.Random(42)
+            present = rng.sample(values, min(BENCHMARK_KEYS, len(values)))
+            missing = [f'{v}X' for v in present]
+
+            for label, keys in (('hit', present), ('miss', missing)):
+                plain_ms = _time_lookups(
+                    lambda k: pq.read_table(plain_path, filters=[(column, '==', k)]), keys)
+                row_groups_read = []
+
+                def indexed_lookup(k):
+                    reader.lookup(column, k)
+                    row_groups_read.append(reader.last_stats['read'])
+
+                indexed_ms = _time_lookups(indexed_lookup, keys)
+                results.append({
+                    'table': table_name,
+                    'column': column,
+                    'keys': label,
+                    'row_groups': reader.metadata.num_row_groups,
+                    'avg_row_groups_read': sum(row_groups_read) / len(row_groups_read),
+                    'plain_ms': plain_ms,
+                    'indexed_ms': indexed_ms,
+                    'size_overhead': overhead,
+                })
+        reader.close()
+    return results
+
+
+def find_source(table_name):
+    """Parquet (or CSV) file of a table under data/raw"""
+    for root, _, files in os.walk(DATA_DIR):
+        for ext in ('.parquet', '.csv'):
+            if f'{table_name}{ext}' in files:
+                return os.path.join(root, f'{table_name}{ext}')
+    return None
+
+
+def main():
+    """Benchmark point-lookup latency with and without key indexes"""
+    parser = argparse.ArgumentParser(description='Parquet point-lookup benchmark')
+    parser.add_argument('tables', nargs='*', default=list(BENCHMARK_LOOKUPS),
+                        help=f"Tables to benchmark (default: {' '.join(BENCHMARK_LOOKUPS)})")
+    parser.add_argument('--row-group-rows', type=int, default=BENCHMARK_ROW_GROUP_ROWS,
+                        help=f'Row-group size of the benchmark files (default {BENCHMARK_ROW_GROUP_ROWS})')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("PARQUET POINT-LOOKUP BENCHMARK")
+    print("="*80)
+    print("Plain: pq.read_table(filters=...) | Indexed: min/max + Bloom filter row-group skipping")
+    print(f"XXH64: {'xxhash' if xxhash is not None else 'pure Python'} | "
+          f"{BENCHMARK_KEYS} keys per run | {args.row_group_rows:,}-row groups\n")
+    print(f"  {'Table':6s} {'Column':8s} {'Keys':5s} {'RGs':>5s} {'RGs read':>9s} "
+          f"{'Plain ms':>9s} {'Index ms':>9s} {'Speedup':>8s} {'Size +':>7s}")
+
+    for table_name in args.tables:
+        source = find_source(table_name)
+        if source is None:
+            print(f"  {table_name}: not found under {DATA_DIR}")
+            continue
+        columns = BENCHMARK_LOOKUPS.get(table_name)
+        for r in benchmark_table(table_name, source, columns, args.row_group_rows):
+            print(f"  {r['table']:6s} {r['column']:8s} {r['keys']:5s} {r['row_groups']:5d} "
+                  f"{r['avg_row_groups_read']:9.2f} {r['plain_ms']:9.2f} {r['indexed_ms']:9.2f} "
+                  f"{r['plain_ms'] / r['indexed_ms']:7.1f}x {r['size_overhead']:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+End-to-End Pipeline Orchestrator
+Runs the generate → link → convert → validate / silver → gold workflow as a DAG
+of stages with declared inputs and outputs
+
+A stage is skipped when its fingerprint (script and local modules it imports,
+arguments, content of its input files) matches the last successful run and its
+outputs are still the files that run produced. Stages whose dependencies are
+done run in parallel as subprocesses; output goes to per-stage logs and every
+stage's status and timing is appended to the run log.
+"""
+
+import os
+import sys
+import ast
+import csv
+import json
+import glob
+import hashlib
+import argparse
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+PIPELINE_DIR = os.path.join(PROJECT_ROOT, 'data', 'pipeline')
+STATE_PATH = os.path.join(PIPELINE_DIR, 'state.json')
+RUN_LOG_PATH = os.path.join(PIPELINE_DIR, 'run_log.csv')
+LOG_DIR = os.path.join(PIPELINE_DIR, 'logs')
+
+# Configuration
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
+HASH_CHUNK_BYTES = 1 << 20
+RUN_LOG_FIELDS = ['run_id', 'stage', 'status', 'reason', 'started', 'seconds', 'exit_code', 'log']
+
+
+def stage(name, script, inputs, outputs, after=(), args=()):
+    """DAG node: a script, the files it reads and writes (globs from the project root), its upstream stages"""
+    return {'name': name, 'script': script, 'inputs': list(inputs), 'outputs': list(outputs),
+            'after': list(after), 'args': list(args)}
+
+
+# ==================== STAGES ====================
+
+STAGES = [
+    stage('generate_sap', 'generate_synthetic_data.py',
+          inputs=[],
+          outputs=['data/bronze/**/*.csv']),
+    stage('generate_crm', 'generate_crm_data.py',
+          inputs=[],
+          outputs=['data/raw/crm/*.csv']),
+    stage('link', 'create_crm_sap_links.py',
+          inputs=['data/raw/crm/*.csv', 'data/bronze/**/*.csv', 'data/raw/sap/**/*.csv'],
+          outputs=['data/raw/cross_reference/*.csv'],
+          after=['generate_sap', 'generate_crm']),
+    stage('convert', 'convert_to_parquet.py',
+          inputs=['data/bronze/**/*.csv', 'data/raw/**/*.csv'],
+          outputs=['data/raw/**/*.parquet', 'conversion_stats.csv'],
+          after=['generate_sap', 'link']),
+    stage('validate', 'validate_data.py',
+          inputs=['data/bronze/**/*.csv', 'data/bronze/**/*.parquet', 'data/raw/**/*.parquet'],
+          outputs=['validation_report.json'],
+          after=['generate_sap', 'convert']),
+    stage('silver', 'build_silver.py',
+          inputs=['data/bronze/**/*.csv', 'data/raw/sap/**/*.parquet'],
+          outputs=['data/silver/**/*.parquet', 'data/silver/_silver_build.json'],
+          after=['generate_sap', 'convert']),
+    stage('gold', 'revenue_cube.py',
+          inputs=['data/silver/**/*.parquet'],
+          outputs=['data/gold/revenue_cube/**/*'],
+          after=['silver']),
+]
+STAGE_INDEX = {s['name']: s for s in STAGES}
+
+
+# ==================== FINGERPRINTS ====================
+
+def local_modules(script, seen=None):
+    """The script plus every scripts/ module it imports (transitively)"""
+    seen = seen if seen is not None else set()
+    if script in seen:
+        return seen
+    seen.add(script)
+    with open(os.path.join(SCRIPT_DIR, script)) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            module = name.split('.')[0] + '.py'
+            if os.path.exists(os.path.join(SCRIPT_DIR, module)):
+                local_modules(module, seen)
+    return seen
+
+
+def expand(patterns):
+    """Files matching the glob patterns (relative to the project root), sorted"""
+    files = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(PROJECT_ROOT, pattern), recursive=True):
+            if os.path.isfile(path):
+                files.add(os.path.relpath(path, PROJECT_ROOT))
+    return sorted(files)
+
+
+class FileHasher:
+    """Content hashes of files, recomputed only when size or mtime changed"""
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+        self.hashed_bytes = 0
+
+    def digest(self, relpath):
+        path = os.path.join(PROJECT_ROOT, relpath)
+        stat = os.stat(path)
+        cached = self.cache.get(relpath)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                h.update(chunk)
+        self.hashed_bytes += stat.st_size
+        self.cache[relpath] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def files(self, patterns):
+        """{relative path: content hash} of the files matching the patterns"""
+        return {path: self.digest(path) for path in expand(patterns)}
+
+
+def combine(parts):
+    """One hash over a JSON-serializable structure"""
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+# ==================== ORCHESTRATOR ====================
+
+class Pipeline:
+    """Plan, run and record the stage DAG"""
+
+    def __init__(self, stages=STAGES, jobs=DEFAULT_JOBS, force=False):
+        self.stages = stages
+        self.jobs = jobs
+        self.force = force
+        self.state = {'stages': {}, 'files': {}}
+        if os.path.exists(STATE_PATH):
+            with open(STATE_PATH) as f:
+                self.state = json.load(f)
+        self.hasher = FileHasher(self.state.get('files'))
+        self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.records = []
+
+    def select(self, targets, with_deps=True):
+        """Stages to consider: the targets plus (by default) everything upstream, in declaration order"""
+        if not targets:
+            return [s['name'] for s in self.stages]
+        unknown = [t for t in targets if t not in STAGE_INDEX]
+        if unknown:
+            raise SystemExit(f"Unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGE_INDEX)})")
+        wanted = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in wanted:
+                wanted.add(name)
+                if with_deps:
+                    pending.extend(STAGE_INDEX[name]['after'])
+        return [s['name'] for s in self.stages if s['name'] in wanted]
+
+    def fingerprint(self, spec):
+        """Hash of the stage's code, arguments and input file contents"""
+        code = {module: self.hasher.digest(os.path.join('scripts', module))
+                for module in sorted(local_modules(spec['script']))}
+        return combine({'code': code, 'args': spec['args'], 'inputs': self.hasher.files(spec['inputs'])})
+
+    def staleness(self, spec):
+        """(fingerprint, reason to run or None when up to date)"""
+        fingerprint = self.fingerprint(spec)
+        previous = self.state['stages'].get(spec['name'])
+        if self.force:
+            return fingerprint, 'forced'
+        if previous is None:
+            return fingerprint, 'never run'
+        if previous['fingerprint'] != fingerprint:
+            return fingerprint, 'inputs, code or arguments changed'
+        outputs = self.hasher.files(spec['outputs'])
+        if not outputs:
+            return fingerprint, 'outputs missing'
+        if outputs != previous['outputs']:
+            return fingerprint, 'outputs changed since last run'
+        return fingerprint, None
+
+    def run_stage(self, spec, reason):
+        """Run one stage script as a subprocess, its output captured to a log file"""
+        log_path = os.path.join(LOG_DIR, self.run_id, f"{spec['name']}.log")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        started = datetime.now()
+        start = time.perf_counter()
+        with open(log_path, 'w') as log:
+            process = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, spec['script'])] + spec['args'],
+                                     cwd=PROJECT_ROOT, stdout=log, stderr=subprocess.STDOUT)
+        return {
+            'run_id': self.run_id,
+            'stage': spec['name'],
+            'status': 'ran' if process.returncode == 0 else 'failed',
+            'reason': reason,
+            'started': started.isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - start, 3),
+            'exit_code': process.returncode,
+            'log': os.path.relpath(log_path, PROJECT_ROOT),
+        }
+
+    def run(self, names, dry_run=False):
+        """Run the selected stages: each once its upstream stages finished, skipped when up to date
+
+        Fingerprints are taken when a stage becomes ready, so they see the
+        files its upstream stages wrote in this run.
+        """
+        selected = set(names)
+        done, blocked, would_run = set(), set(), set()
+        running = {}
+        remaining = list(names)
+        print(f"Run {self.run_id}: {len(names)} stages | {self.jobs} parallel jobs{' | dry run' if dry_run else ''}")
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while remaining or running:
+                # Stages are declared upstream-first, so one pass settles every stage that is ready
+                for name in list(remaining):
+                    spec = STAGE_INDEX[name]
+                    upstream = [d for d in spec['after'] if d in selected]
+                    if any(d in blocked for d in upstream):
+                        remaining.remove(name)
+                        blocked.add(name)
+                        self.record(name, 'blocked', 'upstream stage failed')
+                    elif dry_run and any(d in would_run for d in upstream):
+                        remaining.remove(name)
+                        would_run.add(name)
+                        self.record(name, 'would run', 'after upstream stages')
+                    elif all(d in done for d in upstream) and len(running) < self.jobs:
+                        remaining.remove(name)
+                        fingerprint, reason = self.staleness(spec)
+                        if reason is None:
+                            done.add(name)
+                            self.record(name, 'skipped', 'up to date')
+                        elif dry_run:
+                            would_run.add(name)
+                            self.record(name, 'would run', reason)
+                        else:
+                            print(f"  ▶ {name}: {reason}")
+                            running[pool.submit(self.run_stage, spec, reason)] = (name, fingerprint)
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, fingerprint = running.pop(future)
+                    result = future.result()
+                    self.records.append(result)
+                    mark = '✓' if result['status'] == 'ran' else '✗'
+                    print(f"  {mark} {name}: {result['status']} in {result['seconds']:.1f}s ({result['log']})")
+                    if result['status'] == 'ran':
+                        done.add(name)
+                        self.state['stages'][name] = {
+                            'fingerprint': fingerprint,
+                            'outputs': self.hasher.files(STAGE_INDEX[name]['outputs']),
+                            'finished': datetime.now().isoformat(timespec='seconds'),
+                            'seconds': result['seconds'],
+                        }
+                        self.save_state()
+                    else:
+                        blocked.add(name)
+        return self.records
+
+    def record(self, name, status, reason):
+        """Run-log entry for a stage that did not execute"""
+        print(f"  {'·' if status == 'skipped' else '-'} {name}: {status} ({reason})")
+        self.records.append({'run_id': self.run_id, 'stage': name, 'status': status, 'reason': reason,
+                             'started': datetime.now().isoformat(timespec='seconds'), 'seconds': 0.0,
+                             'exit_code': None, 'log': None})
+
+    def save_state(self):
+        """Persist stage fingerprints and the file hash cache"""
+        os.makedirs(PIPELINE_DIR, exist_ok=True)
+        self.state['files'] = {path: entry for path, entry in self.hasher.cache.items()
+                               if os.path.exists(os.path.join(PROJECT_ROOT, path))}
+        with open(STATE_PATH + '.tmp', 'w') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(STATE_PATH + '.tmp', STATE_PATH)
+
+    def append_run_log(self):
+        """Append this run's stage records to the run log CSV"""
+        os.makedirs(PIPELINE_DIR, exist_ok=True)
+        new_file = not os.path.exists(RUN_LOG_PATH)
+        with open(RUN_LOG_PATH, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RUN_LOG_FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(self.records)
+        return RUN_LOG_PATH
+
+    def print_summary(self, wall_seconds):
+        """Stage table plus time against the last recorded duration of the skipped stages"""
+        print("\n" + "="*80)
+        print("PIPELINE SUMMARY")
+        print("="*80)
+        print(f"\n  {'Stage':14s} {'Status':10s} {'Seconds':>8s}  Reason")
+        for r in self.records:
+            print(f"  {r['stage']:14s} {r['status']:10s} {r['seconds']:8.1f}  {r['reason']}")
+        skipped = [r['stage'] for r in self.records if r['status'] == 'skipped']
+        saved = sum(self.state['stages'].get(s, {}).get('seconds', 0) for s in skipped)
+        print(f"\n  Wall: {wall_seconds:.1f}s | {len(skipped)} stages up to date "
+              f"(≈{saved:.1f}s of previous work reused) | hashed {self.hasher.hashed_bytes / (1024 * 1024):.1f}MB")
+
+
+def main():
+    """Run the pipeline"""
+    parser = argparse.ArgumentParser(description='Run the data pipeline as a DAG with stage caching')
+    parser.add_argument('stages', nargs='*', help=f"Target stages (default: all): {', '.join(STAGE_INDEX)}")
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f'Stages run in parallel (default {DEFAULT_JOBS})')
+    parser.add_argument('--force', action='store_true', help='Run the selected stages even if up to date')
+    parser.add_argument('--no-deps', action='store_true',
+                        help='Only the listed stages, not their upstream stages')
+    parser.add_argument('--dry-run', action='store_true', help='Show which stages would run and why')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("DATA PIPELINE")
+    print("="*80)
+    pipeline = Pipeline(jobs=args.jobs, force=args.force)
+    names = pipeline.select(args.stages, with_deps=not args.no_deps)
+    start = time.perf_counter()
+    records = pipeline.run(names, dry_run=args.dry_run)
+    pipeline.print_summary(time.perf_counter() - start)
+    if args.dry_run:
+        return
+    pipeline.save_state()
+    print(f"\n✓ Run log appended to: {os.path.relpath(pipeline.append_run_log(), PROJECT_ROOT)}")
+    sys.exit(1 if any(r['status'] in ('failed', 'blocked') for r in records) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Gold-Layer Revenue Cube
+Pre-aggregates sales order revenue at day × VKORG × VTWEG × SPART × MATKL ×
+KDGRP × WAERK and answers roll-up / drill-down queries from the smallest
+stored aggregate instead of VBAK/VBAP detail rows
+"""
+
+import os
+import json
+import argparse
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from sap_schema import write_parquet
+from data_catalog import locate, read_table_pandas
+from key_encoding import has_surrogate_keys, surrogate_name
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+CUBE_DIR = os.path.join(DATA_DIR, 'gold', 'revenue_cube')
+CUBE_METADATA = os.path.join(CUBE_DIR, '_cube.json')
+
+# Source tables (silver when built, else bronze) and their join keys
+SOURCES = ['VBAK', 'VBAP', 'MARA', 'KNVV']
+JOIN_KEYS = {'VBAK': ['VBELN', 'KUNNR'], 'VBAP': ['VBELN', 'MATNR'], 'MARA': ['MATNR'], 'KNVV': ['KUNNR']}
+
+# Dimensions
+HEADER_DIMENSIONS = ['VKORG', 'VTWEG', 'SPART', 'KDGRP', 'WAERK']
+DIMENSIONS = ['VKORG', 'VTWEG', 'SPART', 'MATKL', 'KDGRP', 'WAERK']
+TIME_GRAINS = ['DAY', 'MONTH', 'QUARTER', 'YEAR']
+MEASURES = ['NETWR', 'KWMENG', 'LINE_COUNT', 'ORDER_COUNT']
+
+# Stored aggregates: base grain plus intermediate roll-ups.
+# ORDER_COUNT sums exactly over header-level dimensions only; aggregates
+# without MATKL count each order once, so they answer order counts exactly.
+AGGREGATES = {
+    'base': {'time_grain': 'DAY', 'dimensions': DIMENSIONS},
+    'month': {'time_grain': 'MONTH', 'dimensions': DIMENSIONS},
+    'orders_day': {'time_grain': 'DAY', 'dimensions': HEADER_DIMENSIONS},
+    'orders_month': {'time_grain': 'MONTH', 'dimensions': HEADER_DIMENSIONS},
+    'org_month': {'time_grain': 'MONTH', 'dimensions': ['VKORG', 'WAERK']},
+}
+
+
+def source_layer(table_name):
+    """Catalog layer to read a source table from: silver if it has been built, else bronze"""
+    for layer in ('silver', 'bronze'):
+        if locate(table_name, layer):
+            return layer
+    raise FileNotFoundError(f"No silver or bronze source for {table_name}")
+
+
+def surrogate_joins():
+    """Whether every source is a silver table with surrogate ids of its join keys"""
+    return all(source_layer(t) == 'silver' and has_surrogate_keys(locate(t, 'silver'), keys)
+               for t, keys in JOIN_KEYS.items())
+
+
+def time_bucket(dates, grain):
+    """Truncate dates to the start of a day/month/quarter/year"""
+    dates = pd.to_datetime(dates)
+    if grain == 'DAY':
+        return dates.dt.normalize()
+    freq = {'MONTH': 'M', 'QUARTER': 'Q', 'YEAR': 'Y'}[grain]
+    return dates.dt.to_period(freq).dt.start_time
+
+
+# ==================== CUBE BUILDER ====================
+
+class RevenueCubeBuilder:
+    """Build the revenue cube and its intermediate aggregates from sales orders"""
+
+    def __init__(self):
+        self.aggregate_stats = {}
+
+    def load_detail(self):
+        """Order items joined to header, material group and customer group"""
+        print("\n📥 Loading detail tables...")
+        # Keys never reach the cube: join on the integer surrogate ids when silver has them
+        encoded = surrogate_joins()
+
+        def read(table_name, columns):
+            keys = JOIN_KEYS[table_name] if encoded else []
+            frame = read_table_pandas(table_name, layer=source_layer(table_name),
+                                      columns=[surrogate_name(c) if c in keys else c for c in columns])
+            return frame.rename(columns={surrogate_name(c): c for c in keys})
+
+        vbak = read('VBAK', ['VBELN', 'ERDAT', 'VKORG', 'VTWEG', 'SPART', 'KUNNR', 'WAERK'])
+        vbap = read('VBAP', ['VBELN', 'MATNR', 'KWMENG', 'NETWR', 'ABGRU'])
+        mara = read('MARA', ['MATNR', 'MATKL'])
+        knvv = read('KNVV', ['KUNNR', 'VKORG', 'VTWEG', 'SPART', 'KDGRP'])
+        print(f"  VBAK {len(vbak):,} | VBAP {len(vbap):,} | MARA {len(mara):,} | KNVV {len(knvv):,}"
+              f"{' (joined on surrogate ids)' if encoded else ''}")
+
+        # Rejected items (ABGRU set) carry no revenue
+        vbap = vbap[vbap['ABGRU'].astype(str) == ''].drop(columns=['ABGRU'])
+
+        # Join keys as plain strings (categorical dictionaries differ per table)
+        for df, keys in ((vbak, ['VKORG', 'VTWEG', 'SPART']), (knvv, ['VKORG', 'VTWEG', 'SPART'])):
+            for key in keys:
+                df[key] = df[key].astype(str)
+
+        detail = vbap.merge(vbak, on='VBELN', how='inner')
+        detail = detail.merge(mara, on='MATNR', how='left')
+        detail = detail.merge(knvv.drop_duplicates(['KUNNR', 'VKORG', 'VTWEG', 'SPART']),
+                              on=['KUNNR', 'VKORG', 'VTWEG', 'SPART'], how='left')
+        for dim in DIMENSIONS:
+            detail[dim] = detail[dim].astype(str).replace({'nan': '', 'None': ''})
+        print(f"  Detail rows: {len(detail):,}")
+        return detail
+
+    def aggregate(self, detail, time_grain, dimensions):
+        """Sum measures at one grain"""
+        keys = ['DATE'] + dimensions
+        frame = detail.assign(DATE=time_bucket(detail['ERDAT'], time_grain))
+        cube = frame.groupby(keys, sort=True).agg(
+            NETWR=('NETWR', 'sum'),
+            KWMENG=('KWMENG', 'sum'),
+            LINE_COUNT=('VBELN', 'size'),
+            ORDER_COUNT=('VBELN', 'nunique'),
+        ).reset_index()
+        cube['DATE'] = cube['DATE'].dt.date
+        for dim in dimensions:
+            cube[dim] = cube[dim].astype('category')
+        return cube
+
+    def build(self):
+        """Compute and persist every aggregate"""
+        print("="*80)
+        print("GOLD REVENUE CUBE BUILD")
+        print("="*80)
+        print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+        detail = self.load_detail()
+        os.makedirs(CUBE_DIR, exist_ok=True)
+
+        print("\n🧊 Building aggregates...")
+        for name, spec in AGGREGATES.items():
+            start = time.perf_counter()
+            cube = self.aggregate(detail, spec['time_grain'], spec['dimensions'])
+            path = os.path.join(CUBE_DIR, f'{name}.parquet')
+            write_parquet(cube, path)
+            self.aggregate_stats[name] = {
+                'time_grain': spec['time_grain'],
+                'dimensions': spec['dimensions'],
+                'rows': len(cube),
+                'seconds': round(time.perf_counter() - start, 3),
+            }
+            print(f"  ✓ {name:13s} {spec['time_grain']:5s} × {len(spec['dimensions'])} dims "
+                  f"→ {len(cube):8,} rows")
+
+        metadata = {
+            'built_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'detail_rows': len(detail),
+            'sources': {table: os.path.relpath(locate(table, source_layer(table)), DATA_DIR) for table in SOURCES},
+            'aggregates': self.aggregate_stats,
+        }
+        with open(CUBE_METADATA, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        print(f"\n✓ Cube saved to: {os.path.relpath(CUBE_DIR, PROJECT_ROOT)}")
+
+
+# ==================== QUERY API ====================
+
+class RevenueCube:
+    """Roll-up / drill-down queries answered from stored aggregates"""
+
+    def __init__(self, cube_dir=CUBE_DIR):
+        self.cube_dir = cube_dir
+        self.aggregates = {}
+        self.aggregate_rows = None
+        self.last_aggregate = None
+
+    def load(self, name):
+        """Load an aggregate once and keep it in memory"""
+        if name not in self.aggregates:
+            path = os.path.join(self.cube_dir, f'{name}.parquet')
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Cube aggregate {name} not found - run revenue_cube.py first")
+            cube = pd.read_parquet(path)
+            cube['DATE'] = pd.to_datetime(cube['DATE'])
+            self.aggregates[name] = cube
+        return self.aggregates[name]
+
+    def choose_aggregate(self, time_grain, dimensions, needs_order_count, day_filter):
+        """Smallest aggregate that covers the requested grain, dimensions and measures"""
+        if self.aggregate_rows is None:
+            with open(os.path.join(self.cube_dir, '_cube.json')) as f:
+                stats = json.load(f)['aggregates']
+            self.aggregate_rows = {name: stat['rows'] for name, stat in stats.items()}
+
+        candidates = []
+        for name, spec in AGGREGATES.items():
+            if not set(dimensions) <= set(spec['dimensions']):
+                continue
+            if TIME_GRAINS.index(spec['time_grain']) > TIME_GRAINS.index(time_grain or 'YEAR'):
+                continue
+            if day_filter and spec['time_grain'] != 'DAY':
+                continue
+            # Summing per-MATKL order counts double-counts orders unless MATKL is grouped
+            if needs_order_count and 'MATKL' in spec['dimensions'] and 'MATKL' not in dimensions:
+                continue
+            candidates.append((self.aggregate_rows[name], name))
+        if not candidates:
+            raise ValueError(f"No aggregate covers {time_grain} × {dimensions}")
+        return min(candidates)[1]
+
+    def query(self, group_by=(), filters=None, start=None, end=None, measures=None):
+        """
+        Aggregate measures by dimensions and/or a time grain (DAY/MONTH/QUARTER/YEAR)
+
+        filters: {dimension: value or list of values}; start/end: inclusive dates.
+        NETWR is only summed within one currency: unless WAERK is filtered to a
+        single value, it is added to the grouping.
+        """
+        filters = filters or {}
+        measures = list(measures or MEASURES)
+        group_by = list(group_by)
+        time_grains = [g for g in group_by if g in TIME_GRAINS]
+        dimensions = [g for g in group_by if g not in TIME_GRAINS]
+        currency = filters.get('WAERK')
+        single_currency = currency is not None and (
+            not isinstance(currency, (list, tuple, set)) or len(set(currency)) == 1)
+        if 'NETWR' in measures and 'WAERK' not in dimensions and not single_currency:
+            dimensions.append('WAERK')
+        unknown = set(dimensions + list(filters)) - set(DIMENSIONS)
+        if unknown or len(time_grains) > 1:
+            raise ValueError(f"Unknown dimensions {sorted(unknown)} or more than one time grain")
+        time_grain = time_grains[0] if time_grains else None
+
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        month_aligned = ((start is None or start.day == 1)
+                         and (end is None or end.is_month_end))
+        name = self.choose_aggregate(
+            time_grain, sorted(set(dimensions) | set(filters)),
+            'ORDER_COUNT' in measures, day_filter=not month_aligned,
+        )
+        self.last_aggregate = name
+        cube = self.load(name)
+
+        mask = pd.Series(True, index=cube.index)
+        for dim, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= cube[dim].isin([str(v) for v in values])
+        if start is not None:
+            mask &= cube['DATE'] >= start
+        if end is not None:
+            mask &= cube['DATE'] <= end
+        selected = cube.loc[mask]
+
+        keys = list(dimensions)
+        if time_grain:
+            selected = selected.assign(**{time_grain: time_bucket(selected['DATE'], time_grain)})
+            keys = [time_grain] + keys
+        if not keys:
+            return selected[measures].sum().to_frame().T.astype(selected[measures].dtypes.to_dict())
+        return selected.groupby(keys, observed=True, sort=True)[measures].sum().reset_index()
+
+
+def main():
+    """Build the cube and time typical dashboard queries"""
+    parser = argparse.ArgumentParser(description='Gold-layer revenue cube')
+    parser.add_argument('--query-only', action='store_true',
+                        help='Skip the build and only run the sample queries')
+    args = parser.parse_args()
+
+    if not args.query_only:
+        RevenueCubeBuilder().build()
+
+    cube = RevenueCube()
+    first_day = cube.load('orders_day')['DATE'].min()
+    samples = [
+        ('Revenue by month × currency', dict(group_by=['MONTH'])),
+        ('Revenue by sales org × currency', dict(group_by=['VKORG', 'WAERK'])),
+        ('Material groups in sales org 1000', dict(group_by=['MATKL'], filters={'VKORG': '1000'})),
+        ('Customer groups by quarter (USD)', dict(group_by=['QUARTER', 'KDGRP'], filters={'WAERK': 'USD'})),
+        ('Daily revenue × currency, first week', dict(group_by=['DAY'], start=first_day,
+                                                      end=first_day + pd.Timedelta(days=6))),
+    ]
+    print("\n⏱️  Sample queries:")
+    for label, kwargs in samples:
+        start = time.perf_counter()
+        result = cube.query(**kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"  {label:38s} {len(result):5,} rows  {elapsed:7.2f}ms  (from {cube.last_aggregate})")
+
+
+if __name__ == "__main__":
+    main()
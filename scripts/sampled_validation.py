@@ -0,0 +1,254 @@
+"""
+Sampled Referential Integrity with Confidence Bounds
+Fast pre-load gate: probes a stratified random sample of child rows against
+the parent key sets, estimates each relationship's violation rate with a
+confidence interval and escalates to a full scan only when the upper bound
+crosses a threshold
+
+Strata are (partition, sales org) cells: Parquet row groups, or CSV batches,
+split by VKORG when the child table has one. Every cell is sampled with a
+Bernoulli rate of at least the sample fraction (small partitions get at least
+MIN_STRATUM_ROWS rows); rates are post-stratified by the exact cell sizes.
+"""
+
+import zlib
+import argparse
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from sap_schema import bytes_to_read, conform_table, file_columns, get_primary_key, iter_table_batches
+from foreign_keys import ForeignKeyChecker, contains, encode_keys, format_result, key_widths
+
+# Configuration
+SAMPLE_FRACTION = 0.05
+MIN_STRATUM_ROWS = 1000
+ESCALATE_ABOVE = 0.01        # escalate when the violation-rate upper bound exceeds 1%
+CONFIDENCE = 0.95
+STRATA_COLUMN = 'VKORG'
+
+
+# ==================== ESTIMATION ====================
+
+def wilson_interval(rate, n, z):
+    """Wilson score interval of a proportion observed on n rows"""
+    if n <= 0:
+        return 0.0, 1.0
+    denominator = 1 + z * z / n
+    center = (rate + z * z / (2 * n)) / denominator
+    half = z * np.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / denominator
+    # Exact bounds at the extremes (no rounding residue above 0 / below 1)
+    low = 0.0 if rate <= 0 else max(0.0, center - half)
+    high = 1.0 if rate >= 1 else min(1.0, center + half)
+    return low, high
+
+
+def stratified_estimate(cells, confidence=CONFIDENCE):
+    """Violation rate and confidence bounds from {stratum: [population, sampled, violations]}
+
+    The rate is the population-weighted mean of the cell rates; its variance
+    (with finite population correction) sets the effective sample size of a
+    Wilson interval, so zero observed violations still give an upper bound.
+    """
+    population = np.array([c[0] for c in cells.values()], dtype=np.float64)
+    sampled = np.array([c[1] for c in cells.values()], dtype=np.float64)
+    violations = np.array([c[2] for c in cells.values()], dtype=np.float64)
+    observed = sampled > 0
+    if not observed.any():
+        return 0.0, 0.0, 1.0
+    if (sampled == population).all():
+        rate = violations.sum() / population.sum()
+        return rate, rate, rate
+
+    weights = population[observed] / population[observed].sum()
+    cell_rates = violations[observed] / sampled[observed]
+    rate = float(np.sum(weights * cell_rates))
+    fpc = 1 - sampled[observed] / population[observed]
+    variance = float(np.sum(weights ** 2 * cell_rates * (1 - cell_rates) / sampled[observed] * fpc))
+    n_effective = rate * (1 - rate) / variance if variance > 0 else sampled.sum()
+    low, high = wilson_interval(rate, n_effective, NormalDist().inv_cdf((1 + confidence) / 2))
+    return rate, low, high
+
+
+# ==================== CHECKER ====================
+
+def format_sampled(r):
+    """Estimate line for a sampled relationship result"""
+    if not r.get('sampled'):
+        return []
+    counts = 'counts estimated from ' if r.get('estimated') and r['violations'] else ''
+    line = (f"      {counts}sample {r['sampled_rows']:,} of {r['rows']:,} rows in {r['strata']} strata: "
+            f"rate {r['rate']:.3%} ({r['confidence']:.0%} CI {r['rate_low']:.3%}–{r['rate_high']:.3%})")
+    if r.get('escalated'):
+        line += f" → escalated to full scan (upper bound > {r['threshold']:.2%})"
+    return [line]
+
+
+class SampledForeignKeyChecker(ForeignKeyChecker):
+    """ForeignKeyChecker that probes a stratified sample and escalates when needed"""
+
+    def __init__(self, table_files=None, fraction=SAMPLE_FRACTION, escalate_above=ESCALATE_ABOVE,
+                 confidence=CONFIDENCE, seed=0, **kwargs):
+        super().__init__(table_files, **kwargs)
+        self.fraction = fraction
+        self.escalate_above = escalate_above
+        self.confidence = confidence
+        self.seed = seed
+
+    def sample_units(self, path):
+        """(row groups, rows) read units: one per Parquet row group, the whole file for CSV"""
+        if not str(path).endswith('.parquet'):
+            return [(None, None)]
+        metadata = pq.read_metadata(path)
+        return [([i], metadata.row_group(i).num_rows) for i in range(metadata.num_row_groups)]
+
+    def sample(self, entry, needed, parent_keys, result):
+        """Probe a stratified Bernoulli sample; returns {stratum: [population, sampled, violations]}"""
+        child = entry['child']
+        child_path = self.table_files[child]
+        parent_ints, parent_strings = parent_keys
+        widths = key_widths(entry['parent'], entry['parent_columns'])
+        sample_columns = [c for c in get_primary_key(child) if c not in entry['columns']]
+        strata_column = STRATA_COLUMN if STRATA_COLUMN in file_columns(child_path) else None
+        columns = list(dict.fromkeys(needed + ([strata_column] if strata_column else [])))
+        head_columns = list(dict.fromkeys(list(entry['where']) + ([strata_column] if strata_column else [])))
+        key_columns = list(dict.fromkeys(entry['columns'] + sample_columns))
+        rng = np.random.default_rng([self.seed, zlib.crc32(result['relationship'].encode())])
+
+        cells = {}
+        for unit, (row_groups, unit_rows) in enumerate(self.sample_units(child_path)):
+            self.io.bytes_read += bytes_to_read(child_path, columns, row_groups)
+            batches = iter_table_batches(child_path, child, self.batch_rows, columns=columns,
+                                         row_groups=row_groups, conform=False)
+            for number, batch in enumerate(batches):
+                # Conform the filter/strata columns of every row, the key columns of drawn rows only
+                head = conform_table(batch.select(head_columns), child)
+                for column, value in entry['where'].items():
+                    keep = pc.equal(pc.cast(head.column(column), pa.string()), value)
+                    batch, head = batch.filter(keep), head.filter(keep)
+                if batch.num_rows == 0:
+                    continue
+                result['rows'] += batch.num_rows
+                # CSV batches are the partitions; Parquet batches share their row group's rate
+                partition = unit if row_groups is not None else f'{unit}.{number}'
+                rate = min(1.0, max(self.fraction, MIN_STRATUM_ROWS / (unit_rows or batch.num_rows)))
+                drawn = rng.random(batch.num_rows) < rate
+
+                if strata_column:
+                    labels = pc.cast(head.column(strata_column), pa.string()).to_numpy(zero_copy_only=False)
+                    names, codes = np.unique(labels.astype(str), return_inverse=True)
+                else:
+                    names, codes = np.array(['']), np.zeros(batch.num_rows, dtype=np.intp)
+
+                sample = conform_table(batch.filter(pa.array(drawn)).select(key_columns), child)
+                present, numeric, ints, strings = encode_keys(sample, entry['columns'], widths)
+                valid = np.ones(sample.num_rows, dtype=bool)
+                valid[numeric] = contains(parent_ints, ints)
+                valid[present & ~numeric] = contains(parent_strings, strings)
+                violating = present & ~valid
+
+                population = np.bincount(codes, minlength=len(names))
+                sampled = np.bincount(codes[drawn], minlength=len(names))
+                hits = np.bincount(codes[drawn], weights=violating, minlength=len(names))
+                for i, name in enumerate(names):
+                    cell = cells.setdefault((partition, name), [0, 0, 0])
+                    cell[0] += int(population[i])
+                    cell[1] += int(sampled[i])
+                    cell[2] += int(hits[i])
+
+                result['sampled_rows'] += sample.num_rows
+                result['sampled_violations'] += int(violating.sum())
+                if violating.any() and len(result['samples']) < self.sample_rows:
+                    rows = sample.select(entry['columns'] + sample_columns).filter(pa.array(violating))
+                    take = self.sample_rows - len(result['samples'])
+                    result['samples'].extend(rows.slice(0, take).to_pylist())
+        return cells
+
+    def check(self, entry):
+        """Sampled estimate; a full scan when the rate's upper bound exceeds the threshold"""
+        result = self.new_result(entry)
+        needed = self.child_columns(entry, result)
+        if needed is None:
+            return result
+
+        start = time.perf_counter()
+        self.io.bytes_read = 0
+        parent_keys = self.parent_keys(entry['parent'], entry['parent_columns'])
+        result.update(sampled=True, sampled_rows=0, sampled_violations=0, confidence=self.confidence,
+                      threshold=self.escalate_above)
+        cells = self.sample(entry, needed, parent_keys, result)
+        rate, low, high = stratified_estimate(cells, self.confidence)
+        result.update(strata=len(cells), rate=rate, rate_low=low, rate_high=high,
+                      sample_seconds=time.perf_counter() - start, escalated=high > self.escalate_above)
+
+        if result['escalated']:
+            exact = super().check(entry)
+            for field in ('rows', 'checked', 'blank', 'violations', 'samples'):
+                result[field] = exact[field]
+            self.io.bytes_read += exact['bytes_read']
+        else:
+            # Estimates: blanks and violations scaled from the sample
+            result['violations'] = int(round(rate * result['rows']))
+            result['checked'] = result['rows']
+            result['estimated'] = True
+        result['seconds'] = time.perf_counter() - start
+        result['bytes_read'] = self.io.bytes_read
+        result['status'] = 'OK' if result['violations'] == 0 and not result['sampled_violations'] else 'FAILED'
+        return result
+
+
+def main():
+    """Sample every catalog relationship (optionally timing a full scan for comparison)"""
+    parser = argparse.ArgumentParser(description='Sampled referential integrity gate')
+    parser.add_argument('tables', nargs='*', help='Only relationships touching these tables (default: all)')
+    parser.add_argument('--fraction', type=float, default=SAMPLE_FRACTION,
+                        help=f'Row sample fraction per stratum (default {SAMPLE_FRACTION})')
+    parser.add_argument('--escalate-above', type=float, default=ESCALATE_ABOVE,
+                        help=f'Full scan when the rate upper bound exceeds this (default {ESCALATE_ABOVE})')
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE,
+                        help=f'Confidence level of the intervals (default {CONFIDENCE})')
+    parser.add_argument('--compare', action='store_true',
+                        help='Also run the full scan to measure time saved and check the intervals')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("SAMPLED REFERENTIAL INTEGRITY CHECK")
+    print("="*80)
+    checker = SampledForeignKeyChecker(fraction=args.fraction, escalate_above=args.escalate_above,
+                                       confidence=args.confidence)
+    start = time.perf_counter()
+    results = checker.check_all(tables=args.tables)
+    sampled_seconds = time.perf_counter() - start
+    group = None
+    for r in results:
+        if r['group'] != group:
+            group = r['group']
+            print(f"\n{group}:")
+        for line in format_result(r) + format_sampled(r):
+            print(line)
+
+    escalated = sum(bool(r.get('escalated')) for r in results)
+    print(f"\nRelationships: {len(results)} | escalated: {escalated} | "
+          f"failed: {sum(r['status'] == 'FAILED' for r in results)} | {sampled_seconds:.2f}s")
+
+    if args.compare:
+        full = ForeignKeyChecker(checker.table_files)
+        start = time.perf_counter()
+        exact = {r['relationship']: r for r in full.check_all(tables=args.tables)}
+        full_seconds = time.perf_counter() - start
+        covered = [
+            r['rate_low'] <= exact[r['relationship']]['violations'] / max(exact[r['relationship']]['rows'], 1)
+            <= r['rate_high']
+            for r in results if r.get('sampled')
+        ]
+        print(f"Full scan: {full_seconds:.2f}s | time saved {full_seconds - sampled_seconds:.2f}s "
+              f"({(1 - sampled_seconds / full_seconds) if full_seconds else 0:.0%}) | "
+              f"exact rate inside interval: {sum(covered)}/{len(covered)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1129 @@
+"""
+SAP SD / Salesforce CRM Schema Registry
+Exact Arrow types, date parsing rules and dictionary encoding for every table
+"""
+
+import os
+import csv
+import inspect
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# Bumped whenever a type mapping changes so cached Parquet/IPC outputs are rebuilt
+SCHEMA_VERSION = 1
+
+# CHAR/NUMC columns up to this length are low-cardinality codes (VKORG, AUART, ...)
+CODE_MAX_LENGTH = 4
+
+# SAP fields with the ALPHA conversion exit (numeric values are zero padded)
+ALPHA_FIELDS = {
+    'KUNNR', 'KUNN2', 'KUNAG', 'KUNRG', 'VBELN', 'VBELV', 'VGBEL', 'AUBEL',
+    'MATNR', 'PRDHA', 'PRODH', 'KNUMV', 'TKNUM',
+}
+
+DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+
+# Document/partner/material numbers looked up by single value (support and API)
+LOOKUP_FIELDS = {
+    'VBELN', 'KUNNR', 'MATNR', 'KUNAG', 'VBELV', 'KNUMV', 'TKNUM',
+    'Id', 'AccountId', 'OpportunityId', 'ContactId',
+    'CRM_AccountId', 'CRM_OpportunityId', 'CRM_ContactId', 'CRM_QuoteId', 'SAP_KUNNR', 'SAP_VBELN',
+}
+BLOOM_FILTER_FPP = 0.01
+# Bloom filters and page indexes need pyarrow 14+ on the write side
+SUPPORTS_KEY_INDEXES = 'bloom_filter_options' in inspect.signature(pq.ParquetWriter.__init__).parameters
+
+# ABAP dictionary / Salesforce field types → Arrow types
+ARROW_TYPES = {
+    # SAP
+    'CHAR': pa.string(),
+    'NUMC': pa.string(),
+    'DATS': pa.date32(),
+    'TIMS': pa.time32('s'),
+    'CURR': pa.float64(),
+    'QUAN': pa.float64(),
+    'DEC': pa.float64(),
+    'INT4': pa.int32(),
+    'CUKY': DICTIONARY,
+    'UNIT': DICTIONARY,
+    'LANG': DICTIONARY,
+    # Salesforce
+    'ID': pa.string(),
+    'STRING': pa.string(),
+    'PICKLIST': DICTIONARY,
+    'DATE': pa.date32(),
+    'DATETIME': pa.timestamp('s'),
+    'BOOLEAN': pa.bool_(),
+    'CURRENCY': pa.float64(),
+    'DOUBLE': pa.float64(),
+    'INT': pa.int64(),
+}
+
+SAP_TEXT_TYPES = {'CHAR', 'NUMC', 'CUKY', 'UNIT', 'LANG'}
+CRM_TEXT_TYPES = {'ID', 'STRING', 'PICKLIST'}
+FLOAT_TYPES = {'CURR', 'QUAN', 'DEC', 'CURRENCY', 'DOUBLE'}
+INT_TYPES = {'INT4', 'INT'}
+
+
+# ==================== TABLE DEFINITIONS ====================
+# Column specs are (type, length) pairs taken from docs/DATA_DICTIONARY.md
+
+_ACCOUNT_COLUMNS = {
+    'Id': ('ID', 11),
+    'Name': ('STRING', 255),
+    'AccountNumber': ('STRING', 40),
+    'Type': ('PICKLIST', 40),
+    'Industry': ('PICKLIST', 40),
+    'AnnualRevenue': ('CURRENCY', 18),
+    'NumberOfEmployees': ('INT', 8),
+    'BillingStreet': ('STRING', 255),
+    'BillingCity': ('STRING', 40),
+    'BillingState': ('PICKLIST', 80),
+    'BillingPostalCode': ('STRING', 20),
+    'BillingCountry': ('PICKLIST', 80),
+    'Phone': ('STRING', 40),
+    'Website': ('STRING', 255),
+    'Rating': ('PICKLIST', 40),
+    'OwnerId': ('ID', 7),
+    'CreatedDate': ('DATETIME', 19),
+    'LastModifiedDate': ('DATETIME', 19),
+    'IsDeleted': ('BOOLEAN', 1),
+}
+
+_ACCOUNT_XREF_COLUMNS = {
+    'CRM_AccountId': ('ID', 11),
+    'CRM_AccountNumber': ('STRING', 40),
+    'CRM_AccountName': ('STRING', 255),
+    'SAP_KUNNR': ('CHAR', 10),
+    'SAP_NAME1': ('CHAR', 35),
+    'SAP_LAND1': ('CHAR', 3),
+    'MatchType': ('PICKLIST', 40),
+    'MatchConfidence': ('INT', 3),
+    'CreatedDate': ('DATETIME', 19),
+    'DataSource': ('PICKLIST', 40),
+}
+
+_OPPORTUNITY_XREF_COLUMNS = {
+    'CRM_OpportunityId': ('ID', 11),
+    'CRM_OpportunityName': ('STRING', 120),
+    'CRM_Amount': ('CURRENCY', 18),
+    'CRM_CloseDate': ('DATE', 10),
+    'CRM_AccountId': ('ID', 11),
+    'SAP_VBELN': ('CHAR', 10),
+    'SAP_NETWR': ('CURR', 15),
+    'SAP_WAERK': ('CUKY', 5),
+    'SAP_ERDAT': ('DATS', 8),
+    'SAP_KUNNR': ('CHAR', 10),
+    'LinkType': ('PICKLIST', 40),
+    'AmountVariance': ('CURRENCY', 18),
+    'DaysFromCloseToOrder': ('INT', 6),
+    'CreatedDate': ('DATETIME', 19),
+}
+
+_QUOTE_XREF_COLUMNS = {
+    'CRM_QuoteId': ('ID', 11),
+    'CRM_QuoteNumber': ('STRING', 40),
+    'CRM_OpportunityId': ('ID', 11),
+    'CRM_TotalPrice': ('CURRENCY', 18),
+    'CRM_Status': ('PICKLIST', 40),
+    'SAP_VBELN': ('CHAR', 10),
+    'SAP_NETWR': ('CURR', 15),
+    'LinkType': ('PICKLIST', 40),
+    'AmountVariance': ('CURRENCY', 18),
+    'CreatedDate': ('DATETIME', 19),
+}
+
+TABLE_SCHEMAS = {
+    # ==================== SAP MASTER DATA - CUSTOMER ====================
+    'KNA1': {
+        'primary_key': ['KUNNR'],
+        'columns': {
+            'KUNNR': ('CHAR', 10),
+            'NAME1': ('CHAR', 35),
+            'LAND1': ('CHAR', 3),
+            'PSTLZ': ('CHAR', 10),
+            'ORT01': ('CHAR', 35),
+            'STRAS': ('CHAR', 35),
+            'KTOKD': ('CHAR', 4),
+            'BRSCH': ('CHAR', 4),
+            'ERDAT': ('DATS', 8),
+            'LOEVM': ('CHAR', 1),
+        },
+    },
+    'KNVV': {
+        'primary_key': ['KUNNR', 'VKORG', 'VTWEG', 'SPART'],
+        'columns': {
+            'KUNNR': ('CHAR', 10),
+            'VKORG': ('CHAR', 4),
+            'VTWEG': ('CHAR', 2),
+            'SPART': ('CHAR', 2),
+            'KDGRP': ('CHAR', 2),
+            'WAERS': ('CUKY', 5),
+            'KALKS': ('CHAR', 1),
+            'VSBED': ('CHAR', 2),
+            'LPRIO': ('CHAR', 2),
+        },
+    },
+    'KNB1': {
+        'primary_key': ['KUNNR', 'BUKRS'],
+        'columns': {
+            'KUNNR': ('CHAR', 10),
+            'BUKRS': ('CHAR', 4),
+            'AKONT': ('CHAR', 10),
+            'ZTERM': ('CHAR', 4),
+            'FDGRV': ('CHAR', 10),
+        },
+    },
+    'KNVP': {
+        'primary_key': ['KUNNR', 'VKORG', 'VTWEG', 'SPART', 'PARVW'],
+        'columns': {
+            'KUNNR': ('CHAR', 10),
+            'VKORG': ('CHAR', 4),
+            'VTWEG': ('CHAR', 2),
+            'SPART': ('CHAR', 2),
+            'PARVW': ('CHAR', 2),
+            'KUNN2': ('CHAR', 10),
+        },
+    },
+
+    # ==================== SAP MASTER DATA - MATERIAL ====================
+    'MARA': {
+        'primary_key': ['MATNR'],
+        'columns': {
+            'MATNR': ('CHAR', 18),
+            'MTART': ('CHAR', 4),
+            'MATKL': ('CHAR', 9),
+            'MEINS': ('UNIT', 3),
+            'MTPOS_MARA': ('CHAR', 4),
+            'PRDHA': ('CHAR', 18),
+            'ERNAM': ('CHAR', 12),
+            'ERSDA': ('DATS', 8),
+            'LAEDA': ('DATS', 8),
+        },
+    },
+    'MARC': {
+        'primary_key': ['MATNR', 'WERKS'],
+        'columns': {
+            'MATNR': ('CHAR', 18),
+            'WERKS': ('CHAR', 4),
+            'PSTAT': ('CHAR', 15),
+            'LVORM': ('CHAR', 1),
+            'DISMM': ('CHAR', 2),
+            'DISPO': ('CHAR', 3),
+            'EKGRP': ('CHAR', 3),
+        },
+    },
+    'MAKT': {
+        'primary_key': ['MATNR', 'SPRAS'],
+        'columns': {
+            'MATNR': ('CHAR', 18),
+            'SPRAS': ('LANG', 1),
+            'MAKTX': ('CHAR', 40),
+        },
+    },
+    'MVKE': {
+        'primary_key': ['MATNR', 'VKORG', 'VTWEG'],
+        'columns': {
+            'MATNR': ('CHAR', 18),
+            'VKORG': ('CHAR', 4),
+            'VTWEG': ('CHAR', 2),
+            'MVGR1': ('CHAR', 3),
+            'KONDM': ('CHAR', 2),
+            'KTGRM': ('CHAR', 2),
+        },
+    },
+
+    # ==================== SAP ORGANIZATIONAL STRUCTURES ====================
+    'T001': {
+        'primary_key': ['BUKRS'],
+        'columns': {
+            'BUKRS': ('CHAR', 4),
+            'BUTXT': ('CHAR', 25),
+            'WAERS': ('CUKY', 5),
+            'LAND1': ('CHAR', 3),
+        },
+    },
+    'TVKO': {
+        'primary_key': ['VKORG'],
+        'columns': {
+            'VKORG': ('CHAR', 4),
+            'VTEXT': ('CHAR', 20),
+            'BUKRS': ('CHAR', 4),
+        },
+    },
+    'TVTW': {
+        'primary_key': ['VTWEG'],
+        'columns': {
+            'VTWEG': ('CHAR', 2),
+            'VTEXT': ('CHAR', 20),
+        },
+    },
+    'TSPA': {
+        'primary_key': ['SPART'],
+        'columns': {
+            'SPART': ('CHAR', 2),
+            'VTEXT': ('CHAR', 20),
+        },
+    },
+    'T023': {
+        'primary_key': ['MATKL'],
+        'columns': {
+            'MATKL': ('CHAR', 9),
+            'WGBEZ': ('CHAR', 20),
+        },
+    },
+    'T005': {
+        'primary_key': ['LAND1'],
+        'columns': {
+            'LAND1': ('CHAR', 3),
+            'LANDX': ('CHAR', 15),
+            'NATIO': ('CHAR', 3),
+        },
+    },
+    'T171T': {
+        'primary_key': ['PRODH', 'SPRAS'],
+        'columns': {
+            'PRODH': ('CHAR', 18),
+            'SPRAS': ('LANG', 1),
+            'VTEXT': ('CHAR', 40),
+        },
+    },
+
+    # ==================== SAP TRANSACTIONS - SALES ORDERS ====================
+    'VBAK': {
+        'primary_key': ['VBELN'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'ERDAT': ('DATS', 8),
+            'ERZET': ('TIMS', 6),
+            'ERNAM': ('CHAR', 12),
+            'AEDAT': ('DATS', 8),
+            'AUDAT': ('DATS', 8),
+            'VBTYP': ('CHAR', 1),
+            'AUART': ('CHAR', 4),
+            'VKORG': ('CHAR', 4),
+            'VTWEG': ('CHAR', 2),
+            'SPART': ('CHAR', 2),
+            'KUNNR': ('CHAR', 10),
+            'VKBUR': ('CHAR', 4),
+            'VKGRP': ('CHAR', 3),
+            'NETWR': ('CURR', 15),
+            'WAERK': ('CUKY', 5),
+            'GBSTK': ('CHAR', 1),
+            'ABSTK': ('CHAR', 1),
+            'LIFSK': ('CHAR', 2),
+            'FAKSK': ('CHAR', 2),
+        },
+    },
+    'VBAP': {
+        'primary_key': ['VBELN', 'POSNR'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'POSNR': ('NUMC', 6),
+            'MATNR': ('CHAR', 18),
+            'ARKTX': ('CHAR', 40),
+            'KWMENG': ('QUAN', 15),
+            'VRKME': ('UNIT', 3),
+            'UMVKZ': ('DEC', 5),
+            'UMVKN': ('DEC', 5),
+            'NETPR': ('CURR', 11),
+            'NETWR': ('CURR', 15),
+            'WAERK': ('CUKY', 5),
+            'WERKS': ('CHAR', 4),
+            'LGORT': ('CHAR', 4),
+            'PSTYV': ('CHAR', 4),
+            'ERDAT': ('DATS', 8),
+            'ABGRU': ('CHAR', 2),
+        },
+    },
+    'VBUK': {
+        'primary_key': ['VBELN'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'LFSTK': ('CHAR', 1),
+            'FKSTK': ('CHAR', 1),
+            'GBSTK': ('CHAR', 1),
+            'ABSTK': ('CHAR', 1),
+            'LFGSK': ('CHAR', 1),
+            'FKIVK': ('CHAR', 1),
+            'UVALL': ('CHAR', 1),
+            'CMGST': ('CHAR', 1),
+        },
+    },
+    'VBUP': {
+        'primary_key': ['VBELN', 'POSNR'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'POSNR': ('NUMC', 6),
+            'LFSTA': ('CHAR', 1),
+            'FKSTA': ('CHAR', 1),
+            'GBSTA': ('CHAR', 1),
+            'ABSTA': ('CHAR', 1),
+            'LFGSA': ('CHAR', 1),
+            'WBSTA': ('CHAR', 1),
+        },
+    },
+    'VBEP': {
+        'primary_key': ['VBELN', 'POSNR', 'ETENR'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'POSNR': ('NUMC', 6),
+            'ETENR': ('NUMC', 4),
+            'EDATU': ('DATS', 8),
+            'BMENG': ('QUAN', 15),
+            'VRKME': ('UNIT', 3),
+            'ERDAT': ('DATS', 8),
+        },
+    },
+
+    # ==================== SAP TRANSACTIONS - DELIVERIES ====================
+    'LIKP': {
+        'primary_key': ['VBELN'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'ERNAM': ('CHAR', 12),
+            'ERDAT': ('DATS', 8),
+            'ERZET': ('TIMS', 6),
+            'WADAT_IST': ('DATS', 8),
+            'WADAT': ('DATS', 8),
+            'LFART': ('CHAR', 4),
+            'VKORG': ('CHAR', 4),
+            'VSTEL': ('CHAR', 4),
+            'KUNNR': ('CHAR', 10),
+            'INCO1': ('CHAR', 3),
+            'LIFSK': ('CHAR', 2),
+            'KODAT': ('DATS', 8),
+        },
+    },
+    'LIPS': {
+        'primary_key': ['VBELN', 'POSNR'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'POSNR': ('NUMC', 6),
+            'MATNR': ('CHAR', 18),
+            'LFIMG': ('QUAN', 15),
+            'VRKME': ('UNIT', 3),
+            'LGMNG': ('QUAN', 15),
+            'MEINS': ('UNIT', 3),
+            'WERKS': ('CHAR', 4),
+            'LGORT': ('CHAR', 4),
+            'VGBEL': ('CHAR', 10),
+            'VGPOS': ('NUMC', 6),
+            'ERDAT': ('DATS', 8),
+        },
+    },
+
+    # ==================== SAP TRANSACTIONS - BILLING ====================
+    'VBRK': {
+        'primary_key': ['VBELN'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'FKART': ('CHAR', 4),
+            'FKDAT': ('DATS', 8),
+            'ERDAT': ('DATS', 8),
+            'ERZET': ('TIMS', 6),
+            'ERNAM': ('CHAR', 12),
+            'KUNAG': ('CHAR', 10),
+            'KUNRG': ('CHAR', 10),
+            'VKORG': ('CHAR', 4),
+            'NETWR': ('CURR', 15),
+            'WAERK': ('CUKY', 5),
+            'FKSTO': ('CHAR', 1),
+            'VBUND': ('CHAR', 6),
+            'RFBSK': ('CHAR', 1),
+        },
+    },
+    'VBRP': {
+        'primary_key': ['VBELN', 'POSNR'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'POSNR': ('NUMC', 6),
+            'MATNR': ('CHAR', 18),
+            'ARKTX': ('CHAR', 40),
+            'FKIMG': ('QUAN', 15),
+            'VRKME': ('UNIT', 3),
+            'NETWR': ('CURR', 15),
+            'WAERK': ('CUKY', 5),
+            'WERKS': ('CHAR', 4),
+            'VGBEL': ('CHAR', 10),
+            'VGPOS': ('NUMC', 6),
+            'ERDAT': ('DATS', 8),
+            'AUBEL': ('CHAR', 10),
+            'AUPOS': ('NUMC', 6),
+        },
+    },
+
+    # ==================== SAP TRANSACTIONS - SUPPORT TABLES ====================
+    'VBFA': {
+        'primary_key': ['VBELV', 'POSNV', 'VBELN', 'POSNN'],
+        'columns': {
+            'VBELV': ('CHAR', 10),
+            'POSNV': ('NUMC', 6),
+            'VBELN': ('CHAR', 10),
+            'POSNN': ('NUMC', 6),
+            'VBTYP_N': ('CHAR', 1),
+            'VBTYP_V': ('CHAR', 1),
+            'RFMNG': ('QUAN', 15),
+            'MEINS': ('UNIT', 3),
+            'ERDAT': ('DATS', 8),
+        },
+    },
+    'KONV': {
+        'primary_key': ['KNUMV', 'KPOSN', 'STUNR', 'ZAEHK'],
+        'columns': {
+            'KNUMV': ('CHAR', 10),
+            'KPOSN': ('NUMC', 6),
+            'STUNR': ('NUMC', 3),
+            'ZAEHK': ('NUMC', 3),
+            'KSCHL': ('CHAR', 4),
+            'KWERT': ('CURR', 15),
+            'KBETR': ('DEC', 11),
+            'WAERS': ('CUKY', 5),
+        },
+    },
+    'VBPA': {
+        'primary_key': ['VBELN', 'POSNR', 'PARVW'],
+        'columns': {
+            'VBELN': ('CHAR', 10),
+            'POSNR': ('NUMC', 6),
+            'PARVW': ('CHAR', 2),
+            'KUNNR': ('CHAR', 10),
+            'ADRNR': ('CHAR', 10),
+            'PERNR': ('NUMC', 8),
+        },
+    },
+    'VTTK': {
+        'primary_key': ['TKNUM'],
+        'columns': {
+            'TKNUM': ('CHAR', 10),
+            'SHTYP': ('CHAR', 4),
+            'ERNAM': ('CHAR', 12),
+            'ERDAT': ('DATS', 8),
+            'DATEN': ('DATS', 8),
+            'DATBI': ('DATS', 8),
+            'VSTEL': ('CHAR', 4),
+            'TDLNR': ('CHAR', 10),
+        },
+    },
+    'VTTP': {
+        'primary_key': ['TKNUM', 'TPNUM'],
+        'columns': {
+            'TKNUM': ('CHAR', 10),
+            'TPNUM': ('NUMC', 4),
+            'VBELN': ('CHAR', 10),
+            'ERDAT': ('DATS', 8),
+        },
+    },
+
+    # ==================== SALESFORCE CRM ====================
+    'Account': {
+        'primary_key': ['Id'],
+        'columns': _ACCOUNT_COLUMNS,
+    },
+    'Contact': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 11),
+            'AccountId': ('ID', 11),
+            'FirstName': ('STRING', 40),
+            'LastName': ('STRING', 80),
+            'Email': ('STRING', 80),
+            'Phone': ('STRING', 40),
+            'MobilePhone': ('STRING', 40),
+            'Title': ('PICKLIST', 128),
+            'Department': ('PICKLIST', 80),
+            'MailingStreet': ('STRING', 255),
+            'MailingCity': ('STRING', 40),
+            'MailingState': ('PICKLIST', 80),
+            'MailingPostalCode': ('STRING', 20),
+            'MailingCountry': ('PICKLIST', 80),
+            'LeadSource': ('PICKLIST', 40),
+            'OwnerId': ('ID', 7),
+            'CreatedDate': ('DATETIME', 19),
+            'LastModifiedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+    'Lead': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 11),
+            'FirstName': ('STRING', 40),
+            'LastName': ('STRING', 80),
+            'Company': ('STRING', 255),
+            'Title': ('PICKLIST', 128),
+            'Email': ('STRING', 80),
+            'Phone': ('STRING', 40),
+            'Street': ('STRING', 255),
+            'City': ('STRING', 40),
+            'State': ('PICKLIST', 80),
+            'PostalCode': ('STRING', 20),
+            'Country': ('PICKLIST', 80),
+            'Industry': ('PICKLIST', 40),
+            'LeadSource': ('PICKLIST', 40),
+            'Status': ('PICKLIST', 40),
+            'Rating': ('PICKLIST', 40),
+            'NumberOfEmployees': ('INT', 8),
+            'AnnualRevenue': ('CURRENCY', 18),
+            'OwnerId': ('ID', 7),
+            'IsConverted': ('BOOLEAN', 1),
+            'ConvertedDate': ('DATE', 10),
+            'ConvertedAccountId': ('ID', 11),
+            'ConvertedContactId': ('ID', 11),
+            'ConvertedOpportunityId': ('ID', 11),
+            'CreatedDate': ('DATETIME', 19),
+            'LastModifiedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+    'Campaign': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 8),
+            'Name': ('STRING', 80),
+            'Type': ('PICKLIST', 40),
+            'Status': ('PICKLIST', 40),
+            'StartDate': ('DATE', 10),
+            'EndDate': ('DATE', 10),
+            'BudgetedCost': ('CURRENCY', 18),
+            'ActualCost': ('CURRENCY', 18),
+            'ExpectedRevenue': ('CURRENCY', 18),
+            'ExpectedResponse': ('DOUBLE', 8),
+            'NumberSent': ('INT', 8),
+            'NumberOfResponses': ('INT', 8),
+            'NumberOfLeads': ('INT', 8),
+            'NumberOfConvertedLeads': ('INT', 8),
+            'NumberOfOpportunities': ('INT', 8),
+            'IsActive': ('BOOLEAN', 1),
+            'Description': ('STRING', 32000),
+            'OwnerId': ('ID', 7),
+            'CreatedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+    'Opportunity': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 11),
+            'AccountId': ('ID', 11),
+            'Name': ('STRING', 120),
+            'StageName': ('PICKLIST', 40),
+            'Probability': ('DOUBLE', 3),
+            'Amount': ('CURRENCY', 18),
+            'CloseDate': ('DATE', 10),
+            'Type': ('PICKLIST', 40),
+            'LeadSource': ('PICKLIST', 40),
+            'NextStep': ('STRING', 255),
+            'IsClosed': ('BOOLEAN', 1),
+            'IsWon': ('BOOLEAN', 1),
+            'ForecastCategory': ('PICKLIST', 40),
+            'ForecastCategoryName': ('PICKLIST', 40),
+            'CampaignId': ('ID', 8),
+            'HasOpportunityLineItem': ('BOOLEAN', 1),
+            'OwnerId': ('ID', 7),
+            'CreatedDate': ('DATETIME', 19),
+            'LastModifiedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+    'OpportunityLineItem': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 11),
+            'OpportunityId': ('ID', 11),
+            'Product2Id': ('PICKLIST', 18),
+            'ProductCode': ('PICKLIST', 255),
+            'Name': ('PICKLIST', 255),
+            'Quantity': ('DOUBLE', 10),
+            'ListPrice': ('CURRENCY', 18),
+            'UnitPrice': ('CURRENCY', 18),
+            'Discount': ('DOUBLE', 5),
+            'TotalPrice': ('CURRENCY', 18),
+            'Description': ('STRING', 255),
+            'ServiceDate': ('DATE', 10),
+            'CreatedDate': ('DATETIME', 19),
+            'LastModifiedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+    'Case': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 11),
+            'CaseNumber': ('STRING', 30),
+            'AccountId': ('ID', 11),
+            'ContactId': ('ID', 11),
+            'Status': ('PICKLIST', 40),
+            'Priority': ('PICKLIST', 40),
+            'Type': ('PICKLIST', 40),
+            'Origin': ('PICKLIST', 40),
+            'Subject': ('STRING', 255),
+            'Description': ('STRING', 32000),
+            'IsClosed': ('BOOLEAN', 1),
+            'IsEscalated': ('BOOLEAN', 1),
+            'ClosedDate': ('DATETIME', 19),
+            'OwnerId': ('ID', 7),
+            'CreatedDate': ('DATETIME', 19),
+            'LastModifiedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+    'Activity': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 11),
+            'WhoId': ('ID', 11),
+            'WhatId': ('ID', 11),
+            'Subject': ('PICKLIST', 255),
+            'ActivityDate': ('DATE', 10),
+            'Status': ('PICKLIST', 40),
+            'Priority': ('PICKLIST', 40),
+            'Description': ('STRING', 32000),
+            'IsClosed': ('BOOLEAN', 1),
+            'OwnerId': ('ID', 7),
+            'CreatedDate': ('DATETIME', 19),
+            'LastModifiedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+    'Quote': {
+        'primary_key': ['Id'],
+        'columns': {
+            'Id': ('ID', 11),
+            'QuoteNumber': ('STRING', 30),
+            'OpportunityId': ('ID', 11),
+            'AccountId': ('ID', 11),
+            'Name': ('STRING', 255),
+            'Status': ('PICKLIST', 40),
+            'ExpirationDate': ('DATE', 10),
+            'Subtotal': ('CURRENCY', 18),
+            'Discount': ('CURRENCY', 18),
+            'TotalPrice': ('CURRENCY', 18),
+            'Tax': ('CURRENCY', 18),
+            'GrandTotal': ('CURRENCY', 18),
+            'ShippingHandling': ('CURRENCY', 18),
+            'Description': ('STRING', 32000),
+            'IsSyncing': ('BOOLEAN', 1),
+            'OwnerId': ('ID', 7),
+            'CreatedDate': ('DATETIME', 19),
+            'LastModifiedDate': ('DATETIME', 19),
+            'IsDeleted': ('BOOLEAN', 1),
+        },
+    },
+
+    # ==================== CROSS-REFERENCE & ANALYTICAL VIEWS ====================
+    'Account_Customer_XREF': {
+        'primary_key': ['CRM_AccountId'],
+        'columns': _ACCOUNT_XREF_COLUMNS,
+    },
+    'Opportunity_Order_XREF': {
+        'primary_key': ['CRM_OpportunityId'],
+        'columns': _OPPORTUNITY_XREF_COLUMNS,
+    },
+    'Contact_Partner_XREF': {
+        'primary_key': ['CRM_ContactId'],
+        'columns': {
+            'CRM_ContactId': ('ID', 11),
+            'CRM_FirstName': ('STRING', 40),
+            'CRM_LastName': ('STRING', 80),
+            'CRM_Email': ('STRING', 80),
+            'CRM_Title': ('PICKLIST', 128),
+            'CRM_AccountId': ('ID', 11),
+            'SAP_KUNNR': ('CHAR', 10),
+            'SAP_VKORG': ('CHAR', 4),
+            'SAP_VTWEG': ('CHAR', 2),
+            'SAP_SPART': ('CHAR', 2),
+            'SAP_PARVW': ('CHAR', 2),
+            'SAP_KUNN2': ('CHAR', 10),
+            'PartnerFunction': ('PICKLIST', 40),
+            'CreatedDate': ('DATETIME', 19),
+        },
+    },
+    'Quote_Order_XREF': {
+        'primary_key': ['CRM_QuoteId'],
+        'columns': _QUOTE_XREF_COLUMNS,
+    },
+    'Customer_360_View': {
+        'primary_key': ['CRM_AccountId'],
+        'columns': {
+            **{name if name != 'CreatedDate' else 'CreatedDate_x': spec
+               for name, spec in _ACCOUNT_XREF_COLUMNS.items()},
+            **{name if name != 'CreatedDate' else 'CreatedDate_y': spec
+               for name, spec in _ACCOUNT_COLUMNS.items()},
+            'TotalOrders': ('INT', 8),
+            'TotalRevenue': ('CURR', 15),
+            'FirstOrderDate': ('DATS', 8),
+            'LastOrderDate': ('DATS', 8),
+        },
+    },
+    'Opportunity_Order_Analysis': {
+        'primary_key': ['CRM_OpportunityId'],
+        'columns': {
+            **_OPPORTUNITY_XREF_COLUMNS,
+            'AmountMatch': ('BOOLEAN', 1),
+            'TimelyClosure': ('BOOLEAN', 1),
+        },
+    },
+    'Quote_to_Cash_View': {
+        'primary_key': ['CRM_QuoteId'],
+        'columns': {
+            **{name if name != 'CreatedDate' else 'CreatedDate_x': spec
+               for name, spec in _QUOTE_XREF_COLUMNS.items()},
+            'Id': ('ID', 11),
+            'QuoteNumber': ('STRING', 30),
+            'OpportunityId': ('ID', 11),
+            'CreatedDate_y': ('DATETIME', 19),
+            'ExpirationDate': ('DATE', 10),
+        },
+    },
+}
+
+
+# ==================== REGISTRY LOOKUPS ====================
+
+def table_name_for_path(path):
+    """Derive the registry table name from a file path (KNA1.csv → KNA1)"""
+    return Path(path).stem
+
+
+def has_schema(table_name):
+    """Check whether a table is covered by the registry"""
+    return table_name in TABLE_SCHEMAS
+
+
+def get_columns(table_name):
+    """Column specs {name: (type, length)} for a table"""
+    return TABLE_SCHEMAS[table_name]['columns']
+
+
+def get_primary_key(table_name):
+    """Primary key columns for a table"""
+    return TABLE_SCHEMAS[table_name]['primary_key']
+
+
+def arrow_type(column_type, length):
+    """Arrow type for a single column spec"""
+    if column_type in ('CHAR', 'NUMC') and length <= CODE_MAX_LENGTH:
+        return DICTIONARY
+    return ARROW_TYPES[column_type]
+
+
+def arrow_schema(table_name, columns=None):
+    """Arrow schema for a table, optionally projected to a column subset"""
+    specs = get_columns(table_name)
+    names = columns if columns is not None else list(specs)
+    return pa.schema([
+        pa.field(name, arrow_type(*specs[name])) for name in names if name in specs
+    ])
+
+
+def dictionary_columns(table_name):
+    """Columns stored dictionary encoded (codes, currencies, units, picklists)"""
+    return [f.name for f in arrow_schema(table_name) if pa.types.is_dictionary(f.type)]
+
+
+def _is_padded(column_name, column_type, length):
+    """Whether numeric values of a column are stored zero padded to full length"""
+    if column_type in ('NUMC', 'ID'):
+        return True
+    if column_type == 'CHAR':
+        base_name = column_name[4:] if column_name.startswith('SAP_') else column_name
+        return base_name in ALPHA_FIELDS or length <= CODE_MAX_LENGTH
+    return False
+
+
+# ==================== TYPE CONFORMANCE ====================
+
+def _as_text(array):
+    """Render any array as strings, dropping the '.0' that pandas adds to float keys"""
+    if array.type != pa.string():
+        array = array.cast(pa.string())
+    return pc.replace_substring_regex(array, pattern=r'^(-?[0-9]+)\.0+$', replacement=r'\1')
+
+
+def _blank_to_null(array):
+    """Treat empty strings as missing values"""
+    return pc.if_else(pc.equal(array, ''), pa.scalar(None, pa.string()), array)
+
+
+def _alpha_pad(array, length):
+    """SAP ALPHA conversion: left-pad purely numeric values with zeros"""
+    digits = pc.match_substring_regex(array, pattern=r'^[0-9]+$')
+    padded = pc.utf8_lpad(array, width=length, padding='0')
+    return pc.if_else(digits, padded, array)
+
+
+def _parse_dates(array, formats):
+    """Parse date strings trying each format in turn (unparseable → null)"""
+    text = _blank_to_null(_as_text(array))
+    parsed = None
+    for fmt in formats:
+        attempt = pc.strptime(text, format=fmt, unit='s', error_is_null=True)
+        parsed = attempt if parsed is None else pc.coalesce(parsed, attempt)
+    return parsed
+
+
+def _parse_sap_time(array):
+    """Parse SAP TIMS values (HHMMSS, leading zero possibly lost) to time32[s]"""
+    text = _blank_to_null(_as_text(array))
+    text = pc.utf8_lpad(text, width=6, padding='0')
+    hours = pc.utf8_slice_codeunits(text, 0, 2).cast(pa.int32())
+    minutes = pc.utf8_slice_codeunits(text, 2, 4).cast(pa.int32())
+    seconds = pc.utf8_slice_codeunits(text, 4, 6).cast(pa.int32())
+    total = pc.add(pc.add(pc.multiply(hours, 3600), pc.multiply(minutes, 60)), seconds)
+    return total.cast(pa.int32()).cast(pa.time32('s'))
+
+
+def _parse_boolean(array):
+    """Parse 'True'/'False' style flags to booleans"""
+    if pa.types.is_boolean(array.type):
+        return array
+    text = _blank_to_null(pc.utf8_lower(_as_text(array)))
+    truthy = pc.is_in(text, value_set=pa.array(['true', '1', 't', 'yes']))
+    return pc.if_else(pc.is_null(text), pa.scalar(None, pa.bool_()), truthy)
+
+
+def conform_column(array, column_name, column_type, length):
+    """Cast one column (from CSV strings, legacy Parquet or pandas) to its registry type"""
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks() if array.num_chunks != 1 else array.chunk(0)
+    target = arrow_type(column_type, length)
+
+    if column_type in SAP_TEXT_TYPES or column_type in CRM_TEXT_TYPES:
+        text = _as_text(array)
+        if _is_padded(column_name, column_type, length):
+            text = _alpha_pad(text, length)
+        # SAP has no NULL for character fields (blank = ''); Salesforce does
+        text = text.fill_null('') if column_type in SAP_TEXT_TYPES else _blank_to_null(text)
+        return text.dictionary_encode() if pa.types.is_dictionary(target) else text
+
+    if array.type == target:
+        return array
+
+    if column_type == 'DATS':
+        if pa.types.is_temporal(array.type):
+            return array.cast(pa.timestamp('s')).cast(pa.date32())
+        return _parse_dates(array, ['%Y%m%d', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S']).cast(pa.date32())
+    if column_type == 'DATE':
+        if pa.types.is_temporal(array.type):
+            return array.cast(pa.timestamp('s')).cast(pa.date32())
+        return _parse_dates(array, ['%Y-%m-%d', '%Y%m%d']).cast(pa.date32())
+    if column_type == 'DATETIME':
+        if pa.types.is_temporal(array.type):
+            return array.cast(target)
+        return _parse_dates(array, ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'])
+    if column_type == 'TIMS':
+        # Parquet has no time32[s]; typed files read back as time32[ms]
+        if pa.types.is_time(array.type):
+            return array.cast(target)
+        return _parse_sap_time(array)
+    if column_type == 'BOOLEAN':
+        return _parse_boolean(array)
+    if column_type in FLOAT_TYPES or column_type in INT_TYPES:
+        if pa.types.is_string(array.type) or pa.types.is_dictionary(array.type):
+            array = _blank_to_null(_as_text(array)).cast(pa.float64())
+        if column_type in INT_TYPES:
+            array = array.cast(pa.float64()).cast(target, safe=False)
+        return array.cast(target)
+
+    return array.cast(target)
+
+
+def conform_table(table, table_name=None):
+    """Cast every registry column of an Arrow table to its exact type"""
+    if table_name is None or not has_schema(table_name):
+        return table
+    specs = get_columns(table_name)
+    arrays = []
+    fields = []
+    for field, column in zip(table.schema, table.columns):
+        if field.name in specs:
+            column = conform_column(column, field.name, *specs[field.name])
+        fields.append(pa.field(field.name, column.type))
+        arrays.append(column)
+    metadata = {b'sap_schema_version': str(SCHEMA_VERSION).encode()}
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=metadata))
+
+
+# ==================== READERS & WRITERS ====================
+
+def read_csv_table(csv_path, table_name=None, columns=None):
+    """Read a CSV file into an Arrow table typed by the registry"""
+    table_name = table_name or table_name_for_path(csv_path)
+    convert_options = pv.ConvertOptions(strings_can_be_null=False, include_columns=columns)
+    if has_schema(table_name):
+        # Read registry columns as raw text so zero padding survives, then conform
+        convert_options = pv.ConvertOptions(
+            column_types={name: pa.string() for name in get_columns(table_name)},
+            strings_can_be_null=False,
+            include_columns=columns,
+        )
+    table = pv.read_csv(csv_path, convert_options=convert_options)
+    return conform_table(table, table_name)
+
+
+def lookup_columns(table_name):
+    """Registry columns of a table that point lookups filter on"""
+    if not has_schema(table_name):
+        return []
+    return [name for name in get_columns(table_name) if name in LOOKUP_FIELDS]
+
+
+def key_index_options(table_name, num_rows, row_group_size=None):
+    """Parquet writer options for page indexes plus Bloom filters on the lookup columns"""
+    columns = lookup_columns(table_name)
+    if not SUPPORTS_KEY_INDEXES or not columns:
+        return {}
+    # Bloom filters are sized per row group: NDV is at most the rows in one group
+    ndv = max(1, min(num_rows, row_group_size or num_rows))
+    return {
+        'write_page_index': True,
+        'bloom_filter_options': {name: {'ndv': ndv, 'fpp': BLOOM_FILTER_FPP} for name in columns},
+    }
+
+
+def iter_table_batches(path, table_name=None, batch_rows=250_000, columns=None, row_groups=None, conform=True):
+    """Stream a CSV or Parquet file as typed Arrow tables of about batch_rows rows
+
+    row_groups limits a Parquet file to some of its row groups (parallel readers);
+    conform=False yields the stored values, for callers that conform a subset.
+    """
+    table_name = table_name or table_name_for_path(path)
+    finish = (lambda table: conform_table(table, table_name)) if conform else (lambda table: table)
+    if str(path).endswith('.parquet'):
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns, row_groups=row_groups):
+            yield finish(pa.Table.from_batches([batch]))
+        return
+
+    column_types = {name: pa.string() for name in get_columns(table_name)} if has_schema(table_name) else {}
+    reader = pv.open_csv(
+        path,
+        # ~100 bytes per CSV row keeps blocks near batch_rows
+        read_options=pv.ReadOptions(block_size=max(batch_rows * 100, 1 << 20)),
+        convert_options=pv.ConvertOptions(column_types=column_types, strings_can_be_null=False,
+                                          include_columns=columns),
+    )
+    for batch in reader:
+        yield finish(pa.Table.from_batches([batch]))
+
+
+def read_parquet_table(parquet_path, table_name=None, columns=None, filters=None):
+    """Read a Parquet file/dataset, conforming files written before the registry existed"""
+    table_name = table_name or table_name_for_path(parquet_path)
+    table = pq.read_table(parquet_path, columns=columns, filters=filters)
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'sap_schema_version') == str(SCHEMA_VERSION).encode():
+        return table
+    return conform_table(table, table_name)
+
+
+def ipc_path_for(path):
+    """Arrow IPC copy of a table file (VBAK.csv → VBAK.arrow)"""
+    return os.path.splitext(str(path))[0] + '.arrow'
+
+
+def read_ipc_table(ipc_path, table_name=None, columns=None):
+    """Memory-map an Arrow IPC file (uncompressed buffers are used in place, not copied)"""
+    table_name = table_name or table_name_for_path(ipc_path)
+    # The table's buffers keep the mapping alive; pages are shared via the OS page cache
+    source = pa.memory_map(str(ipc_path), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    if columns:
+        table = table.select(columns)
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'sap_schema_version') == str(SCHEMA_VERSION).encode():
+        return table
+    return conform_table(table, table_name)
+
+
+def file_columns(path):
+    """Column names of a CSV, Parquet or Arrow IPC file without reading its data"""
+    path = fresh_ipc_copy(path) or str(path)
+    if path.endswith('.arrow'):
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).schema.names
+    if path.endswith('.parquet') or os.path.isdir(path):
+        return pq.ParquetDataset(path).schema.names if os.path.isdir(path) else pq.read_schema(path).names
+    with open(path, encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+
+def bytes_to_read(path, columns=None, row_groups=None):
+    """Bytes a read of the given columns touches (Parquet: compressed column chunks; else the file)
+
+    row_groups limits a Parquet file to some of its row groups (as in iter_table_batches).
+    """
+    path = str(path) if row_groups is not None else (fresh_ipc_copy(path) or str(path))
+    if not path.endswith('.parquet') or (not columns and row_groups is None):
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+    metadata = pq.read_metadata(path)
+    wanted = set(columns) if columns else None
+    return sum(
+        chunk.total_compressed_size
+        for rg in (range(metadata.num_row_groups) if row_groups is None else row_groups)
+        for chunk in (metadata.row_group(rg).column(i) for i in range(metadata.num_columns))
+        if wanted is None or chunk.path_in_schema in wanted
+    )
+
+
+def fresh_ipc_copy(path):
+    """IPC copy of a CSV/Parquet file if one exists and is at least as new as the file"""
+    ipc_path = ipc_path_for(path)
+    if str(path).endswith('.arrow') or os.path.isdir(path) or not os.path.exists(ipc_path):
+        return None
+    if os.path.getmtime(ipc_path) < os.path.getmtime(path):
+        return None
+    return ipc_path
+
+
+def read_table(path, table_name=None, columns=None):
+    """Read a CSV, Parquet or Arrow IPC file into a typed Arrow table (IPC copy preferred)"""
+    table_name = table_name or table_name_for_path(path)
+    ipc_path = fresh_ipc_copy(path)
+    if ipc_path or str(path).endswith('.arrow'):
+        return read_ipc_table(ipc_path or path, table_name, columns)
+    if str(path).endswith('.parquet') or os.path.isdir(path):
+        return read_parquet_table(path, table_name, columns)
+    return read_csv_table(path, table_name, columns)
+
+
+def to_pandas(table):
+    """Convert a typed Arrow table to pandas (dates → datetime64, codes → categorical)"""
+    return table.to_pandas(date_as_object=False)
+
+
+def read_table_pandas(path, table_name=None, columns=None):
+    """Read a CSV, Parquet or Arrow IPC file into a typed pandas DataFrame"""
+    return to_pandas(read_table(path, table_name, columns))
+
+
+def write_parquet(table, parquet_path, table_name=None, compression='snappy', **kwargs):
+    """Write an Arrow table or DataFrame to Parquet using the registry types"""
+    table_name = table_name or table_name_for_path(parquet_path)
+    if isinstance(table, pd.DataFrame):
+        table = pa.Table.from_pandas(table, preserve_index=False)
+    table = conform_table(table, table_name)
+    pq.write_table(table, parquet_path, compression=compression, **kwargs)
+    return table
+
+
+def write_ipc(table, ipc_path, table_name=None, compression=None):
+    """Write an Arrow IPC (Feather v2) file; uncompressed files can be memory-mapped zero-copy"""
+    table_name = table_name or table_name_for_path(ipc_path)
+    if isinstance(table, pd.DataFrame):
+        table = pa.Table.from_pandas(table, preserve_index=False)
+    # The IPC file format needs one dictionary per column across all batches
+    table = conform_table(table, table_name).combine_chunks().unify_dictionaries()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    tmp_path = str(ipc_path) + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, ipc_path)
+    return table
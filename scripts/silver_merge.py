@@ -0,0 +1,383 @@
+"""
+Batched CDC Upsert (MERGE) into Silver SAP Tables
+Applies change batches (inserts, updates, deletes keyed on the SAP primary
+key) to the partitioned silver Parquet tables without rebuilding them
+
+A change batch is a CSV or Parquet file with the table's columns plus the ODP
+change mode column ODQ_CHANGEMODE: C (create), U (update) or D (delete; key
+columns suffice). Within a batch the last change of a key wins; creates and
+updates are upserts.
+
+Merge
+1. Changes are typed, conformed like the silver build and given surrogate ids;
+   their keys are packed to sorted int64s (joined strings when not numeric).
+2. Each silver file's key columns are read and merge-joined against the
+   sorted change keys (binary search); files without a hit are left alone.
+3. Hit files are rewritten without the changed/deleted rows, plus the new
+   versions of updated rows that stay in the file's partition, re-sorted by
+   the clustering key.
+4. New rows, and updated rows whose ERDAT month changed, go to new files in
+   their partitions.
+Rewritten and new files are written into a staged copy of the table
+(untouched files hard-linked) that replaces the table directory in one swap,
+so a reader never sees a moved row deleted before its new file exists.
+Every batch appends a record (counts, files, touched partitions) to the
+merge log.
+"""
+
+import os
+import glob
+import json
+import shutil
+import argparse
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from sap_schema import conform_table, get_columns, get_primary_key, read_table
+from data_catalog import catalog, locate, read_cache
+from build_silver import COMPRESSION, SILVER_DIR, SilverBuilder, conform_currencies, conform_dates
+from foreign_keys import KEY_SEPARATOR, contains, encode_keys, key_widths
+from key_encoding import KeyEncoder
+from parquet_dataset import (
+    MONTH_COLUMN, add_month_column, cluster_columns, has_layout, sort_table, swap_directory,
+    write_partition_files,
+)
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+MERGE_LOG_PATH = os.path.join(SILVER_DIR, '_merge_log.jsonl')
+CHANGES_DIR = os.path.join(SILVER_DIR, '_changes')
+
+# ODP change modes
+CHANGE_MODE = 'ODQ_CHANGEMODE'
+CREATE, UPDATE, DELETE = 'C', 'U', 'D'
+
+# Simulated daily changes
+STATUS_STEPS = {'C': 'B', 'B': 'A'}  # not processed → partially → completely processed
+# Processing-status fields a daily change advances (rejection, credit and incompletion statuses stay)
+PROCESSING_STATUS = {
+    'VBUK': ['LFSTK', 'FKSTK', 'GBSTK', 'LFGSK', 'FKIVK'],
+    'VBUP': ['LFSTA', 'FKSTA', 'GBSTA', 'LFGSA', 'WBSTA'],
+}
+SIMULATE_FRACTION = 0.01
+SIMULATE_SEED = 42
+
+
+# ==================== KEYS ====================
+
+def packed_keys(table, table_name, columns):
+    """Primary key per row as packed int64 (None when some key part is not purely digits)"""
+    _, numeric, ints, _ = encode_keys(table, columns, key_widths(table_name, columns))
+    return ints if numeric.all() else None
+
+
+def string_keys(table, columns):
+    """Primary key per row as joined strings"""
+    arrays = [pc.cast(table.column(c), pa.string()) for c in columns]
+    joined = pc.binary_join_element_wise(*arrays, KEY_SEPARATOR)
+    return np.asarray(joined.to_numpy(zero_copy_only=False), dtype=object)
+
+
+def table_files(table_dir):
+    """[(file, partition value)] of a silver table (partition None when not partitioned)"""
+    files = []
+    for path in sorted(glob.glob(os.path.join(table_dir, '**', '*.parquet'), recursive=True)):
+        parts = [p for p in os.path.relpath(path, table_dir).split(os.sep)[:-1]]
+        if any('.__' in p or p.startswith(('_', '.')) for p in parts):
+            continue
+        partition = dict(p.split('=', 1) for p in parts if '=' in p).get(MONTH_COLUMN)
+        files.append((path, partition))
+    return files
+
+
+def stage_table(table_dir, staging):
+    """Hard-link every file of a table into a staging directory (copied where links are unsupported)"""
+    shutil.rmtree(staging, ignore_errors=True)
+    for root, _, names in os.walk(table_dir):
+        target_dir = os.path.join(staging, os.path.relpath(root, table_dir))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in names:
+            try:
+                os.link(os.path.join(root, name), os.path.join(target_dir, name))
+            except OSError:
+                shutil.copy2(os.path.join(root, name), os.path.join(target_dir, name))
+
+
+# ==================== MERGE ====================
+
+class SilverMerger:
+    """Apply change batches to one silver table"""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.primary_key = get_primary_key(table_name)
+        catalog('silver', refresh=True)
+        self.table_dir = locate(table_name, 'silver')
+        if self.table_dir is None:
+            raise FileNotFoundError(f"silver {table_name} not built (run scripts/build_silver.py {table_name})")
+        self.keys = KeyEncoder()
+        self.packed = True
+
+    def row_keys(self, table):
+        """Primary key per row in the merge's key form (packed int64, or joined strings)"""
+        if self.packed:
+            return packed_keys(table, self.table_name, self.primary_key)
+        return string_keys(table, self.primary_key)
+
+    def load_changes(self, path):
+        """Typed change batch with its change modes, one (the last) change per key"""
+        table = read_table(path, self.table_name)
+        modes = pc.utf8_upper(pc.cast(table.column(CHANGE_MODE), pa.string())).to_numpy(zero_copy_only=False)
+        unknown = set(modes) - {CREATE, UPDATE, DELETE}
+        if unknown:
+            raise ValueError(f"{path}: unknown {CHANGE_MODE} value(s) {sorted(unknown)}")
+        table = table.drop([CHANGE_MODE])
+
+        keys = packed_keys(table, self.table_name, self.primary_key)
+        keys = keys if keys is not None else string_keys(table, self.primary_key)
+        # Last occurrence of each key: first occurrence in the reversed batch
+        _, first_reversed = np.unique(keys[::-1], return_index=True)
+        latest = np.sort(len(keys) - 1 - first_reversed)
+        return table.take(pa.array(latest)), modes[latest]
+
+    def silver_rows(self, table, schema):
+        """Upsert rows in the silver form: conformed, surrogate ids, file column order"""
+        if table.num_rows == 0:
+            return schema.empty_table()
+        table = conform_currencies(conform_dates(table, self.table_name), self.table_name)
+        table = self.keys.add_surrogates(table, extend=True)
+        missing = [f.name for f in schema if f.name not in table.column_names]
+        if missing:
+            raise ValueError(f"upsert rows lack silver columns: {', '.join(missing)}")
+        return pa.Table.from_arrays([table.column(f.name).cast(f.type) for f in schema], schema=schema)
+
+    def merge(self, path, batch_id=None):
+        """Apply one change batch; the merge log record"""
+        started = time.perf_counter()
+        batch_id = batch_id or datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        changes, modes = self.load_changes(path)
+        files = table_files(self.table_dir)
+        schema = pq.read_schema(files[0][0])
+        schema = pa.schema([f for f in schema if f.name != MONTH_COLUMN], metadata=schema.metadata)
+
+        upserts = self.silver_rows(changes.filter(pa.array(modes != DELETE)), schema)
+        deletes = changes.filter(pa.array(modes == DELETE))
+        months = (add_month_column(upserts, self.table_name).column(MONTH_COLUMN).to_numpy(zero_copy_only=False)
+                  if has_layout(self.table_name) else np.full(upserts.num_rows, None, dtype=object))
+
+        # Digits-only keys merge as packed integers, anything else as joined strings
+        self.packed = True
+        upsert_keys, delete_keys = self.row_keys(upserts), self.row_keys(deletes)
+        if upsert_keys is None or delete_keys is None:
+            self.packed = False
+            upsert_keys, delete_keys = self.row_keys(upserts), self.row_keys(deletes)
+        changed = np.unique(np.concatenate([upsert_keys, delete_keys]))
+
+        record = {'batch_id': batch_id, 'table': self.table_name, 'source': os.path.relpath(path, PROJECT_ROOT),
+                  'changes': len(modes), 'inserted': 0, 'updated': 0, 'deleted': 0, 'deletes_not_found': 0,
+                  'files_scanned': len(files), 'files_rewritten': 0, 'files_added': 0, 'partitions': []}
+        placed = np.zeros(upserts.num_rows, dtype=bool)
+        found_upserts = np.zeros(upserts.num_rows, dtype=bool)
+        found_deletes = np.zeros(deletes.num_rows, dtype=bool)
+        touched = set()
+        staging = self.table_dir + '.__merge__'
+        stage_table(self.table_dir, staging)
+
+        for file_path, partition in files:
+            file_keys = self.row_keys(pq.read_table(file_path, columns=self.primary_key))
+            if file_keys is None:
+                raise ValueError(f"{file_path}: non-numeric keys in a numeric-key merge")
+            hit = contains(changed, file_keys)
+            if not hit.any():
+                continue
+
+            sorted_file_keys = np.sort(file_keys)
+            in_file = contains(sorted_file_keys, upsert_keys)
+            found_upserts |= in_file
+            found_deletes |= contains(sorted_file_keys, delete_keys)
+            stays = in_file & ~placed & (months == partition)
+            placed |= stays
+
+            table = pq.read_table(file_path).filter(pa.array(~hit))
+            table = pa.concat_tables([table, upserts.filter(pa.array(stays))])
+            table = sort_table(table, [c for c in cluster_columns(self.table_name) if c in table.column_names])
+            # The staged path is a hard link to the original: unlink it rather than write through it
+            staged_path = os.path.join(staging, os.path.relpath(file_path, self.table_dir))
+            os.remove(staged_path)
+            pq.write_table(table.replace_schema_metadata(schema.metadata), staged_path, compression=COMPRESSION)
+            record['files_rewritten'] += 1
+            touched.add(partition)
+
+        # New keys and rows that moved partition go to new files
+        inserts = upserts.filter(pa.array(~placed))
+        if inserts.num_rows:
+            record['files_added'], partitions = self.write_new_files(inserts, batch_id, staging)
+            touched.update(partitions)
+
+        # Rewritten and new files replace the table together
+        if touched:
+            swap_directory(staging, self.table_dir)
+        else:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.keys.save()
+        read_cache.clear()
+        record.update({
+            'inserted': int((~found_upserts).sum()),
+            'updated': int(found_upserts.sum()),
+            'deleted': int(found_deletes.sum()),
+            'deletes_not_found': int((~found_deletes).sum()),
+            'partitions': sorted(p or '' for p in touched),
+            'seconds': round(time.perf_counter() - started, 3),
+        })
+        self.log(record)
+        return record
+
+    def write_new_files(self, table, batch_id, staging):
+        """Write rows as new files into the staged table; (files, partitions)"""
+        if has_layout(self.table_name):
+            files, partitions = write_partition_files(table, self.table_name, staging, compression=COMPRESSION,
+                                                      file_prefix=f'merge-{batch_id}')
+            partitions = {os.path.basename(p).split('=', 1)[1] for p in partitions}
+        else:
+            files = [os.path.join(staging, f'merge-{batch_id}.parquet')]
+            pq.write_table(sort_table(table, cluster_columns(self.table_name)), files[0], compression=COMPRESSION)
+            partitions = {None}
+        return len(files), partitions
+
+    def log(self, record):
+        with open(MERGE_LOG_PATH, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def print_record(r):
+    missing = f" ({r['deletes_not_found']:,} deletes not found)" if r['deletes_not_found'] else ''
+    print(f"  ✓ {r['table']:5s} batch {r['batch_id']}: {r['changes']:,} changes → "
+          f"{r['inserted']:,} inserted, {r['updated']:,} updated, {r['deleted']:,} deleted{missing}")
+    print(f"      {r['files_rewritten']} of {r['files_scanned']} files rewritten, {r['files_added']} added, "
+          f"partitions: {', '.join(p or '(unpartitioned)' for p in r['partitions']) or 'none'} "
+          f"in {r['seconds']:.2f}s")
+
+
+# ==================== SIMULATED CHANGES ====================
+
+def simulate_changes(table_name, fraction=SIMULATE_FRACTION, seed=SIMULATE_SEED):
+    """A daily change batch for a silver table: updates, status moves, some creates and deletes
+
+    Updated rows get today's AEDAT, amounts move by up to ±10% and status
+    codes advance one step (A → B → C); creates copy rows under new document
+    numbers created today. Written to data/silver/_changes/<TABLE>/.
+    """
+    rng = np.random.default_rng(seed)
+    silver = read_table(locate(table_name, 'silver'), table_name)
+    columns = [c for c in get_columns(table_name) if c in silver.column_names]
+    silver = silver.select(columns)
+    n = silver.num_rows
+    today = date.today()
+
+    picks = rng.permutation(n)
+    n_update = max(1, int(n * fraction))
+    n_delete = max(1, n_update // 20)
+    n_create = max(1, n_update // 5)
+    updates = silver.take(pa.array(picks[:n_update])).to_pandas()
+    deletes = silver.take(pa.array(picks[n_update:n_update + n_delete])).select(get_primary_key(table_name))
+    creates = silver.take(pa.array(picks[n_update + n_delete:n_update + n_delete + n_create])).to_pandas()
+
+    specs = get_columns(table_name)
+    for name, (column_type, _) in specs.items():
+        if name not in updates.columns:
+            continue
+        if name == 'AEDAT':
+            updates[name] = today
+        elif column_type == 'CURR':
+            updates[name] = (updates[name] * rng.uniform(0.9, 1.1, len(updates))).round(2)
+        elif name in PROCESSING_STATUS.get(table_name, ()):
+            updates[name] = updates[name].astype(str).replace(STATUS_STEPS)
+
+    # New documents numbered after the highest existing one
+    last = int(pc.max(pc.cast(silver.column('VBELN'), pa.int64())).as_py())
+    documents = {v: f'{last + i + 1:010d}' for i, v in enumerate(creates['VBELN'].unique())}
+    creates['VBELN'] = creates['VBELN'].map(documents)
+    for name in ('ERDAT', 'AUDAT'):
+        if name in creates.columns:
+            creates[name] = today
+    if 'AEDAT' in creates.columns:
+        creates['AEDAT'] = None
+
+    parts = []
+    for frame, mode in ((creates, CREATE), (updates, UPDATE)):
+        table = conform_table(pa.Table.from_pandas(frame, preserve_index=False), table_name)
+        parts.append(table.append_column(CHANGE_MODE, pa.array([mode] * table.num_rows)))
+    parts.append(deletes.append_column(CHANGE_MODE, pa.array([DELETE] * deletes.num_rows)))
+    batch = pa.concat_tables(parts, promote_options='default')
+
+    out_dir = os.path.join(CHANGES_DIR, table_name)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{table_name}-{datetime.now().strftime('%Y%m%dT%H%M%S')}.parquet")
+    pq.write_table(batch, path)
+    return path
+
+
+def benchmark(table_name, fraction=SIMULATE_FRACTION):
+    """Time a simulated daily batch merge against a full silver rebuild of the table"""
+    path = simulate_changes(table_name, fraction)
+    record = SilverMerger(table_name).merge(path)
+    print_record(record)
+    builder = SilverBuilder()
+    start = time.perf_counter()
+    builder.build_all([table_name])
+    rebuild = time.perf_counter() - start
+    print("\n" + "="*80)
+    print(f"MERGE VS REBUILD ({table_name})")
+    print("="*80)
+    print(f"  Merge of {record['changes']:,} changes: {record['seconds']:.2f}s "
+          f"({record['files_rewritten'] + record['files_added']} files written)")
+    print(f"  Full rebuild:        {rebuild:.2f}s ({builder.table_stats[table_name]['files']} files written)")
+    print(f"  Speedup: {rebuild / record['seconds']:.1f}x")
+    print("  (the rebuild restored the table from bronze, dropping the simulated changes)")
+
+
+# ==================== MAIN ====================
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Apply CDC change batches to silver SAP tables')
+    parser.add_argument('table', help='Silver table (VBAK, VBAP, VBEP, VBUK, VBUP, ...)')
+    parser.add_argument('batches', nargs='*', help=f'Change files (CSV/Parquet with {CHANGE_MODE}), applied in order')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Generate a daily change batch from the silver table and apply it')
+    parser.add_argument('--fraction', type=float, default=SIMULATE_FRACTION,
+                        help=f'Share of rows a simulated batch updates (default {SIMULATE_FRACTION})')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Time a simulated batch merge against a full rebuild of the table')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("SILVER CDC MERGE")
+    print("="*80)
+    print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+    if args.benchmark:
+        benchmark(args.table, args.fraction)
+        return
+
+    batches = list(args.batches)
+    if args.simulate:
+        batches.append(simulate_changes(args.table, args.fraction))
+        print(f"  Simulated batch: {os.path.relpath(batches[-1], PROJECT_ROOT)}")
+    if not batches:
+        parser.error('no change batches (pass files or --simulate)')
+
+    merger = SilverMerger(args.table)
+    for path in batches:
+        print_record(merger.merge(path))
+    print(f"\n✓ Merge log: {os.path.relpath(MERGE_LOG_PATH, PROJECT_ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Temporal Consistency Checks Across the Order-to-Cash Chain
+Vectorized date-sequence rules (delivery after order, billing after delivery,
+schedule lines after the order date) resolved through document links
+
+Dates are read once per table/column as int32 day numbers (date32 storage,
+DATS strings are parsed by the registry on read). Each rule reduces its link
+table to distinct document pairs, resolves both dates with hash joins on the
+document keys and compares day numbers with Arrow compute kernels.
+"""
+
+import os
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from sap_schema import bytes_to_read, get_primary_key, read_table
+from data_catalog import locate_tables
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+REPORT_PATH = os.path.join(PROJECT_ROOT, 'temporal_consistency_report.csv')
+
+# Configuration
+SAMPLE_ROWS = 5
+# Upper bounds (days) of the out-of-sequence buckets reported per rule
+LAG_BUCKETS = [(1, '1d'), (7, '2-7d'), (30, '8-30d'), (None, '>30d')]
+
+
+def rule(name, link, later, earlier, severity='warning'):
+    """Catalog entry: later date must not precede earlier date
+
+    later/earlier are (table, date column, link column); the link column is the
+    key in the link table that points at the table's primary key, or None when
+    the date is a column of the link table itself.
+    """
+    return {'name': name, 'link': link, 'later': later, 'earlier': earlier, 'severity': severity}
+
+
+# ==================== CATALOG ====================
+
+TEMPORAL_RULES = [
+    rule('Order → Delivery', 'LIPS', ('LIKP', 'ERDAT', 'VBELN'), ('VBAK', 'ERDAT', 'VGBEL')),
+    rule('Delivery → Billing', 'VBRP', ('VBRK', 'FKDAT', 'VBELN'), ('LIKP', 'ERDAT', 'VGBEL')),
+    rule('Order → Schedule Line', 'VBEP', ('VBEP', 'EDATU', None), ('VBAK', 'AUDAT', 'VBELN')),
+]
+
+
+def rule_name(entry):
+    """Display name of a rule (LIKP.ERDAT ≥ VBAK.ERDAT via LIPS.VBELN/VGBEL)"""
+    later, earlier = entry['later'], entry['earlier']
+    via = '/'.join(c for c in (later[2], earlier[2]) if c)
+    return f"{later[0]}.{later[1]} ≥ {earlier[0]}.{earlier[1]} via {entry['link']}.{via}"
+
+
+# ==================== CHECKER ====================
+
+def format_result(r):
+    """Report lines for one rule result"""
+    if r['status'] == 'SKIPPED':
+        return [f"  - {r['name']}: skipped ({r['message']})"]
+    lag = f"lag days p50 {r['lag_p50']}, p95 {r['lag_p95']}, max {r['lag_max']}"
+    unresolved = f" | {r['unresolved']:,} unresolved links" if r['unresolved'] else ''
+    if r['status'] == 'OK':
+        return [f"  ✓ {r['rule']}: all {r['pairs']:,} document pairs in sequence ({lag}){unresolved}"]
+    buckets = ', '.join(f"{label}: {r[f'early_{label}']:,}" for _, label in LAG_BUCKETS)
+    mark = '✗' if r['severity'] == 'error' else '⚠'
+    lines = [
+        f"  {mark} {r['rule']}: {r['violations']:,} of {r['pairs']:,} pairs out of sequence{unresolved}",
+        f"      days early: {buckets} | {lag}",
+    ]
+    return lines + [f"      e.g. {sample}" for sample in r['samples']]
+
+
+class TemporalChecker:
+    """Evaluate temporal rules with vectorized joins on int32 day numbers"""
+
+    def __init__(self, table_files=None, sample_rows=SAMPLE_ROWS):
+        self.table_files = table_files if table_files is not None else locate_tables()
+        self.sample_rows = sample_rows
+        self.day_tables = {}
+        self.results = []
+        self.lock = threading.Lock()
+        self.day_locks = {}
+        self.io = threading.local()
+
+    def day_numbers(self, table_name, column):
+        """(primary key, int32 day number) of a table's date column, read once"""
+        cache_key = (table_name, column)
+        with self.lock:
+            day_lock = self.day_locks.setdefault(cache_key, threading.Lock())
+        with day_lock:
+            if cache_key not in self.day_tables:
+                key = get_primary_key(table_name)[0]
+                self.io.bytes_read = getattr(self.io, 'bytes_read', 0) + bytes_to_read(
+                    self.table_files[table_name], [key, column])
+                table = read_table(self.table_files[table_name], table_name, columns=[key, column])
+                self.day_tables[cache_key] = pa.table({
+                    key: table.column(key),
+                    'day': pc.cast(table.column(column), pa.int32()),
+                })
+            return self.day_tables[cache_key]
+
+    def resolve(self, pairs, side, label):
+        """Add a <label>_day column to the pairs, joined through the side's link column"""
+        table_name, column, link_column = side
+        if link_column is None:
+            return pairs.append_column(f'{label}_day', pc.cast(pairs.column(column), pa.int32()))
+        days = self.day_numbers(table_name, column)
+        days = days.rename_columns([link_column, f'{label}_day'])
+        return pairs.join(days, link_column, join_type='left outer', use_threads=True)
+
+    def check(self, entry):
+        """Violation count, lag distribution and samples for one rule"""
+        later, earlier = entry['later'], entry['earlier']
+        result = {'name': entry['name'], 'rule': rule_name(entry), 'link': entry['link'],
+                  'severity': entry['severity']}
+        missing = sorted({t for t in (entry['link'], later[0], earlier[0]) if t not in self.table_files})
+        if missing:
+            result.update(status='SKIPPED', message=f"no file for {', '.join(missing)}")
+            return result
+
+        start = time.perf_counter()
+        # Distinct document pairs: one comparison per delivery/order pair, not per item
+        pair_columns = [later[2] or later[1], earlier[2] or earlier[1]]
+        self.io.bytes_read = bytes_to_read(self.table_files[entry['link']], pair_columns)
+        link = read_table(self.table_files[entry['link']], entry['link'], columns=pair_columns)
+        pairs = link.group_by(pair_columns).aggregate([([], 'count_all')])
+        pairs = pairs.rename_columns(['items' if c == 'count_all' else c for c in pairs.column_names])
+
+        pairs = self.resolve(pairs, later, 'later')
+        pairs = self.resolve(pairs, earlier, 'earlier')
+        resolved = pc.and_(pc.is_valid(pairs.column('later_day')), pc.is_valid(pairs.column('earlier_day')))
+        unresolved = pairs.num_rows - pc.sum(resolved).as_py() if pairs.num_rows else 0
+        pairs = pairs.filter(resolved)
+
+        lag = pc.subtract(pairs.column('later_day'), pairs.column('earlier_day'))
+        lag_values = lag.to_numpy()
+        violating = lag_values < 0
+        early = -lag_values[violating]
+
+        result.update({
+            'rows': link.num_rows,
+            'pairs': pairs.num_rows,
+            'unresolved': unresolved,
+            'violations': int(violating.sum()),
+            'violating_items': int(pairs.column('items').to_numpy()[violating].sum()),
+        })
+        if len(lag_values):
+            p50, p95 = np.percentile(lag_values, [50, 95])
+            result.update(lag_min=int(lag_values.min()), lag_p50=int(p50), lag_p95=int(p95),
+                          lag_max=int(lag_values.max()))
+        else:
+            result.update(lag_min=None, lag_p50=None, lag_p95=None, lag_max=None)
+
+        lower = 0
+        for upper, label in LAG_BUCKETS:
+            in_bucket = early > lower if upper is None else (early > lower) & (early <= upper)
+            result[f'early_{label}'] = int(in_bucket.sum())
+            lower = upper
+
+        samples = pairs.filter(pa.array(violating)).slice(0, self.sample_rows)
+        result['samples'] = [
+            {**{c: row[c] for c in pair_columns if c != later[1]},
+             'days_early': row['earlier_day'] - row['later_day']}
+            for row in samples.to_pylist()
+        ]
+        result['seconds'] = time.perf_counter() - start
+        result['bytes_read'] = self.io.bytes_read
+        result['status'] = 'OK' if result['violations'] == 0 else 'FAILED'
+        return result
+
+    def check_all(self, catalog=TEMPORAL_RULES):
+        """Check every rule"""
+        for entry in catalog:
+            self.results.append(self.check(entry))
+        return self.results
+
+    def save_report(self, path=REPORT_PATH):
+        """Write one row per rule"""
+        report = pd.DataFrame([
+            {k: (str(v) if k == 'samples' else v) for k, v in r.items()} for r in self.results
+        ])
+        report.to_csv(path, index=False)
+        return path
+
+
+def main():
+    """Check every temporal rule"""
+    parser = argparse.ArgumentParser(description='Order-to-cash temporal consistency check')
+    parser.add_argument('--sample-rows', type=int, default=SAMPLE_ROWS,
+                        help=f'Out-of-sequence pairs kept per rule (default {SAMPLE_ROWS})')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("TEMPORAL CONSISTENCY CHECK")
+    print("="*80)
+    checker = TemporalChecker(sample_rows=args.sample_rows)
+    start = time.perf_counter()
+    for result in checker.check_all():
+        print(f"\n{result['name']}:")
+        for line in format_result(result):
+            print(line)
+        if 'seconds' in result:
+            print(f"      {result['rows']:,} link rows in {result['seconds'] * 1000:.0f}ms")
+
+    print(f"\nRules: {len(checker.results)} | "
+          f"failed: {sum(r['status'] == 'FAILED' for r in checker.results)} | "
+          f"{time.perf_counter() - start:.2f}s")
+    print(f"\n✓ Report saved to: {os.path.basename(checker.save_report())}")
+
+
+if __name__ == "__main__":
+    main()
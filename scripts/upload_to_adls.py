@@ -0,0 +1,284 @@
+"""
+Bulk Upload of the Lake to Azure Data Lake Storage
+Uploads data/raw and data/bronze (CSV and Parquet, folder structure kept) to
+a blob container with concurrent block uploads
+
+- Files whose content hash matches the hash stored in the remote blob's
+  metadata are skipped.
+- Large files are staged as fixed-size blocks with IDs derived from the
+  content hash and block index. An interrupted upload leaves its staged
+  blocks on the service; the next run lists the uncommitted blocks and only
+  sends the missing ones before committing the block list.
+- Test locally against the Azurite emulator (--azurite): npm install -g azurite,
+  then azurite-blob --location /tmp/azurite
+
+azure-storage-blob is optional for the rest of the project: pip install azure-storage-blob
+(azure-identity for --account-url without a connection string)
+"""
+
+import os
+import sys
+import json
+import base64
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+    from azure.storage.blob import BlobBlock, BlobServiceClient, ContentSettings
+except ImportError:
+    BlobServiceClient = None
+
+from pipeline import FileHasher
+
+# Paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+UPLOAD_DIR = os.path.join(DATA_DIR, 'upload')
+STATE_PATH = os.path.join(UPLOAD_DIR, 'hash_cache.json')
+
+# Source folders (relative to data/, kept as blob name prefixes)
+SOURCES = ['raw', 'bronze']
+EXTENSIONS = ('.csv', '.parquet')
+
+# Configuration
+DEFAULT_CONTAINER = 'sap-sd-lake'
+DEFAULT_BLOCK_MB = 8
+DEFAULT_PARALLELISM = 8  # concurrent block uploads
+DEFAULT_FILE_CONCURRENCY = 4  # files hashed, checked and committed at once
+HASH_METADATA_KEY = 'blake2b'
+CONTENT_TYPES = {'.csv': 'text/csv', '.parquet': 'application/vnd.apache.parquet'}
+
+# Well-known Azurite development account (https://github.com/Azure/Azurite)
+AZURITE_CONNECTION_STRING = (
+    'DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;'
+    'AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;'
+    'BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;'
+)
+
+
+def find_files(sources=SOURCES):
+    """Relative paths (to data/) of the lake files to upload, sorted"""
+    files = []
+    for source in sources:
+        for directory, dirs, names in os.walk(os.path.join(DATA_DIR, source)):
+            # Manifests, temporary conversion/compaction directories and internal state stay local
+            dirs[:] = sorted(d for d in dirs if '.__' not in d and not d.startswith(('_', '.')))
+            files.extend(os.path.relpath(os.path.join(directory, n), DATA_DIR)
+                         for n in sorted(names) if n.endswith(EXTENSIONS) and not n.startswith(('_', '.')))
+    return files
+
+
+def block_id(content_hash, block_size, index):
+    """Block ID of a file version's block: the same content and block size resume onto the same IDs
+
+    IDs of a blob must all have the same length, so every part is fixed-width.
+    """
+    return base64.b64encode(f'{content_hash[:16]}-{block_size:08x}-{index:06d}'.encode()).decode()
+
+
+def connect(connection_string=None, account_url=None):
+    """BlobServiceClient from a connection string or an account URL with the default Azure credential"""
+    if BlobServiceClient is None:
+        raise SystemExit("azure-storage-blob is not installed (pip install azure-storage-blob)")
+    if connection_string:
+        return BlobServiceClient.from_connection_string(connection_string)
+    if account_url:
+        from azure.identity import DefaultAzureCredential
+        return BlobServiceClient(account_url, credential=DefaultAzureCredential())
+    raise SystemExit("No storage account: pass --connection-string, --account-url or --azurite "
+                     "(or set AZURE_STORAGE_CONNECTION_STRING)")
+
+
+# ==================== UPLOADER ====================
+
+class LakeUploader:
+    """Hash, compare and upload lake files with concurrent, resumable block uploads"""
+
+    def __init__(self, container_client, block_mb=DEFAULT_BLOCK_MB, parallelism=DEFAULT_PARALLELISM,
+                 file_concurrency=DEFAULT_FILE_CONCURRENCY, dry_run=False):
+        self.container = container_client
+        self.block_size = block_mb * 1024 * 1024
+        self.parallelism = parallelism
+        self.file_concurrency = file_concurrency
+        self.dry_run = dry_run
+        cache = {}
+        if os.path.exists(STATE_PATH):
+            with open(STATE_PATH) as f:
+                cache = json.load(f)
+        self.hasher = FileHasher(cache)
+        self.results = []
+        self.lock = threading.Lock()
+        self.bytes_sent = 0
+        self.wall_seconds = 0.0
+
+    def remote_hash(self, blob):
+        """Content hash recorded on the remote blob (None when the blob does not exist)"""
+        try:
+            return blob.get_blob_properties().metadata.get(HASH_METADATA_KEY)
+        except ResourceNotFoundError:
+            return None
+
+    def staged_blocks(self, blob):
+        """IDs of the uncommitted blocks left by an interrupted upload"""
+        try:
+            _, uncommitted = blob.get_block_list('uncommitted')
+        except ResourceNotFoundError:
+            return set()
+        return {b.id for b in uncommitted}
+
+    def send(self, blob, path, block, offset, length):
+        """Stage one block read straight from the file"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        blob.stage_block(block, data, length=len(data))
+        with self.lock:
+            self.bytes_sent += len(data)
+        return len(data)
+
+    def upload_file(self, relpath, block_pool):
+        """Upload one file unless the remote copy has the same content; a result record"""
+        path = os.path.join(DATA_DIR, relpath)
+        blob_name = relpath.replace(os.sep, '/')
+        size = os.path.getsize(path)
+        content_hash = self.hasher.digest(os.path.relpath(path, PROJECT_ROOT))
+        blob = self.container.get_blob_client(blob_name)
+        result = {'blob': blob_name, 'bytes': size, 'sent': 0, 'blocks': 0, 'resumed_blocks': 0}
+
+        if self.remote_hash(blob) == content_hash:
+            return {**result, 'status': 'unchanged'}
+        if self.dry_run:
+            return {**result, 'status': 'would upload'}
+
+        started = time.perf_counter()
+        metadata = {HASH_METADATA_KEY: content_hash}
+        settings = ContentSettings(content_type=CONTENT_TYPES.get(os.path.splitext(path)[1]))
+        if size <= self.block_size:
+            with open(path, 'rb') as f:
+                blob.upload_blob(f, length=size, overwrite=True, metadata=metadata, content_settings=settings)
+            with self.lock:
+                self.bytes_sent += size
+            result.update(status='uploaded', sent=size, blocks=1)
+        else:
+            count = -(-size // self.block_size)
+            ids = [block_id(content_hash, self.block_size, i) for i in range(count)]
+            staged = self.staged_blocks(blob)
+            missing = [i for i, bid in enumerate(ids) if bid not in staged]
+            futures = [block_pool.submit(self.send, blob, path, ids[i], i * self.block_size,
+                                         min(self.block_size, size - i * self.block_size))
+                       for i in missing]
+            sent = sum(f.result() for f in futures)
+            blob.commit_block_list([BlobBlock(block_id=bid) for bid in ids], metadata=metadata,
+                                   content_settings=settings)
+            resumed = count - len(missing)
+            result.update(status='resumed' if resumed else 'uploaded', sent=sent, blocks=count,
+                          resumed_blocks=resumed)
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+    def upload_all(self, files):
+        """Upload the files: files are checked/committed concurrently, their blocks share one pool"""
+        print("="*80)
+        print("ADLS BULK UPLOAD")
+        print("="*80)
+        print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Container: {self.container.container_name} ({self.container.url})")
+        print(f"Files: {len(files)} ({sum(os.path.getsize(os.path.join(DATA_DIR, f)) for f in files) / 1024 / 1024:.1f}MB)")
+        print(f"Blocks: {self.block_size // (1024 * 1024)}MB, {self.parallelism} concurrent uploads"
+              f"{' (dry run)' if self.dry_run else ''}\n")
+
+        if not self.dry_run:
+            try:
+                self.container.create_container()
+            except ResourceExistsError:
+                pass
+
+        started = time.perf_counter()
+        # Block tasks never wait on anything, so file tasks can safely wait on them
+        with ThreadPoolExecutor(self.parallelism) as block_pool, \
+                ThreadPoolExecutor(self.file_concurrency) as file_pool:
+            futures = {file_pool.submit(self.upload_file, f, block_pool): f for f in files}
+            for future, relpath in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'blob': relpath.replace(os.sep, '/'), 'status': 'failed', 'error': str(e),
+                              'bytes': 0, 'sent': 0, 'blocks': 0, 'resumed_blocks': 0}
+                self.results.append(result)
+                self.print_result(result)
+        self.wall_seconds = time.perf_counter() - started
+        self.save_state()
+
+    def print_result(self, r):
+        if r['status'] == 'failed':
+            print(f"  ✗ {r['blob']}: {r['error']}")
+        elif r['status'] == 'unchanged':
+            print(f"  = {r['blob']} (unchanged)")
+        elif r['status'] == 'would upload':
+            print(f"  → {r['blob']} ({r['bytes'] / 1024 / 1024:.1f}MB)")
+        else:
+            resumed = f", {r['resumed_blocks']}/{r['blocks']} blocks already staged" if r['resumed_blocks'] else ''
+            print(f"  ✓ {r['blob']} ({r['sent'] / 1024 / 1024:.1f}MB in {r['seconds']:.2f}s{resumed})")
+
+    def save_state(self):
+        """Persist the local hash cache (size, mtime, hash per file)"""
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        with open(STATE_PATH, 'w') as f:
+            json.dump(self.hasher.cache, f)
+
+    def print_summary(self):
+        counts = {}
+        for r in self.results:
+            counts[r['status']] = counts.get(r['status'], 0) + 1
+        skipped = sum(r['bytes'] for r in self.results if r['status'] == 'unchanged')
+        print("\n" + "="*80)
+        print("UPLOAD SUMMARY")
+        print("="*80)
+        print(f"Files: {', '.join(f'{n} {s}' for s, n in counts.items()) or 'none'}")
+        print(f"Sent: {self.bytes_sent / 1024 / 1024:.1f}MB, skipped unchanged: {skipped / 1024 / 1024:.1f}MB")
+        print(f"Hashed: {self.hasher.hashed_bytes / 1024 / 1024:.1f}MB (others from the hash cache)")
+        if self.wall_seconds:
+            print(f"Wall time: {self.wall_seconds:.2f}s, throughput: "
+                  f"{self.bytes_sent / 1024 / 1024 / self.wall_seconds:.1f}MB/s")
+
+    def exit_code(self):
+        return 1 if any(r['status'] == 'failed' for r in self.results) else 0
+
+
+# ==================== MAIN ====================
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Upload data/raw and data/bronze to ADLS')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--connection-string', default=os.environ.get('AZURE_STORAGE_CONNECTION_STRING'),
+                        help='Storage connection string (default: $AZURE_STORAGE_CONNECTION_STRING)')
+    target.add_argument('--account-url', help='https://<account>.blob.core.windows.net (DefaultAzureCredential)')
+    target.add_argument('--azurite', action='store_true', help='Local Azurite emulator on 127.0.0.1:10000')
+    parser.add_argument('--container', default=DEFAULT_CONTAINER, help=f'Container (default {DEFAULT_CONTAINER})')
+    parser.add_argument('--sources', nargs='+', choices=SOURCES, default=SOURCES,
+                        help='Folders under data/ to upload (default: raw bronze)')
+    parser.add_argument('--block-mb', type=int, default=DEFAULT_BLOCK_MB,
+                        help=f'Block size in MB; smaller files go in one request (default {DEFAULT_BLOCK_MB})')
+    parser.add_argument('--parallelism', type=int, default=DEFAULT_PARALLELISM,
+                        help=f'Concurrent block uploads (default {DEFAULT_PARALLELISM})')
+    parser.add_argument('--file-concurrency', type=int, default=DEFAULT_FILE_CONCURRENCY,
+                        help=f'Files processed at once (default {DEFAULT_FILE_CONCURRENCY})')
+    parser.add_argument('--dry-run', action='store_true', help='Only show which files would be uploaded')
+    args = parser.parse_args()
+
+    service = connect(AZURITE_CONNECTION_STRING if args.azurite else args.connection_string, args.account_url)
+    uploader = LakeUploader(service.get_container_client(args.container), args.block_mb, args.parallelism,
+                            args.file_concurrency, args.dry_run)
+    uploader.upload_all(find_files(args.sources))
+    uploader.print_summary()
+    sys.exit(uploader.exit_code())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,302 +3,639 @@ SAP SD Sales Analytics - Data Validation Script
 Validates synthetic data quality and referential integrity
 """
 
-import pandas as pd
 import os
+import sys
+import json
+import argparse
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from sap_schema import bytes_to_read, file_columns, get_primary_key, read_table_pandas
+from data_catalog import locate
+from foreign_keys import FOREIGN_KEYS, ForeignKeyChecker, fk_name, format_result
+from temporal_checks import TEMPORAL_RULES, TemporalChecker, format_result as format_temporal_result
+from incremental_validation import STATE_DIR, IncrementalForeignKeyChecker
+from sampled_validation import ESCALATE_ABOVE, SampledForeignKeyChecker, format_sampled
+
 # Paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'bronze')
+REPORT_PATH = os.path.join(PROJECT_ROOT, 'validation_report.json')
+HISTORY_DIR = os.path.join(PROJECT_ROOT, 'data', 'quality', 'validation_history')
+
+# Process exit codes (2 is argparse's usage error)
+EXIT_OK = 0
+EXIT_ERRORS = 1
+EXIT_WARNINGS = 3            # only with --strict
+
+# One row per check per run in the Parquet history
+HISTORY_SCHEMA = pa.schema([
+    ('run_id', pa.string()),
+    ('run_started', pa.timestamp('s')),
+    ('check', pa.string()),
+    ('section', pa.string()),
+    ('tables', pa.list_(pa.string())),
+    ('status', pa.string()),
+    ('severity', pa.string()),
+    ('violations', pa.int64()),
+    ('rows_scanned', pa.int64()),
+    ('bytes_read', pa.int64()),
+    ('seconds', pa.float64()),
+    ('samples', pa.string()),
+    ('message', pa.string()),
+    ('mode', pa.string()),           # full, incremental or sampled (null in older runs: full)
+])
+
+# Table cache
+CACHE_BUDGET_MB = 1024
+
+# Checks run on a thread pool sharing the table cache (Arrow reads release the GIL)
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+# Tables checked for completeness, by category
+REQUIRED_TABLES = {
+    'Master Data - Customer': [
+        ('master', 'customer', 'KNA1'),
+        ('master', 'customer', 'KNVV'),
+        ('master', 'customer', 'KNB1'),
+        ('master', 'customer', 'KNVP'),
+    ],
+    'Master Data - Material': [
+        ('master', 'material', 'MARA'),
+        ('master', 'material', 'MARC'),
+        ('master', 'material', 'MAKT'),
+        ('master', 'material', 'MVKE'),
+    ],
+    'Master Data - Organizational': [
+        ('master', 'organizational', 'T001'),
+        ('master', 'organizational', 'TVKO'),
+        ('master', 'organizational', 'TVTW'),
+        ('master', 'organizational', 'TSPA'),
+        ('master', 'organizational', 'T023'),
+        ('master', 'organizational', 'T005'),
+    ],
+    'Transaction Data - Sales Orders': [
+        ('transactional', 'sales_orders', 'VBAK'),
+        ('transactional', 'sales_orders', 'VBAP'),
+        ('transactional', 'sales_orders', 'VBUK'),
+        ('transactional', 'sales_orders', 'VBUP'),
+        ('transactional', 'sales_orders', 'VBEP'),
+    ],
+    'Transaction Data - Deliveries': [
+        ('transactional', 'deliveries', 'LIKP'),
+        ('transactional', 'deliveries', 'LIPS'),
+    ],
+    'Transaction Data - Billing': [
+        ('transactional', 'billing', 'VBRK'),
+        ('transactional', 'billing', 'VBRP'),
+    ],
+    'Transaction Data - Support': [
+        ('transactional', 'document_flow', 'VBFA'),
+        ('transactional', 'pricing', 'KONV'),
+        ('transactional', 'partners', 'VBPA'),
+        ('transactional', 'shipment', 'VTTK'),
+        ('transactional', 'shipment', 'VTTP'),
+    ],
+}
+
+# Columns each check reads per table (its table dependencies); the cache loads the union once per file
+CHECK_COLUMNS = {
+    'null_checks': {
+        'VBAK': ['KUNNR', 'VKORG'],
+        'VBAP': ['MATNR', 'KWMENG'],
+    },
+    'currency_consistency': {
+        'VBAK': ['VBELN', 'WAERK'],
+        'VBAP': ['VBELN', 'WAERK'],
+    },
+    'customer_statistics': {
+        'KNA1': ['LAND1', 'KTOKD'],
+    },
+    'material_statistics': {
+        'MARA': ['MTART', 'MATKL'],
+    },
+    'sales_order_statistics': {
+        'VBAK': ['ERDAT', 'AUART', 'VKORG', 'GBSTK'],
+        'VBAP': ['VBELN'],
+    },
+    'delivery_statistics': {
+        'VBAK': ['VBELN'],
+        'LIKP': ['VBELN'],
+        'LIPS': ['VBELN'],
+    },
+    'billing_statistics': {
+        'LIKP': ['VBELN'],
+        'VBRK': ['FKART'],
+        'VBRP': ['VBELN'],
+    },
+}
+
+
+def declared_columns(table_name):
+    """Union of the columns all checks declare for a table (primary key if none do)"""
+    columns = []
+    for tables in CHECK_COLUMNS.values():
+        columns.extend(tables.get(table_name, []))
+    return list(dict.fromkeys(columns)) or get_primary_key(table_name)[:1]
+
+
+def full_run_seconds(history_dir=HISTORY_DIR):
+    """Check → seconds in the latest full run of the Parquet history"""
+    if not history_dir or not os.path.isdir(history_dir):
+        return {}
+    history = ds.dataset(history_dir, schema=HISTORY_SCHEMA, format='parquet').to_table(
+        columns=['run_id', 'check', 'seconds', 'mode'])
+    history = history.filter(pc.fill_null(pc.equal(history.column('mode'), 'full'), True))
+    if history.num_rows == 0:
+        return {}
+    latest = pc.max(history.column('run_id')).as_py()
+    history = history.filter(pc.equal(history.column('run_id'), latest))
+    return dict(zip(history.column('check').to_pylist(), history.column('seconds').to_pylist()))
+
+
+class TableCache:
+    """Per-run LRU cache of projected tables with a memory budget (thread-safe)"""
+
+    def __init__(self, budget_mb=CACHE_BUDGET_MB):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.tables = OrderedDict()
+        self.used_bytes = 0
+        self.stats = {'reads': 0, 'hits': 0, 'evictions': 0, 'bytes_read': 0}
+        self.lock = threading.Lock()
+        self.loading = {}
+        # Bytes read from disk by the current thread (attributed to the running check)
+        self.io = threading.local()
+
+    def get(self, path, table_name, columns):
+        """DataFrame with at least the given columns (read from disk on a miss)"""
+        while True:
+            with self.lock:
+                entry = self.tables.get(path)
+                if entry is not None and set(columns) <= set(entry[0].columns):
+                    self.tables.move_to_end(path)
+                    self.stats['hits'] += 1
+                    return entry[0]
+                pending = self.loading.get(path)
+                if pending is None:
+                    # Miss (or a narrower cached projection): read the wider column set once
+                    if entry is not None:
+                        columns = list(dict.fromkeys(list(entry[0].columns) + list(columns)))
+                        self.evict(path)
+                    loaded = self.loading[path] = threading.Event()
+                    break
+            # Another check is reading this file; wait and take it from the cache
+            pending.wait()
+
+        try:
+            df = read_table_pandas(path, table_name, columns)
+        finally:
+            with self.lock:
+                del self.loading[path]
+            loaded.set()
+        nbytes = int(df.memory_usage(deep=True).sum())
+        self.io.bytes_read = getattr(self.io, 'bytes_read', 0) + bytes_to_read(path, columns)
+
+        with self.lock:
+            self.stats['reads'] += 1
+            self.stats['bytes_read'] += nbytes
+            self.tables[path] = (df, nbytes)
+            self.used_bytes += nbytes
+            # Evict least recently used tables; the newest stays even if over budget
+            while self.used_bytes > self.budget_bytes and len(self.tables) > 1:
+                self.evict(next(iter(self.tables)))
+                self.stats['evictions'] += 1
+        return df
+
+    def evict(self, path):
+        """Drop a table from the cache"""
+        _, nbytes = self.tables.pop(path)
+        self.used_bytes -= nbytes
+
+
+class CheckLog:
+    """Output of one validation task, printed in task order once it finishes"""
+
+    def __init__(self):
+        self.lines = []
+        self.errors = []
+        self.warnings = []
+        self.results = []
+        # Check-specific fields of the result record (violations, samples, rows_scanned, ...)
+        self.record = {}
+
+    def print(self, line=''):
+        self.lines.append(line)
 
 
 class DataValidator:
     """Validate generated SAP SD data"""
 
-    def __init__(self):
+    SECTIONS = [
+        'COMPLETENESS VALIDATION',
+        'REFERENTIAL INTEGRITY VALIDATION',
+        'DATA QUALITY VALIDATION',
+        'DATA STATISTICS & INSIGHTS',
+    ]
+
+    def __init__(self, cache_mb=CACHE_BUDGET_MB, workers=DEFAULT_WORKERS, incremental=False, state_dir=STATE_DIR,
+                 sample_fraction=None, escalate_above=ESCALATE_ABOVE):
         self.results = []
         self.errors = []
         self.warnings = []
-
-    def load_table(self, category, subcategory, table_name):
-        """Load a CSV table"""
-        file_path = os.path.join(DATA_DIR, category, subcategory, f'{table_name}.csv')
-        if os.path.exists(file_path):
-            return pd.read_csv(file_path)
-        return None
-
-    def validate_completeness(self):
-        """Check that all required tables exist and have data"""
-        print("\n" + "="*80)
-        print("COMPLETENESS VALIDATION")
-        print("="*80)
-
-        required_tables = {
-            'Master Data - Customer': [
-                ('master', 'customer', 'KNA1'),
-                ('master', 'customer', 'KNVV'),
-                ('master', 'customer', 'KNB1'),
-                ('master', 'customer', 'KNVP'),
-            ],
-            'Master Data - Material': [
-                ('master', 'material', 'MARA'),
-                ('master', 'material', 'MARC'),
-                ('master', 'material', 'MAKT'),
-                ('master', 'material', 'MVKE'),
-            ],
-            'Master Data - Organizational': [
-                ('master', 'organizational', 'T001'),
-                ('master', 'organizational', 'TVKO'),
-                ('master', 'organizational', 'TVTW'),
-                ('master', 'organizational', 'TSPA'),
-                ('master', 'organizational', 'T023'),
-                ('master', 'organizational', 'T005'),
-            ],
-            'Transaction Data - Sales Orders': [
-                ('transactional', 'sales_orders', 'VBAK'),
-                ('transactional', 'sales_orders', 'VBAP'),
-                ('transactional', 'sales_orders', 'VBUK'),
-                ('transactional', 'sales_orders', 'VBUP'),
-                ('transactional', 'sales_orders', 'VBEP'),
-            ],
-            'Transaction Data - Deliveries': [
-                ('transactional', 'deliveries', 'LIKP'),
-                ('transactional', 'deliveries', 'LIPS'),
-            ],
-            'Transaction Data - Billing': [
-                ('transactional', 'billing', 'VBRK'),
-                ('transactional', 'billing', 'VBRP'),
-            ],
-            'Transaction Data - Support': [
-                ('transactional', 'document_flow', 'VBFA'),
-                ('transactional', 'pricing', 'KONV'),
-                ('transactional', 'partners', 'VBPA'),
-                ('transactional', 'shipment', 'VTTK'),
-                ('transactional', 'shipment', 'VTTP'),
-            ],
+        self.timings = []
+        self.records = []
+        self.run_started = datetime.now().replace(microsecond=0)
+        self.run_id = self.run_started.strftime('%Y%m%dT%H%M%S')
+        self.workers = workers
+        self.cache = TableCache(cache_mb)
+        # Incremental mode: FK checks probe only new/changed partitions, the rest comes from stored state
+        self.incremental = incremental
+        # Sampled mode (pre-load gate): FK checks probe a stratified sample and escalate to a full
+        # scan only when the violation-rate upper bound crosses the threshold; statistics are skipped
+        self.sampled = sample_fraction is not None
+        self.mode = 'sampled' if self.sampled else 'incremental' if incremental else 'full'
+        self.escalated = []
+        if incremental:
+            self.fk_checker = IncrementalForeignKeyChecker(state_dir=state_dir)
+        elif self.sampled:
+            self.fk_checker = SampledForeignKeyChecker(fraction=sample_fraction, escalate_above=escalate_above)
+        else:
+            self.fk_checker = ForeignKeyChecker()
+        self.temporal_checker = TemporalChecker(self.fk_checker.table_files)
+
+    def load_table(self, table_name, columns=None):
+        """Load a table with registry types, projected to the columns checks declare"""
+        file_path = locate(table_name)
+        if file_path is None:
+            return None
+        available = file_columns(file_path)
+        wanted = [c for c in declared_columns(table_name) if c in available]
+        df = self.cache.get(file_path, table_name, wanted or available[:1])
+        if columns is None:
+            return df
+        return df[[c for c in columns if c in df.columns]]
+
+    def check_tables(self, check):
+        """Tables a check declared, loaded with their declared columns"""
+        return {
+            table: self.load_table(table, columns)
+            for table, columns in CHECK_COLUMNS[check].items()
         }
 
-        for category, tables in required_tables.items():
-            print(f"\n{category}:")
-            for cat, subcat, table in tables:
-                df = self.load_table(cat, subcat, table)
-                if df is not None:
-                    rows = len(df)
-                    cols = len(df.columns)
-                    status = "✓ OK" if rows > 0 else "✗ EMPTY"
-                    print(f"  {table:10s} - {rows:8,} rows × {cols:2} cols {status}")
-                    self.results.append({
-                        'table': table,
-                        'category': category,
-                        'rows': rows,
-                        'columns': cols,
-                        'status': 'OK' if rows > 0 else 'EMPTY'
-                    })
-                else:
-                    print(f"  {table:10s} - MISSING FILE")
-                    self.errors.append(f"{table}: File not found")
-
-    def validate_referential_integrity(self):
-        """Validate foreign key relationships"""
-        print("\n" + "="*80)
-        print("REFERENTIAL INTEGRITY VALIDATION")
-        print("="*80)
-
-        # Load master data
-        kna1 = self.load_table('master', 'customer', 'KNA1')
-        mara = self.load_table('master', 'material', 'MARA')
-
-        # Load transaction data
-        vbak = self.load_table('transactional', 'sales_orders', 'VBAK')
-        vbap = self.load_table('transactional', 'sales_orders', 'VBAP')
-        likp = self.load_table('transactional', 'deliveries', 'LIKP')
-        lips = self.load_table('transactional', 'deliveries', 'LIPS')
-        vbrk = self.load_table('transactional', 'billing', 'VBRK')
-        vbrp = self.load_table('transactional', 'billing', 'VBRP')
-
-        print("\nCustomer References:")
-        if vbak is not None and kna1 is not None:
-            invalid_customers = vbak[~vbak['KUNNR'].isin(kna1['KUNNR'])]
-            if len(invalid_customers) == 0:
-                print(f"  ✓ VBAK.KUNNR → KNA1.KUNNR: All {len(vbak):,} orders reference valid customers")
-            else:
-                print(f"  ✗ VBAK.KUNNR → KNA1.KUNNR: {len(invalid_customers)} invalid references")
-                self.errors.append(f"VBAK: {len(invalid_customers)} orders with invalid customer references")
-
-        print("\nMaterial References:")
-        if vbap is not None and mara is not None:
-            invalid_materials = vbap[~vbap['MATNR'].isin(mara['MATNR'])]
-            if len(invalid_materials) == 0:
-                print(f"  ✓ VBAP.MATNR → MARA.MATNR: All {len(vbap):,} items reference valid materials")
-            else:
-                print(f"  ✗ VBAP.MATNR → MARA.MATNR: {len(invalid_materials)} invalid references")
-                self.errors.append(f"VBAP: {len(invalid_materials)} items with invalid material references")
+    # ==================== TASKS ====================
 
-        print("\nDocument Flow - Order to Items:")
-        if vbak is not None and vbap is not None:
-            orphan_items = vbap[~vbap['VBELN'].isin(vbak['VBELN'])]
-            if len(orphan_items) == 0:
-                print(f"  ✓ VBAP.VBELN → VBAK.VBELN: All {len(vbap):,} items belong to valid orders")
-            else:
-                print(f"  ✗ VBAP.VBELN → VBAK.VBELN: {len(orphan_items)} orphan items")
-                self.errors.append(f"VBAP: {len(orphan_items)} items without valid order headers")
-
-        print("\nDocument Flow - Delivery Items:")
-        if likp is not None and lips is not None:
-            orphan_items = lips[~lips['VBELN'].isin(likp['VBELN'])]
-            if len(orphan_items) == 0:
-                print(f"  ✓ LIPS.VBELN → LIKP.VBELN: All {len(lips):,} items belong to valid deliveries")
-            else:
-                print(f"  ✗ LIPS.VBELN → LIKP.VBELN: {len(orphan_items)} orphan items")
+    def build_tasks(self):
+        """Every check as a task: section, heading, declared tables and the function to run"""
+        tasks = []
+        for category, tables in REQUIRED_TABLES.items():
+            for cat, subcat, table in tables:
+                tasks.append({
+                    'name': f'completeness:{table}',
+                    'section': 'COMPLETENESS VALIDATION',
+                    'heading': category,
+                    'tables': [table],
+                    'func': lambda log, c=category, l=(cat, subcat, table): self.check_completeness(log, c, *l),
+                })
+        for entry in FOREIGN_KEYS:
+            tasks.append({
+                'name': f'fk:{fk_name(entry)}',
+                'section': 'REFERENTIAL INTEGRITY VALIDATION',
+                'heading': entry['group'],
+                'tables': [entry['child'], entry['parent']],
+                'func': lambda log, e=entry: self.check_foreign_key(log, e),
+            })
+        tasks.append(self.table_task('null_checks', 'DATA QUALITY VALIDATION', 'Null Value Checks',
+                                     self.check_nulls))
+        for entry in TEMPORAL_RULES:
+            tasks.append({
+                'name': f"temporal:{entry['name']}",
+                'section': 'DATA QUALITY VALIDATION',
+                'heading': 'Date Sequence Checks',
+                'tables': list(dict.fromkeys([entry['link'], entry['later'][0], entry['earlier'][0]])),
+                'func': lambda log, e=entry: self.check_date_sequence(log, e),
+            })
+        checks = [
+            ('currency_consistency', 'DATA QUALITY VALIDATION', 'Currency Consistency', self.check_currency),
+            ('customer_statistics', 'DATA STATISTICS & INSIGHTS', None, self.customer_statistics),
+            ('material_statistics', 'DATA STATISTICS & INSIGHTS', None, self.material_statistics),
+            ('sales_order_statistics', 'DATA STATISTICS & INSIGHTS', None, self.sales_order_statistics),
+            ('delivery_statistics', 'DATA STATISTICS & INSIGHTS', None, self.delivery_statistics),
+            ('billing_statistics', 'DATA STATISTICS & INSIGHTS', None, self.billing_statistics),
+        ]
+        for name, section, heading, func in checks:
+            if self.sampled and section == 'DATA STATISTICS & INSIGHTS':
+                continue
+            tasks.append(self.table_task(name, section, heading, func))
+        return tasks
+
+    def table_task(self, name, section, heading, func):
+        """Task for a check that receives its declared tables as DataFrames (vbak=..., vbap=...)"""
+        return {
+            'name': name,
+            'section': section,
+            'heading': heading,
+            'tables': list(CHECK_COLUMNS[name]),
+            'func': lambda log: self.run_table_check(log, name, func),
+        }
 
-        print("\nDocument Flow - Billing Items:")
-        if vbrk is not None and vbrp is not None:
-            orphan_items = vbrp[~vbrp['VBELN'].isin(vbrk['VBELN'])]
-            if len(orphan_items) == 0:
-                print(f"  ✓ VBRP.VBELN → VBRK.VBELN: All {len(vbrp):,} items belong to valid billing docs")
+    def run_table_check(self, log, name, func):
+        """Load a check's declared tables and run it (rows scanned = rows of those tables)"""
+        tables = self.check_tables(name)
+        log.record['rows_scanned'] = sum(len(df) for df in tables.values() if df is not None)
+        func(log, **{t.lower(): df for t, df in tables.items()})
+
+    def run_task(self, task):
+        """Run one task, capturing its output, wall time and result record"""
+        log = CheckLog()
+        self.cache.io.bytes_read = 0
+        start = time.perf_counter()
+        status = None
+        try:
+            task['func'](log)
+        except Exception as e:
+            log.print(f"  ✗ {task['name']}: check failed ({e})")
+            log.errors.append(f"{task['name']}: {e}")
+            log.record['message'] = f'{type(e).__name__}: {e}'
+            status = 'ERROR'
+        log.seconds = time.perf_counter() - start
+
+        if status is None:
+            if log.record.get('status') == 'SKIPPED':
+                status = 'SKIPPED'
+            elif log.errors:
+                status = 'FAILED'
+            elif log.warnings:
+                status = 'WARNING'
             else:
-                print(f"  ✗ VBRP.VBELN → VBRK.VBELN: {len(orphan_items)} orphan items")
-
-    def validate_data_quality(self):
-        """Validate data quality rules"""
-        print("\n" + "="*80)
-        print("DATA QUALITY VALIDATION")
-        print("="*80)
-
-        # Load tables
-        vbak = self.load_table('transactional', 'sales_orders', 'VBAK')
-        vbap = self.load_table('transactional', 'sales_orders', 'VBAP')
-        likp = self.load_table('transactional', 'deliveries', 'LIKP')
+                status = 'PASSED'
+        log.record = {
+            'check': task['name'],
+            'section': task['section'],
+            'tables': task['tables'],
+            'status': status,
+            'severity': log.record.get('severity') or ('error' if log.errors else 'warning' if log.warnings else None),
+            'violations': int(log.record.get('violations', 0)),
+            'rows_scanned': int(log.record.get('rows_scanned', 0)),
+            'bytes_read': int(self.cache.io.bytes_read + log.record.get('bytes_read', 0)),
+            'seconds': round(log.seconds, 6),
+            'samples': log.record.get('samples', []),
+            'message': '; '.join(log.errors + log.warnings) or log.record.get('message'),
+        }
+        return log
+
+    def run_all(self):
+        """Run all tasks on the pool and print their output in task order"""
+        tasks = self.build_tasks()
+        start = time.perf_counter()
+        section = heading = None
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.run_task, task) for task in tasks]
+            for task, future in zip(tasks, futures):
+                log = future.result()
+                if task['section'] != section:
+                    section, heading = task['section'], None
+                    print("\n" + "="*80)
+                    print(section)
+                    print("="*80)
+                if task['heading'] and task['heading'] != heading:
+                    heading = task['heading']
+                    print(f"\n{heading}:")
+                for line in log.lines:
+                    print(line)
+                self.errors.extend(log.errors)
+                self.warnings.extend(log.warnings)
+                self.results.extend(log.results)
+                self.records.append(log.record)
+                self.timings.append({'task': task['name'], 'tables': task['tables'], 'seconds': log.seconds})
+        self.wall_seconds = time.perf_counter() - start
+
+    # ==================== COMPLETENESS ====================
+
+    def check_completeness(self, log, category, cat, subcat, table):
+        """Check that a required table exists and has data"""
+        df = self.load_table(table)
+        if df is not None:
+            rows = len(df)
+            cols = len(file_columns(locate(table)))
+            status = "✓ OK" if rows > 0 else "✗ EMPTY"
+            log.print(f"  {table:10s} - {rows:8,} rows × {cols:2} cols {status}")
+            log.record.update(rows_scanned=rows, violations=int(rows == 0))
+            log.results.append({
+                'table': table,
+                'category': category,
+                'rows': rows,
+                'columns': cols,
+                'status': 'OK' if rows > 0 else 'EMPTY'
+            })
+        else:
+            log.print(f"  {table:10s} - MISSING FILE")
+            log.errors.append(f"{table}: File not found")
+            log.record['violations'] = 1
+
+    # ==================== REFERENTIAL INTEGRITY ====================
+
+    def check_foreign_key(self, log, entry):
+        """Validate one foreign key relationship from the catalog (streamed, key sets only in memory)"""
+        result = self.fk_checker.check(entry)
+        for line in format_result(result):
+            log.print(line)
+        self.record_result(log, result)
+        if 'partitions' in result:
+            log.print(f"      {result['partitions_checked']}/{result['partitions']} partitions validated "
+                      f"(parent keys {result['parent_change']})")
+            log.record['rows_scanned'] = result['rows_scanned']
+        for line in format_sampled(result):
+            log.print(line)
+        if result.get('estimated'):
+            log.record['rows_scanned'] = result['sampled_rows']
+        if result.get('escalated'):
+            self.escalated.append(result['relationship'])
+        if result['status'] == 'FAILED':
+            message = f"{result['relationship']}: {result['violations']:,} invalid references"
+            if result.get('estimated'):
+                message = (f"{result['relationship']}: ~{result['violations']:,} invalid references "
+                           f"(estimated, rate {result['rate']:.3%} ≤ {result['rate_high']:.3%})")
+            (log.errors if result['severity'] == 'error' else log.warnings).append(message)
+
+    def record_result(self, log, result):
+        """Copy a catalog checker result into the task's record"""
+        log.record.update({
+            'status': result['status'],
+            'severity': result.get('severity'),
+            'violations': result.get('violations', 0),
+            'rows_scanned': result.get('rows', 0),
+            'bytes_read': result.get('bytes_read', 0),
+            'samples': result.get('samples', []),
+            'message': result.get('message'),
+        })
+
+    # ==================== DATA QUALITY ====================
+
+    def check_nulls(self, log, vbak, vbap):
+        """Missing key and non-positive value checks (SAP keys read as '' when blank, not null)"""
+        def missing(column):
+            return int((column.isna() | (column.astype(object) == '')).sum())
 
-        print("\nNull Value Checks:")
         if vbak is not None:
-            null_customers = vbak['KUNNR'].isna().sum()
-            null_orgs = vbak['VKORG'].isna().sum()
-            print(f"  VBAK.KUNNR null values: {null_customers} {'✓' if null_customers == 0 else '✗'}")
-            print(f"  VBAK.VKORG null values: {null_orgs} {'✓' if null_orgs == 0 else '✗'}")
+            null_customers = missing(vbak['KUNNR'])
+            null_orgs = missing(vbak['VKORG'])
+            log.print(f"  VBAK.KUNNR null/blank values: {null_customers} {'✓' if null_customers == 0 else '✗'}")
+            log.print(f"  VBAK.VKORG null/blank values: {null_orgs} {'✓' if null_orgs == 0 else '✗'}")
 
         if vbap is not None:
-            null_materials = vbap['MATNR'].isna().sum()
+            null_materials = missing(vbap['MATNR'])
             zero_qty = (vbap['KWMENG'].astype(float) <= 0).sum()
-            print(f"  VBAP.MATNR null values: {null_materials} {'✓' if null_materials == 0 else '✗'}")
-            print(f"  VBAP.KWMENG zero/negative: {zero_qty} {'✓' if zero_qty == 0 else '✗'}")
-
-        print("\nDate Sequence Checks:")
-        if vbak is not None and likp is not None:
-            # Sample check: delivery date >= order date
-            print(f"  Order → Delivery date logic: ✓ (logical temporal sequence)")
-
-        print("\nCurrency Consistency:")
+            log.print(f"  VBAP.MATNR null/blank values: {null_materials} {'✓' if null_materials == 0 else '✗'}")
+            log.print(f"  VBAP.KWMENG zero/negative: {zero_qty} {'✓' if zero_qty == 0 else '✗'}")
+
+        counts = {
+            'VBAK.KUNNR null/blank': null_customers if vbak is not None else 0,
+            'VBAK.VKORG null/blank': null_orgs if vbak is not None else 0,
+            'VBAP.MATNR null/blank': null_materials if vbap is not None else 0,
+            'VBAP.KWMENG zero/negative': zero_qty if vbap is not None else 0,
+        }
+        log.record['violations'] = int(sum(counts.values()))
+        for label, count in counts.items():
+            if count:
+                log.warnings.append(f"{label}: {count} rows")
+
+    def check_date_sequence(self, log, entry):
+        """Date sequence along a document link (vectorized on int32 day numbers)"""
+        result = self.temporal_checker.check(entry)
+        for line in format_temporal_result(result):
+            log.print(line)
+        self.record_result(log, result)
+        if result['status'] == 'FAILED':
+            message = f"{result['rule']}: {result['violations']:,} document pairs out of sequence"
+            (log.errors if result['severity'] == 'error' else log.warnings).append(message)
+
+    def check_currency(self, log, vbak, vbap):
+        """Item currency matches the order header currency"""
         if vbak is not None and vbap is not None:
             # Check if currencies match within same order
             merged = vbap.merge(vbak[['VBELN', 'WAERK']], on='VBELN', suffixes=('_item', '_header'))
-            mismatches = (merged['WAERK_item'] != merged['WAERK_header']).sum()
+            mismatches = (merged['WAERK_item'].astype(str) != merged['WAERK_header'].astype(str)).sum()
             if mismatches == 0:
-                print(f"  ✓ VBAK.WAERK = VBAP.WAERK: All {len(vbap):,} items match order currency")
+                log.print(f"  ✓ VBAK.WAERK = VBAP.WAERK: All {len(vbap):,} items match order currency")
             else:
-                print(f"  ✗ Currency mismatches found: {mismatches}")
-                self.warnings.append(f"Currency mismatches: {mismatches} items")
+                log.print(f"  ✗ Currency mismatches found: {mismatches}")
+                log.warnings.append(f"Currency mismatches: {mismatches} items")
+                log.record['samples'] = merged.loc[
+                    merged['WAERK_item'].astype(str) != merged['WAERK_header'].astype(str), 'VBELN'
+                ].head(5).tolist()
+            log.record['violations'] = int(mismatches)
 
-    def generate_statistics(self):
-        """Generate data statistics"""
-        print("\n" + "="*80)
-        print("DATA STATISTICS & INSIGHTS")
-        print("="*80)
+    # ==================== STATISTICS ====================
 
-        # Customer statistics
-        kna1 = self.load_table('master', 'customer', 'KNA1')
+    def customer_statistics(self, log, kna1):
+        """Customer distribution"""
         if kna1 is not None:
-            print("\nCustomer Distribution:")
-            print(f"  Total Customers: {len(kna1):,}")
-            print("\n  By Country:")
+            log.print("\nCustomer Distribution:")
+            log.print(f"  Total Customers: {len(kna1):,}")
+            log.print("\n  By Country:")
             for country, count in kna1['LAND1'].value_counts().head(5).items():
                 pct = count / len(kna1) * 100
-                print(f"    {country}: {count:,} ({pct:.1f}%)")
+                log.print(f"    {country}: {count:,} ({pct:.1f}%)")
 
-            print("\n  By Account Group:")
+            log.print("\n  By Account Group:")
             for group, count in kna1['KTOKD'].value_counts().items():
                 pct = count / len(kna1) * 100
-                print(f"    {group}: {count:,} ({pct:.1f}%)")
+                log.print(f"    {group}: {count:,} ({pct:.1f}%)")
 
-        # Material statistics
-        mara = self.load_table('master', 'material', 'MARA')
+    def material_statistics(self, log, mara):
+        """Material distribution"""
         if mara is not None:
-            print("\nMaterial Distribution:")
-            print(f"  Total Materials: {len(mara):,}")
-            print("\n  By Material Type:")
+            log.print("\nMaterial Distribution:")
+            log.print(f"  Total Materials: {len(mara):,}")
+            log.print("\n  By Material Type:")
             for mtype, count in mara['MTART'].value_counts().items():
                 pct = count / len(mara) * 100
-                print(f"    {mtype}: {count:,} ({pct:.1f}%)")
+                log.print(f"    {mtype}: {count:,} ({pct:.1f}%)")
 
-            print("\n  By Material Group:")
+            log.print("\n  By Material Group:")
             for group, count in mara['MATKL'].value_counts().head(5).items():
                 pct = count / len(mara) * 100
-                print(f"    {group}: {count:,} ({pct:.1f}%)")
-
-        # Sales order statistics
-        vbak = self.load_table('transactional', 'sales_orders', 'VBAK')
-        vbap = self.load_table('transactional', 'sales_orders', 'VBAP')
+                log.print(f"    {group}: {count:,} ({pct:.1f}%)")
 
+    def sales_order_statistics(self, log, vbak, vbap):
+        """Sales order counts by type, organization and status"""
         if vbak is not None:
-            print("\nSales Order Statistics:")
-            print(f"  Total Orders: {len(vbak):,}")
-            print(f"  Date Range: {vbak['ERDAT'].min()} to {vbak['ERDAT'].max()}")
+            log.print("\nSales Order Statistics:")
+            log.print(f"  Total Orders: {len(vbak):,}")
+            log.print(f"  Date Range: {vbak['ERDAT'].min():%Y-%m-%d} to {vbak['ERDAT'].max():%Y-%m-%d}")
 
-            print("\n  By Order Type:")
+            log.print("\n  By Order Type:")
             for otype, count in vbak['AUART'].value_counts().items():
                 pct = count / len(vbak) * 100
-                print(f"    {otype}: {count:,} ({pct:.1f}%)")
+                log.print(f"    {otype}: {count:,} ({pct:.1f}%)")
 
-            print("\n  By Sales Organization:")
+            log.print("\n  By Sales Organization:")
             for org, count in vbak['VKORG'].value_counts().items():
                 pct = count / len(vbak) * 100
-                print(f"    {org}: {count:,} ({pct:.1f}%)")
+                log.print(f"    {org}: {count:,} ({pct:.1f}%)")
 
-            print("\n  By Status:")
+            log.print("\n  By Status:")
             for status, count in vbak['GBSTK'].value_counts().items():
                 pct = count / len(vbak) * 100
                 status_name = {'A': 'Complete', 'B': 'In Process', 'C': 'Not Processed'}.get(status, status)
-                print(f"    {status} ({status_name}): {count:,} ({pct:.1f}%)")
+                log.print(f"    {status} ({status_name}): {count:,} ({pct:.1f}%)")
 
         if vbap is not None:
-            print(f"\n  Total Order Items: {len(vbap):,}")
-            if len(vbak) > 0:
+            log.print(f"\n  Total Order Items: {len(vbap):,}")
+            if vbak is not None and len(vbak) > 0:
                 avg_items = len(vbap) / len(vbak)
-                print(f"  Average Items per Order: {avg_items:.2f}")
-
-        # Delivery statistics
-        likp = self.load_table('transactional', 'deliveries', 'LIKP')
-        lips = self.load_table('transactional', 'deliveries', 'LIPS')
+                log.print(f"  Average Items per Order: {avg_items:.2f}")
 
+    def delivery_statistics(self, log, vbak, likp, lips):
+        """Delivery counts and delivery rate"""
         if likp is not None:
-            print("\nDelivery Statistics:")
-            print(f"  Total Deliveries: {len(likp):,}")
-            if len(vbak) > 0:
+            log.print("\nDelivery Statistics:")
+            log.print(f"  Total Deliveries: {len(likp):,}")
+            if vbak is not None and len(vbak) > 0:
                 delivery_rate = len(likp) / len(vbak) * 100
-                print(f"  Delivery Rate: {delivery_rate:.1f}% of orders")
+                log.print(f"  Delivery Rate: {delivery_rate:.1f}% of orders")
 
         if lips is not None:
-            print(f"  Total Delivery Items: {len(lips):,}")
-
-        # Billing statistics
-        vbrk = self.load_table('transactional', 'billing', 'VBRK')
-        vbrp = self.load_table('transactional', 'billing', 'VBRP')
+            log.print(f"  Total Delivery Items: {len(lips):,}")
 
+    def billing_statistics(self, log, likp, vbrk, vbrp):
+        """Billing counts, billing rate and billing types"""
         if vbrk is not None:
-            print("\nBilling Statistics:")
-            print(f"  Total Billing Documents: {len(vbrk):,}")
-            if len(likp) > 0:
+            log.print("\nBilling Statistics:")
+            log.print(f"  Total Billing Documents: {len(vbrk):,}")
+            if likp is not None and len(likp) > 0:
                 billing_rate = len(vbrk) / len(likp) * 100
-                print(f"  Billing Rate: {billing_rate:.1f}% of deliveries")
+                log.print(f"  Billing Rate: {billing_rate:.1f}% of deliveries")
 
-            print("\n  By Billing Type:")
+            log.print("\n  By Billing Type:")
             for btype, count in vbrk['FKART'].value_counts().items():
                 pct = count / len(vbrk) * 100
-                print(f"    {btype}: {count:,} ({pct:.1f}%)")
+                log.print(f"    {btype}: {count:,} ({pct:.1f}%)")
 
         if vbrp is not None:
-            print(f"  Total Billing Items: {len(vbrp):,}")
+            log.print(f"  Total Billing Items: {len(vbrp):,}")
+
+    def print_timings(self, top=10):
+        """Print the slowest checks and how much they overlapped"""
+        print("\n" + "="*80)
+        print("CHECK TIMINGS")
+        print("="*80)
+        total = sum(t['seconds'] for t in self.timings)
+        print(f"\n  {'Check':58s} {'Tables':12s} {'ms':>9s}")
+        for t in sorted(self.timings, key=lambda t: t['seconds'], reverse=True)[:top]:
+            print(f"  {t['task'][:58]:58s} {','.join(t['tables'])[:12]:12s} {t['seconds'] * 1000:9.1f}")
+        # Overlap only turns into speedup with free cores; compare against --workers 1
+        print(f"\n  {len(self.timings)} checks | {self.workers} workers | "
+              f"sum of check times {total:.2f}s | wall {self.wall_seconds:.2f}s | "
+              f"concurrency {total / self.wall_seconds:.1f}x")
 
     def print_summary(self):
         """Print validation summary"""
@@ -312,6 +649,13 @@ class DataValidator:
 
         print(f"\nTables Validated: {ok_tables}/{total_tables}")
         print(f"Total Records: {total_rows:,}")
+        stats = self.cache.stats
+        print(f"Table Cache: {stats['reads']} file reads ({stats['bytes_read'] / (1024 * 1024):.1f}MB), "
+              f"{stats['hits']} hits, {stats['evictions']} evictions")
+        if self.incremental:
+            print(f"Incremental: {self.fk_checker.summary()}")
+        if self.sampled:
+            self.print_time_saved()
 
         if len(self.errors) == 0:
             print("\n✓ All validations passed successfully!")
@@ -327,22 +671,110 @@ class DataValidator:
 
         print("\n" + "="*80)
 
+    def print_time_saved(self, history_dir=HISTORY_DIR):
+        """Sampled FK check time against the same checks in the latest full run of the history"""
+        fk_records = [r for r in self.records if r['check'].startswith('fk:') and r['status'] != 'SKIPPED']
+        sampled_seconds = sum(r['seconds'] for r in fk_records)
+        baseline = full_run_seconds(history_dir)
+        matched = [r for r in fk_records if r['check'] in baseline]
+        print(f"Sampled Gate: {len(fk_records)} relationships sampled, {len(self.escalated)} escalated to full scans, "
+              f"{sampled_seconds:.2f}s")
+        if not matched:
+            print("  (no full run in the validation history to compare against)")
+            return
+        full_seconds = sum(baseline[r['check']] for r in matched)
+        spent = sum(r['seconds'] for r in matched)
+        print(f"  vs latest full run: {full_seconds:.2f}s for the same {len(matched)} checks | "
+              f"time saved {full_seconds - spent:.2f}s ({1 - spent / full_seconds if full_seconds else 0:.0%})")
+
+    # ==================== RESULT REPORT ====================
+
+    def exit_code(self, strict=False):
+        """0 = passed, 1 = errors (failed or crashed checks), 3 = warnings under --strict"""
+        if any(r['status'] in ('FAILED', 'ERROR') for r in self.records):
+            return EXIT_ERRORS
+        if strict and any(r['status'] == 'WARNING' for r in self.records):
+            return EXIT_WARNINGS
+        return EXIT_OK
+
+    def report(self, strict=False):
+        """Run-level summary plus one record per check"""
+        statuses = [r['status'] for r in self.records]
+        return {
+            'run_id': self.run_id,
+            'run_started': self.run_started.isoformat(),
+            'wall_seconds': round(self.wall_seconds, 3),
+            'workers': self.workers,
+            'mode': self.mode,
+            'exit_code': self.exit_code(strict),
+            'checks': len(self.records),
+            'status_counts': {s: statuses.count(s) for s in dict.fromkeys(statuses)},
+            'rows_scanned': sum(r['rows_scanned'] for r in self.records),
+            'bytes_read': sum(r['bytes_read'] for r in self.records),
+            'results': self.records,
+        }
+
+    def save_report(self, report_path=REPORT_PATH, history_dir=HISTORY_DIR, strict=False):
+        """Write the JSON report and append this run to the Parquet history table"""
+        with open(report_path, 'w') as f:
+            json.dump(self.report(strict), f, indent=2, default=str)
+        print(f"✓ Validation report saved to: {os.path.relpath(report_path, PROJECT_ROOT)}")
+
+        if history_dir:
+            rows = [
+                {**r, 'run_id': self.run_id, 'run_started': self.run_started, 'mode': self.mode,
+                 'samples': json.dumps(r['samples'], default=str)}
+                for r in self.records
+            ]
+            table = pa.Table.from_pylist(rows, schema=HISTORY_SCHEMA)
+            # One file per run, partitioned by day: trend with pq.read_table(HISTORY_DIR)
+            run_dir = os.path.join(history_dir, f"run_date={self.run_started:%Y-%m-%d}")
+            os.makedirs(run_dir, exist_ok=True)
+            history_path = os.path.join(run_dir, f'{self.run_id}.parquet')
+            pq.write_table(table, history_path)
+            print(f"✓ History appended to: {os.path.relpath(history_path, PROJECT_ROOT)}")
+
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description='Validate generated SAP SD data')
+    parser.add_argument('--cache-mb', type=int, default=CACHE_BUDGET_MB,
+                        help=f'Memory budget of the table cache in MB (default {CACHE_BUDGET_MB})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Checks run in parallel (default {DEFAULT_WORKERS}; 1 = sequential)')
+    parser.add_argument('--report', default=REPORT_PATH,
+                        help='JSON report path (default: validation_report.json)')
+    parser.add_argument('--no-history', action='store_true',
+                        help='Do not append this run to the Parquet history table')
+    parser.add_argument('--strict', action='store_true',
+                        help=f'Exit {EXIT_WARNINGS} when checks only raise warnings')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', action='store_true',
+                      help='Validate only new or changed partitions for referential integrity '
+                           '(state in data/quality/validation_state)')
+    mode.add_argument('--sample', type=float, metavar='FRACTION',
+                      help='Fast gate: estimate FK violation rates from a stratified sample (e.g. 0.05)')
+    parser.add_argument('--escalate-above', type=float, default=ESCALATE_ABOVE,
+                        help=f'With --sample: full scan when the rate upper bound exceeds this '
+                             f'(default {ESCALATE_ABOVE})')
+    args = parser.parse_args()
+
     print("="*80)
     print("SAP SD Sales Analytics - Data Validation")
     print("="*80)
     print(f"Validation Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-    validator = DataValidator()
+    validator = DataValidator(args.cache_mb, args.workers, args.incremental,
+                              sample_fraction=args.sample, escalate_above=args.escalate_above)
 
     # Run all validations
-    validator.validate_completeness()
-    validator.validate_referential_integrity()
-    validator.validate_data_quality()
-    validator.generate_statistics()
+    validator.run_all()
+    if args.incremental:
+        validator.fk_checker.save_state()
+    validator.print_timings()
     validator.print_summary()
+    validator.save_report(args.report, None if args.no_history else HISTORY_DIR, args.strict)
+    sys.exit(validator.exit_code(args.strict))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+import numpy as np
+import pyarrow as pa
+
+from foreign_keys import KEY_SEPARATOR, contains, encode_keys
+
+
+def test_encode_keys_packs_digit_keys():
+    table = pa.table({'VBELN': ['0001000001', '0001000002'], 'POSNR': ['000010', '000020']})
+    present, numeric, ints, strings = encode_keys(table, ['VBELN', 'POSNR'], [10, 6])
+    assert present.all() and numeric.all()
+    assert ints.tolist() == [1000001 * 10 ** 6 + 10, 1000002 * 10 ** 6 + 20]
+    assert len(strings) == 0
+
+
+def test_encode_keys_joins_other_keys_and_skips_blanks():
+    table = pa.table({'KUNNR': ['0000100001', 'CPD-01', '', None]})
+    present, numeric, ints, strings = encode_keys(table, ['KUNNR'], [10])
+    assert present.tolist() == [True, True, False, False]
+    assert numeric.tolist() == [True, False, False, False]
+    assert ints.tolist() == [100001]
+    assert strings.tolist() == ['CPD-01']
+
+
+def test_encode_keys_composite_string_keys_use_separator():
+    table = pa.table({'MATNR': ['MAT-1'], 'WERKS': ['1000']})
+    _, _, _, strings = encode_keys(table, ['MATNR', 'WERKS'], [18, 4])
+    assert strings.tolist() == [f'MAT-1{KEY_SEPARATOR}1000']
+
+
+def test_contains():
+    keys = np.array([3, 5, 9], dtype=np.int64)
+    assert contains(keys, np.array([1, 3, 5, 7, 9, 11])).tolist() == [False, True, True, False, True, False]
+    assert contains(np.array([], dtype=np.int64), np.array([1, 2])).tolist() == [False, False]
+    assert contains(np.array(['a', 'c'], dtype=object), np.array(['a', 'b', 'd'], dtype=object)).tolist() == \
+        [True, False, False]
@@ -0,0 +1,47 @@
+import os
+import datetime
+
+import pyarrow as pa
+
+from lake_table import LOG_DIR_NAME, VersionedTable, is_versioned, latest_version
+
+
+def orders(numbers, month='2025-09'):
+    day = datetime.date.fromisoformat(f'{month}-15')
+    return pa.table({
+        'VBELN': pa.array([f'{n:010d}' for n in numbers]),
+        'ERDAT': pa.array([day] * len(numbers), pa.date32()),
+        'KUNNR': pa.array(['0000100001'] * len(numbers)),
+        'NETWR': pa.array([float(n) for n in numbers]),
+    })
+
+
+def test_commit_and_read_latest(tmp_path):
+    lake = VersionedTable(str(tmp_path / 'VBAK'), 'VBAK')
+    assert lake.latest_version() == -1
+
+    assert lake.append(orders([1, 2])) == 0
+    assert lake.append(orders([3], month='2025-10')) == 1
+    assert is_versioned(lake.path) and latest_version(lake.path) == 1
+    assert sorted(lake.read(columns=['VBELN']).column('VBELN').to_pylist()) == \
+        ['0000000001', '0000000002', '0000000003']
+    # Transactional tables are partitioned by ERDAT month
+    assert sorted(e['partition']['ERDAT_MONTH'] for e in lake.snapshot()['files'].values()) == ['2025-09', '2025-10']
+
+    assert lake.overwrite(orders([4])) == 2
+    assert lake.read(columns=['VBELN']).column('VBELN').to_pylist() == ['0000000004']
+    # Older versions stay readable
+    assert lake.read(columns=['VBELN'], version=0).num_rows == 2
+    assert [c['operation'] for c in lake.history()] == ['APPEND', 'APPEND', 'OVERWRITE']
+
+
+def test_commit_takes_next_free_version(tmp_path):
+    lake = VersionedTable(str(tmp_path / 'VBAK'), 'VBAK')
+    lake.append(orders([1]))
+    # A second writer that had seen version 0 commits as version 1, not over it
+    other = VersionedTable(lake.path, 'VBAK')
+    assert other.commit('APPEND', other.write_files(orders([2]))) == 1
+    assert lake.append(orders([3])) == 2
+    assert sorted(os.listdir(os.path.join(lake.path, LOG_DIR_NAME))) == \
+        [f'{v:020d}.json' for v in range(3)]
+    assert lake.read().num_rows == 3
@@ -0,0 +1,91 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import silver_merge
+from build_silver import conform_currencies, conform_dates
+from key_encoding import KeyEncoder
+from parquet_dataset import write_partition_files
+from sap_schema import get_columns, read_table
+
+
+def write_csv(path, rows):
+    """VBAK rows as a bronze-style CSV (registry columns, blanks for the rest)"""
+    columns = list(get_columns('VBAK'))
+    if any(silver_merge.CHANGE_MODE in r for r in rows):
+        columns.append(silver_merge.CHANGE_MODE)
+    pd.DataFrame(rows).reindex(columns=columns).to_csv(path, index=False)
+    return str(path)
+
+
+def order(vbeln, erdat, netwr, **extra):
+    return {'VBELN': vbeln, 'ERDAT': erdat, 'KUNNR': '0000100001', 'NETWR': netwr, 'WAERK': 'EUR', **extra}
+
+
+@pytest.fixture
+def silver(tmp_path, monkeypatch):
+    """A small partitioned silver VBAK and a merger pointed at it"""
+    table_dir = str(tmp_path / 'silver' / 'VBAK')
+    key_dir = str(tmp_path / 'silver' / '_keys')
+    rows = [order('0000000001', '20250905', 10), order('0000000002', '20250910', 20),
+            order('0000000003', '20251001', 30)]
+    table = read_table(write_csv(tmp_path / 'VBAK.csv', rows), 'VBAK')
+    table = KeyEncoder(key_dir).add_surrogates(conform_currencies(conform_dates(table, 'VBAK'), 'VBAK'), extend=True)
+    write_partition_files(table, 'VBAK', table_dir)
+
+    monkeypatch.setattr(silver_merge, 'catalog', lambda *args, **kwargs: None)
+    monkeypatch.setattr(silver_merge, 'locate', lambda name, layer: table_dir)
+    monkeypatch.setattr(silver_merge, 'MERGE_LOG_PATH', str(tmp_path / '_merge_log.jsonl'))
+    merger = silver_merge.SilverMerger('VBAK')
+    merger.keys = KeyEncoder(key_dir)
+    return merger, tmp_path
+
+
+def silver_rows(merger):
+    table = pq.read_table(merger.table_dir).to_pandas()
+    return {r['VBELN']: (r['NETWR'], r['ERDAT_MONTH']) for _, r in table.iterrows()}
+
+
+def test_upsert_and_delete(silver):
+    merger, tmp_path = silver
+    batch = write_csv(tmp_path / 'changes.csv', [
+        order('0000000002', '20250910', 25, ODQ_CHANGEMODE='U'),
+        order('0000000004', '20251002', 40, ODQ_CHANGEMODE='C'),
+        {'VBELN': '0000000003', 'ODQ_CHANGEMODE': 'D'},
+        {'VBELN': '0000000099', 'ODQ_CHANGEMODE': 'D'},
+    ])
+    record = merger.merge(batch)
+
+    assert silver_rows(merger) == {'0000000001': (10, '2025-09'), '0000000002': (25, '2025-09'),
+                                   '0000000004': (40, '2025-10')}
+    assert (record['inserted'], record['updated'], record['deleted'], record['deletes_not_found']) == (1, 1, 1, 1)
+    assert record['partitions'] == ['2025-09', '2025-10']
+    assert not os.path.exists(merger.table_dir + '.__merge__')
+
+
+def test_last_change_per_key_wins(silver):
+    merger, tmp_path = silver
+    batch = write_csv(tmp_path / 'changes.csv', [
+        order('0000000001', '20250905', 11, ODQ_CHANGEMODE='U'),
+        order('0000000001', '20250905', 12, ODQ_CHANGEMODE='U'),
+    ])
+    merger.merge(batch)
+    assert silver_rows(merger)['0000000001'] == (12, '2025-09')
+
+
+def test_update_moves_row_to_new_partition(silver):
+    merger, tmp_path = silver
+    untouched = os.path.join(merger.table_dir, 'ERDAT_MONTH=2025-10')
+    before = {f: os.stat(os.path.join(untouched, f)).st_ino for f in os.listdir(untouched)}
+    batch = write_csv(tmp_path / 'changes.csv', [order('0000000001', '20251103', 15, ODQ_CHANGEMODE='U')])
+    record = merger.merge(batch)
+
+    rows = silver_rows(merger)
+    assert rows['0000000001'] == (15, '2025-11')
+    assert len(rows) == 3
+    assert record['updated'] == 1 and record['files_added'] == 1
+    assert record['partitions'] == ['2025-09', '2025-11']
+    # Files the batch does not touch are kept as they were
+    assert {f: os.stat(os.path.join(untouched, f)).st_ino for f in os.listdir(untouched)} == before